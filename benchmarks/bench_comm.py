@@ -0,0 +1,302 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Communication benchmark suite for TcpipInterface and SerialInterface without hardware.
+
+TcpipInterface talks to an InstrumentSimulator served on localhost with SimulatorServer,
+and SerialInterface talks to the same simulator over a pseudo-terminal pair (POSIX only).
+
+For each interface, it measures:
+
+* query latency percentiles and queries per second with replies of several sizes
+* queries per second and lock wait time with several threads sharing an interface
+* binary block throughput in MB/s with blocks of several sizes
+
+Results are printed as a table, and saved as JSON with --save. With --baseline,
+the results are compared with a saved result, and the exit code is 1 if any metric
+is worse than the baseline by more than --tolerance. The p99 latency and the maximum
+lock wait time are reported, but not checked, because they are too noisy.
+
+Usage:
+
+.. code-block::
+
+    python benchmarks/bench_comm.py --save baseline.json
+    python benchmarks/bench_comm.py --baseline baseline.json
+    python benchmarks/bench_comm.py --interfaces tcpip --sizes 16 4096 --threads 1 4
+
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+import statistics
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+from srsgui.inst.communications import TcpipInterface, SerialInterface
+from srsgui.inst.simulator import InstrumentSimulator, SimulatorServer, SimulatorSession
+
+RESULT_FORMAT = 'srsgui-bench-comm'
+
+
+class BenchInstrument(Instrument):
+    _IdString = 'BENCH'
+    frequency = FloatCommand('FREQ')
+
+
+def make_simulator():
+    simulator = InstrumentSimulator(BenchInstrument)
+    simulator.set_handler('DATA?', lambda args: 'A' * int(args))
+    simulator.set_block_generator('BLK?', lambda args: bytes(int(args)))
+    return simulator
+
+
+class PtyServer(threading.Thread):
+    """
+    Simulator serving the master side of a pseudo-terminal pair
+    """
+
+    def __init__(self, simulator):
+        import pty
+        import tty
+
+        super().__init__(daemon=True)
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.session = SimulatorSession(simulator)
+        self._running = True
+
+    def run(self):
+        while self._running:
+            try:
+                data = os.read(self.master, 65536)
+            except OSError:
+                break
+            replies = self.session.write(data)
+            view = memoryview(replies)
+            while view:
+                written = os.write(self.master, view)
+                view = view[written:]
+
+    def close(self):
+        self._running = False
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def connect(interface, address):
+    if interface == 'tcpip':
+        comm = TcpipInterface()
+        comm.connect('127.0.0.1', address)
+    else:
+        comm = SerialInterface()
+        comm.connect(address, 115200)
+    return comm
+
+
+def percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1, int(round(percent / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def bench_latency(comm, size, count):
+    cmd = 'DATA? {}'.format(size)
+    comm.query_text(cmd)  # warm up
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(count):
+        t = time.perf_counter()
+        reply = comm.query_text(cmd)
+        latencies.append(time.perf_counter() - t)
+        if len(reply) != size:
+            raise RuntimeError('Reply of {} bytes for {} bytes'.format(len(reply), size))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'p50_us': (percentile(latencies, 50) * 1e6, 'lower'),
+        'p99_us': (percentile(latencies, 99) * 1e6, None),
+        'mean_us': (statistics.mean(latencies) * 1e6, 'lower'),
+        'qps': (count / elapsed, 'higher'),
+    }
+
+
+def bench_threads(comm, thread_count, count):
+    lock = comm.get_lock()
+    lock.reset_stats()
+    per_thread = max(1, count // thread_count)
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(per_thread):
+                comm.query_text('FREQ?')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    stats = lock.get_stats().get('interactive', {'mean_wait': 0.0, 'max_wait': 0.0})
+    return {
+        'qps': (per_thread * thread_count / elapsed, 'higher'),
+        'lock_wait_mean_us': (stats['mean_wait'] * 1e6, 'lower'),
+        'lock_wait_max_us': (stats['max_wait'] * 1e6, None),
+    }
+
+
+def bench_block(comm, size, count):
+    import numpy as np
+
+    cmd = 'BLK? {}'.format(size)
+    out = np.empty(size, dtype=np.uint8)
+    comm.query_block(cmd, out=out)  # warm up
+    start = time.perf_counter()
+    for _ in range(count):
+        data = comm.query_block(cmd, out=out)
+        if len(data) != size:
+            raise RuntimeError('Block of {} bytes for {} bytes'.format(len(data), size))
+    elapsed = time.perf_counter() - start
+    return {'mb_per_s': (size * count / elapsed / 1e6, 'higher')}
+
+
+def run_benchmarks(args):
+    results = {}
+    for interface in args.interfaces:
+        if interface == 'tcpip':
+            server = SimulatorServer(make_simulator())
+            server.start()
+            address = server.port
+        else:
+            if os.name != 'posix':
+                print('Skipping serial: pseudo-terminals are not available on this platform')
+                continue
+            server = PtyServer(make_simulator())
+            server.start()
+            address = server.port
+
+        comm = connect(interface, address)
+        try:
+            for size in args.sizes:
+                for name, value in bench_latency(comm, size, args.count).items():
+                    results['{}.latency.{}B.{}'.format(interface, size, name)] = value
+            for thread_count in args.threads:
+                for name, value in bench_threads(comm, thread_count, args.count).items():
+                    results['{}.threads.{}.{}'.format(interface, thread_count, name)] = value
+            for size in args.block_sizes:
+                count = max(3, min(args.count, int(2e8 // size)))
+                for name, value in bench_block(comm, size, count).items():
+                    results['{}.block.{}B.{}'.format(interface, size, name)] = value
+        finally:
+            comm.disconnect()
+            if interface == 'tcpip':
+                server.stop()
+            else:
+                server.close()
+    return results
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=str(Path(__file__).resolve().parents[1])).stdout.strip()
+    except OSError:
+        return ''
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with baseline metrics
+
+    :return: list of (name, baseline value, value, change ratio, regressed)
+    """
+    rows = []
+    for name, (value, better) in sorted(results.items()):
+        if name not in baseline:
+            continue
+        base_value = baseline[name]['value']
+        if not base_value:
+            continue
+        change = (value - base_value) / base_value
+        if better == 'higher':
+            regressed = change < -tolerance
+        elif better == 'lower':
+            regressed = change > tolerance
+        else:
+            regressed = False  # Too noisy to check, e.g. p99 and max values
+        rows.append((name, base_value, value, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--interfaces', nargs='+', default=['tcpip', 'serial'], choices=['tcpip', 'serial'])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 1024, 65536],
+                        help='reply sizes in bytes')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16],
+                        help='numbers of threads sharing an interface')
+    parser.add_argument('--block-sizes', type=int, nargs='+', default=[10000, 1000000],
+                        help='binary block sizes in bytes')
+    parser.add_argument('--count', type=int, default=1000, help='queries per measurement')
+    parser.add_argument('--save', help='file to save the results as JSON')
+    parser.add_argument('--baseline', help='JSON file of saved results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed fraction of change in the worse direction, default 0.2')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+
+    print('{:<40} {:>14}'.format('metric', 'value'))
+    for name, (value, _) in sorted(results.items()):
+        print('{:<40} {:>14.2f}'.format(name, value))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'format': RESULT_FORMAT,
+                       'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'commit': get_git_commit(),
+                       'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'args': vars(args),
+                       'metrics': {name: {'value': value, 'better': better}
+                                   for name, (value, better) in sorted(results.items())}},
+                      f, indent=2)
+        print('Saved results to {}'.format(args.save))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('format') != RESULT_FORMAT:
+            raise ValueError('{} is not a benchmark result file'.format(args.baseline))
+        rows = compare(results, baseline['metrics'], args.tolerance)
+        print()
+        print('{:<40} {:>14} {:>14} {:>9}'.format('metric', 'baseline', 'current', 'change'))
+        for name, base_value, value, change, regressed in rows:
+            print('{:<40} {:>14.2f} {:>14.2f} {:>8.1f}% {}'.format(
+                  name, base_value, value, change * 100, 'REGRESSION' if regressed else ''))
+        regressions = [row for row in rows if row[4]]
+        if regressions:
+            print('{} regressions beyond {:.0f}% tolerance'.format(len(regressions), args.tolerance * 100))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
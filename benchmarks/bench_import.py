@@ -0,0 +1,154 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Import time benchmark of the srsgui package.
+
+Each import statement runs in a fresh Python interpreter, and the time of the import,
+excluding the interpreter start up, is measured. The median of --repeat runs is reported
+with the maximum resident memory of the interpreter, where available.
+
+Importing instrument classes, e.g. ``from srsgui import Instrument``, should not import
+numpy, matplotlib, Qt or asyncio, which are needed only by Task, TimePlot and the GUI.
+The exit code is 1 if any of them is imported by an instrument import.
+
+Results are printed as a table, and saved as JSON with --save. With --baseline,
+the results are compared with a saved result, and the exit code is 1 if any metric
+is worse than the baseline by more than --tolerance.
+
+Usage:
+
+.. code-block::
+
+    python benchmarks/bench_import.py --save baseline.json
+    python benchmarks/bench_import.py --baseline baseline.json
+    python benchmarks/bench_import.py --repeat 21
+
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+
+from bench_comm import compare, get_git_commit
+
+RESULT_FORMAT = 'srsgui-bench-import'
+
+ROOT_DIR = str(Path(__file__).resolve().parents[1])
+
+HEAVY_MODULES = ('numpy', 'matplotlib', 'PySide6', 'PySide2', 'PyQt5', 'PyQt6', 'asyncio')
+
+# name: (import statement, True if it should not import HEAVY_MODULES)
+IMPORTS = {
+    'package': ('import srsgui', True),
+    'instrument': ('from srsgui import Instrument, Command, FloatCommand, IndexCommand', True),
+    'inst': ('import srsgui.inst', True),
+    'task': ('from srsgui import Task', False),
+    'timeplot': ('from srsgui import TimePlot', False),
+}
+
+CHILD_CODE = '''
+import sys, time, json
+t = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - t
+try:
+    import resource
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        max_rss //= 1024  # in bytes on macOS
+except ImportError:
+    max_rss = 0
+print(json.dumps({{'time': elapsed, 'max_rss_kb': max_rss,
+                  'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def run_import(statement):
+    code = CHILD_CODE.format(statement=statement, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=ROOT_DIR)
+    if proc.returncode != 0:
+        raise RuntimeError('Failed "{}": {}'.format(statement, proc.stderr.strip()))
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def bench_import(statement, repeat):
+    run_import(statement)  # warm up the file system cache and .pyc files
+    runs = [run_import(statement) for _ in range(repeat)]
+    return {
+        'time_ms': (statistics.median(run['time'] for run in runs) * 1e3, 'lower'),
+        'max_rss_kb': (statistics.median(run['max_rss_kb'] for run in runs), 'lower'),
+    }, runs[-1]['heavy']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--imports', nargs='+', default=list(IMPORTS), choices=list(IMPORTS))
+    parser.add_argument('--repeat', type=int, default=11, help='runs per import, default 11')
+    parser.add_argument('--save', help='file to save the results as JSON')
+    parser.add_argument('--baseline', help='JSON file of saved results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed fraction of change in the worse direction, default 0.2')
+    args = parser.parse_args()
+
+    results = {}
+    heavy_imports = []
+    for name in args.imports:
+        statement, should_be_light = IMPORTS[name]
+        metrics, heavy = bench_import(statement, args.repeat)
+        for metric, value in metrics.items():
+            results['{}.{}'.format(name, metric)] = value
+        if should_be_light and heavy:
+            heavy_imports.append((statement, heavy))
+
+    print('{:<40} {:>14}'.format('metric', 'value'))
+    for name, (value, _) in sorted(results.items()):
+        print('{:<40} {:>14.2f}'.format(name, value))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'format': RESULT_FORMAT,
+                       'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'commit': get_git_commit(),
+                       'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'args': vars(args),
+                       'metrics': {name: {'value': value, 'better': better}
+                                   for name, (value, better) in sorted(results.items())}},
+                      f, indent=2)
+        print('Saved results to {}'.format(args.save))
+
+    failed = False
+    for statement, heavy in heavy_imports:
+        print('"{}" imported {}'.format(statement, ', '.join(heavy)))
+        failed = True
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('format') != RESULT_FORMAT:
+            raise ValueError('{} is not a benchmark result file'.format(args.baseline))
+        rows = compare(results, baseline['metrics'], args.tolerance)
+        print()
+        print('{:<40} {:>14} {:>14} {:>9}'.format('metric', 'baseline', 'current', 'change'))
+        for name, base_value, value, change, regressed in rows:
+            print('{:<40} {:>14.2f} {:>14.2f} {:>8.1f}% {}'.format(
+                  name, base_value, value, change * 100, 'REGRESSION' if regressed else ''))
+        regressions = [row for row in rows if row[4]]
+        if regressions:
+            print('{} regressions beyond {:.0f}% tolerance'.format(len(regressions), args.tolerance * 100))
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Benchmark of TcpipInterface.query_text latency with replies of different sizes.
+
+A local TCP server replies to every line it receives with a reply of the requested size.
+Each reply is sent in two TCP segments with a short gap, the way a reply longer than
+a single segment arrives from an instrument.
+
+The current TcpipInterface is compared with LegacyTcpipInterface that reproduces
+the query path used before the buffered line reader: a single recv(1024)
+followed by a 0.5 s sleep when the termination character is missing.
+The 'truncated' column counts replies that came back incomplete.
+
+Usage:
+
+.. code-block::
+
+    python benchmarks/bench_tcpip_query.py
+    python benchmarks/bench_tcpip_query.py --sizes 16 4096 65536 --count 50
+
+"""
+
+import sys
+import time
+import socket
+import select
+import argparse
+import threading
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from srsgui.inst.communications.tcpipinterface import TcpipInterface, EMPTY_BYTES
+from srsgui.inst.exceptions import InstCommunicationError
+
+SEGMENT_GAP = 0.002  # seconds between the two segments of a reply
+
+
+class LegacyTcpipInterface(TcpipInterface):
+    """
+    TcpipInterface with the query path used before the buffered line reader
+    """
+
+    def _recv(self):
+        ready, _, _ = select.select([self.socket], [], [], self._timeout)
+        if self.socket not in ready:
+            raise InstCommunicationError('Timeout')
+        reply = self.socket.recv(1024)
+        if reply == EMPTY_BYTES:
+            raise InstCommunicationError('Connection closed')
+        return reply
+
+    def query_text(self, cmd):
+        with self.get_lock():
+            self._send(cmd)
+            reply = self._recv()
+            if self._term_char not in reply:
+                time.sleep(0.5)
+                reply += self._recv()
+            return reply.decode(encoding='utf-8').strip()
+
+
+class ReplyServer(threading.Thread):
+    """
+    Local TCP server that replies to 'SIZE? <n>' with n bytes followed by a line feed
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen()
+        self.port = self.server.getsockname()[1]
+
+    def run(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.serve, args=(conn,), daemon=True).start()
+
+    @staticmethod
+    def serve(conn):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        buffer = b''
+        with conn:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                buffer += data
+                while b'\n' in buffer:
+                    line, buffer = buffer.split(b'\n', 1)
+                    size = int(line.split()[-1])
+                    reply = b'A' * size + b'\n'
+                    half = len(reply) // 2
+                    conn.sendall(reply[:half])
+                    time.sleep(SEGMENT_GAP)
+                    conn.sendall(reply[half:])
+
+    def close(self):
+        self.server.close()
+
+
+def measure(interface_class, port, size, count):
+    comm = interface_class()
+    comm.connect('127.0.0.1', port)
+    cmd = 'SIZE? {}'.format(size)
+    latencies = []
+    truncated = 0
+    try:
+        for _ in range(count):
+            t = time.perf_counter()
+            reply = comm.query_text(cmd)
+            latencies.append(time.perf_counter() - t)
+            if len(reply) != size:
+                truncated += 1
+                time.sleep(0.1)
+                drain(comm.socket)
+    finally:
+        comm.disconnect()
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(round(0.99 * (len(latencies) - 1))))]
+    return p50, p99, truncated
+
+
+def drain(sock):
+    while select.select([sock], [], [], 0)[0]:
+        if sock.recv(65536) == EMPTY_BYTES:
+            break
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 1000, 4000, 65536])
+    parser.add_argument('--count', type=int, default=20, help='queries per size')
+    args = parser.parse_args()
+
+    server = ReplyServer()
+    server.start()
+    print('{:>8} {:>14} {:>14} {:>10} {:>14} {:>14} {:>10}'.format(
+          'size', 'legacy p50 ms', 'legacy p99 ms', 'truncated',
+          'current p50 ms', 'current p99 ms', 'truncated'))
+    try:
+        for size in args.sizes:
+            legacy = measure(LegacyTcpipInterface, server.port, size, args.count)
+            current = measure(TcpipInterface, server.port, size, args.count)
+            print('{:>8} {:>14.3f} {:>14.3f} {:>10} {:>14.3f} {:>14.3f} {:>10}'.format(
+                  size, legacy[0] * 1e3, legacy[1] * 1e3, legacy[2],
+                  current[0] * 1e3, current[1] * 1e3, current[2]))
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,52 @@
+"""
+Classes are imported from their modules at the first access, e.g. ``from srsgui import Instrument``,
+so that a script using only instruments does not import matplotlib, numpy and Qt
+needed by Task, TimePlot and the GUI.
+"""
 
-from srsgui.task.task import Task
-from srsgui.task.inputs import BoolInput, IntegerInput, FloatInput,\
-                               StringInput, Ip4Input,\
-                               ListInput, IntegerListInput, FloatListInput, \
-                               InstrumentInput, FindListInput, CommandInput, \
-                               PasswordInput
+__version__ = "0.4.6"  # Global version number
 
-from srsgui.inst.commands import Command, GetCommand, SetCommand, \
-                                 BoolCommand, BoolGetCommand, BoolSetCommand, \
-                                 IntCommand, IntGetCommand, IntSetCommand, \
-                                 FloatCommand, FloatGetCommand, FloatSetCommand, \
-                                 DictCommand, DictGetCommand
+_lazy_imports = {
+    'srsgui.task.task': ['Task'],
+    'srsgui.task.inputs': ['BoolInput', 'IntegerInput', 'FloatInput',
+                           'StringInput', 'Ip4Input',
+                           'ListInput', 'IntegerListInput', 'FloatListInput',
+                           'InstrumentInput', 'FindListInput', 'CommandInput',
+                           'PasswordInput'],
+    'srsgui.inst.commands': ['Command', 'GetCommand', 'SetCommand',
+                             'BoolCommand', 'BoolGetCommand', 'BoolSetCommand',
+                             'IntCommand', 'IntGetCommand', 'IntSetCommand',
+                             'FloatCommand', 'FloatGetCommand', 'FloatSetCommand',
+                             'DictCommand', 'DictGetCommand', 'BinaryBlockGetCommand',
+                             'FloatArrayGetCommand', 'IntArrayGetCommand'],
+    'srsgui.inst.indexcommands': ['IndexCommand', 'IndexGetCommand',
+                                  'IntIndexCommand', 'IntIndexGetCommand',
+                                  'BoolIndexCommand', 'BoolIndexGetCommand',
+                                  'FloatIndexCommand', 'FloatIndexGetCommand',
+                                  'DictIndexCommand'],
+    'srsgui.inst.exceptions': ['InstException', 'InstCommunicationError', 'InstTimeoutError',
+                               'InstLoginFailureError', 'InstIdError',
+                               'InstSetError', 'InstQueryError', 'InstIndexError'],
+    'srsgui.inst.communications': ['Interface', 'SerialInterface', 'TcpipInterface'],
+    'srsgui.inst.instrument': ['Instrument'],
+    'srsgui.inst.component': ['Component'],
+    'srsgui.plots.timeplot': ['TimePlot'],
+}
 
-from srsgui.inst.indexcommands import IndexCommand, IndexGetCommand, \
-                                      IntIndexCommand, IntIndexGetCommand, \
-                                      BoolIndexCommand, BoolIndexGetCommand,\
-                                      FloatIndexCommand, FloatIndexGetCommand, \
-                                      DictIndexCommand
+_modules = {name: module for module, names in _lazy_imports.items() for name in names}
 
-from srsgui.inst.exceptions import InstException, InstCommunicationError, \
-                        InstLoginFailureError, InstIdError, \
-                        InstSetError, InstQueryError, InstIndexError
+__all__ = list(_modules)
 
-from srsgui.inst.communications import Interface, SerialInterface, TcpipInterface
-from srsgui.inst.instrument import Instrument
-from srsgui.inst.component import Component
 
-from srsgui.plots.timeplot import TimePlot
+def __getattr__(name):
+    module = _modules.get(name)
+    if module is None:
+        raise AttributeError("module 'srsgui' has no attribute '{}'".format(name))
+    import importlib
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # No __getattr__ call for the next access
+    return value
 
-__version__ = "0.4.6"  # Global version number
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
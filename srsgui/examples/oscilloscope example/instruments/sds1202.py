@@ -4,7 +4,7 @@
 ##! 
 
 import numpy as np
-from srsgui import Instrument
+from srsgui import Instrument, InstCommunicationError
 
 # Uncomment the following import to use the customized interface definition
 # from srsgui import TcpipInterface, Ip4Input, FindListInput, StringInput
@@ -61,12 +61,29 @@ class SDS1202(Instrument):
         tdiv = self.query_float('tdiv?')
         sara = self.get_sampling_rate()
         
+        # The reply is 'DAT2,#9000700000<data>\n\n'.
+        if self.comm.type in ('vxi11', 'visa'):
+            data = self._query_waveform_reply(f'{channel}:wf? dat2')
+        else:
+            # query_block() skips 'DAT2,', parses the block header and reads the data
+            # directly into a numpy array, and checks the 2 line feeds at the end.
+            data = self.comm.query_block(f'{channel}:wf? dat2', dtype=np.int8, trailer=b'\n\n')
+
+        volt_values = data / CODE_DIV * vdiv - offset
+        time_values = -tdiv * HOR_GRID / 2 + np.arange(len(data)) / sara
+        return time_values, volt_values
+
+    def _query_waveform_reply(self, cmd):
+        """
+        Query a waveform with Vxi11Interface or VisaInterface,
+        of which _read_binary() returns the whole reply, not just the bytes requested.
+        """
         with self.comm.get_lock(): # Use the lock to be thread-safe during a query
-            self.comm._send(f'{channel}:wf? dat2')
-            
-            recv = self.comm._read_binary(16) 
+            self.comm._send(cmd)
+
+            recv = self.comm._read_binary(16)
             # With VXI11, it returns whole data, not just 16 bytes.
-            
+
             header = recv[:16].split(b'#', 1)
             length = header[1][1:].decode(encoding='utf-8')
             num = int(length)
@@ -76,13 +93,8 @@ class SDS1202(Instrument):
 
         ending = recv[-2:]
         if ending != b'\n\n':
-            print('Invalid ending detected: {}'.format(ending))
-            return [], []
-
-        data = np.frombuffer(recv[16:-2], dtype=np.int8)
-        volt_values = data / CODE_DIV * vdiv - offset
-        time_values = -tdiv * HOR_GRID / 2 + np.arange(len(data)) / sara
-        return time_values, volt_values
+            raise InstCommunicationError('Invalid ending detected: {}'.format(ending))
+        return np.frombuffer(recv[16:-2], dtype=np.int8)
 
     def get_sampling_rate(self):
         reply = self.query_text('sara?')
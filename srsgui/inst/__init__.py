@@ -2,10 +2,15 @@
 from .communications.interface import Interface
 from .communications.serialinterface import SerialInterface
 from .communications.tcpipinterface import TcpipInterface
+from .communications.recordinginterface import RecordingInterface, ReplayInterface
+from .communications.simulatedinterface import SimulatedInterface
+from .communications.brokerinterface import BrokerInterface
 
 from .instrument import Instrument
 from .component import Component
-from .exceptions import InstException, InstCommunicationError, \
+from .simulator import InstrumentSimulator, SimulatorServer
+from .snapshot import Snapshot, capture_all
+from .exceptions import InstException, InstCommunicationError, InstTimeoutError, \
                         InstLoginFailureError, InstIdError, \
                         InstSetError, InstQueryError, InstIndexError
 
@@ -13,10 +18,22 @@ from .commands import Command, GetCommand, SetCommand, \
                       BoolCommand, BoolGetCommand, BoolSetCommand, \
                       IntCommand, IntGetCommand, IntSetCommand, \
                       FloatCommand, FloatGetCommand, FloatSetCommand, \
-                      DictCommand, DictGetCommand
+                      DictCommand, DictGetCommand, BinaryBlockGetCommand, \
+                      FloatArrayGetCommand, IntArrayGetCommand
 
 from .indexcommands import IndexCommand, IndexGetCommand, \
                           BoolIndexCommand, BoolIndexGetCommand, \
                           IntIndexCommand, IntIndexGetCommand, \
                           FloatIndexCommand, FloatIndexGetCommand, \
                           DictIndexCommand
+
+
+def __getattr__(name):
+    # Classes for asyncio are imported at the first access, not to import asyncio with the package
+    if name == 'AsyncTcpipInterface':
+        from .communications.asynctcpipinterface import AsyncTcpipInterface
+        return AsyncTcpipInterface
+    if name in ('AsyncInstrument', 'EventLoopThread'):
+        from . import asyncinstrument
+        return getattr(asyncinstrument, name)
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
@@ -0,0 +1,231 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+asyncio facade over an :class:`Instrument <srsgui.inst.instrument.Instrument>` instance
+and its commands.
+
+AsyncInstrument uses the Command and IndexCommand definitions of an Instrument subclass
+to communicate over an :class:`AsyncTcpipInterface
+<srsgui.inst.communications.asynctcpipinterface.AsyncTcpipInterface>`.
+A single event loop can poll many instruments concurrently without a thread for each.
+
+    >>> async def poll(instruments):
+    ...     return await asyncio.gather(*(inst.aget('frequency') for inst in instruments))
+    >>> cgs = [AsyncInstrument(CG635()) for _ in range(20)]
+    >>> for cg, ip in zip(cgs, ip_addresses):
+    ...     await cg.connect(ip, 5025)
+    >>> await poll(cgs)
+
+Synchronous code can run the coroutines on an EventLoopThread.
+
+    >>> loop = EventLoopThread()
+    >>> loop.start()
+    >>> loop.run_coroutine(cg.aget('frequency'))
+    1000.0
+"""
+
+import re
+import asyncio
+import threading
+
+from .communications.asynctcpipinterface import AsyncTcpipInterface
+from .indexcommands import IndexCommand
+from .exceptions import InstCommunicationError, InstSetError, InstQueryError, \
+                        InstIndexError, InstIdError
+
+
+class AsyncInstrument(object):
+    """
+    asyncio facade over an Instrument instance.
+
+    The Instrument instance provides the command definitions, the termination character
+    and the ID string. Communication goes through the AsyncTcpipInterface of the facade,
+    not the interface of the Instrument instance.
+    """
+
+    def __init__(self, instrument):
+        """
+        :param Instrument instrument: instance of an Instrument subclass, not need to be connected
+        """
+        self.inst = instrument
+        self.comm = AsyncTcpipInterface()
+        self.comm.set_term_char(instrument.get_term_char())
+        self.comm.set_cmd_separator(instrument.get_cmd_separator())
+
+    async def connect(self, ip_address, port=23):
+        """
+        Connect to the instrument over TCP/IP
+
+        :param str ip_address: IP address of the instrument
+        :param int port: TCP port number
+        """
+        await self.comm.connect(ip_address, port)
+
+    async def disconnect(self):
+        """
+        Disconnect from the instrument
+        """
+        await self.comm.disconnect()
+
+    def is_connected(self):
+        return self.comm.is_connected()
+
+    async def send(self, cmd):
+        await self.comm.send(cmd)
+
+    async def query_text(self, cmd):
+        return await self.comm.query_text(cmd)
+
+    async def query_int(self, cmd):
+        return await self.comm.query_int(cmd)
+
+    async def query_float(self, cmd):
+        return await self.comm.query_float(cmd)
+
+    async def query_many(self, cmds):
+        return await self.comm.query_many(cmds)
+
+    async def read_binary(self, length=4):
+        return await self.comm.read_binary(length)
+
+    async def check_id(self):
+        """
+        Check if the ID string of the instrument contains _IdString of the Instrument class.
+
+        :return: tuple of (model name, serial number, firmware version)
+        """
+        reply = await self.query_text(self.inst.id_query_cmd)
+        strings = reply.split(',')
+        if len(strings) != 4:
+            return None, None, None
+        if not re.search(self.inst._IdString, reply):
+            raise InstIdError("Invalid instrument: '{}' not in ID query reply, '{}'"
+                              .format(self.inst._IdString, reply))
+        return strings[1].strip(), strings[2].strip(), strings[3].strip()
+
+    def _find_command(self, name):
+        """
+        Find the command with a name, which can be a dotted path to a command
+        in a subcomponent, e.g. 'ch1.offset'
+        """
+        component = self.inst
+        names = name.split('.')
+        for component_name in names[:-1]:
+            component = getattr(component, component_name)
+        return component._find_command(names[-1])
+
+    async def aget(self, name, index=None):
+        """
+        Query the value of a command
+
+            >>> await cg.aget('frequency')
+            1000.0
+            >>> await fg.aget('fit_parameter', 1)
+            500.0
+
+        :param str name: command name, or a dotted path to a command in a subcomponent
+        :param index: index for an IndexCommand
+        """
+        cmd = self._find_command(name)
+        if not cmd._get_enable:
+            raise AttributeError('No query command for {}'.format(cmd.remote_command))
+        if isinstance(cmd, IndexCommand):
+            if index is None:
+                raise InstIndexError('No index given for index command {}'.format(cmd.remote_command))
+            query_string = cmd._get_query_string(index)
+        else:
+            query_string = cmd._get_query_string()
+        try:
+            reply = await self.comm.query_text(query_string)
+        except InstCommunicationError:
+            raise InstQueryError('Error during querying: CMD: {}'.format(query_string))
+        return cmd._convert_reply(query_string, reply)
+
+    async def aset(self, name, value, index=None):
+        """
+        Set the value of a command
+
+            >>> await cg.aset('frequency', 500.0)
+            >>> await fg.aset('fit_parameter', 1000.0, 1)
+
+        :param str name: command name, or a dotted path to a command in a subcomponent
+        :param value: value to set
+        :param index: index for an IndexCommand
+        """
+        cmd = self._find_command(name)
+        if not cmd._set_enable:
+            raise AttributeError('No set command for {}'.format(cmd.remote_command))
+        if isinstance(cmd, IndexCommand):
+            if index is None:
+                raise InstIndexError('No index given for index command {}'.format(cmd.remote_command))
+            set_string = cmd._get_set_string(index, value)
+        else:
+            set_string = cmd._get_set_string(value)
+        try:
+            await self.comm.send(set_string)
+        except InstCommunicationError:
+            raise InstSetError('Error during setting: CMD:{} '.format(set_string))
+
+    async def aget_many(self, names):
+        """
+        Query multiple commands in a single pipelined transaction.
+        An item in names is either a command name, or a tuple of a name of an IndexCommand
+        and an index.
+
+        :return: dict of values keyed with the items in names
+        """
+        plan = []
+        for name in names:
+            if type(name) is tuple:
+                command_name, index = name
+            else:
+                command_name, index = name, None
+            cmd = self._find_command(command_name)
+            if not cmd._get_enable:
+                raise AttributeError('No query command for {}'.format(cmd.remote_command))
+            if isinstance(cmd, IndexCommand):
+                query_string = cmd._get_query_string(index)
+            else:
+                query_string = cmd._get_query_string()
+            plan.append((name, cmd, query_string))
+        try:
+            replies = await self.comm.query_many([query_string for _, _, query_string in plan])
+        except InstCommunicationError:
+            raise InstQueryError('Error during querying: CMDs: {}'
+                                 .format([query_string for _, _, query_string in plan]))
+        return {name: cmd._convert_reply(query_string, reply)
+                for (name, cmd, query_string), reply in zip(plan, replies)}
+
+
+class EventLoopThread(threading.Thread):
+    """
+    Thread running an asyncio event loop, to use coroutines from synchronous code
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.loop = asyncio.new_event_loop()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run_coroutine(self, coro, timeout=None):
+        """
+        Run a coroutine in the event loop and wait for the result
+
+        :param coro: coroutine to run
+        :param float timeout: seconds to wait for the result, None to wait forever
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def stop(self):
+        """
+        Stop the event loop and wait for the thread to finish
+        """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
+        self.loop.close()
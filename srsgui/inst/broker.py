@@ -0,0 +1,381 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Broker to share an instrument among processes, such as the srsgui application
+and monitoring scripts.
+
+Only one process can own a TCP/IP connection or a serial port of an instrument.
+A broker owns the interface, and serves clients using
+:class:`BrokerInterface <srsgui.inst.communications.brokerinterface.BrokerInterface>`
+over a Unix domain socket. Run a broker from the command line,
+
+.. code-block::
+
+    python -m srsgui.inst.broker /tmp/cg635.sock tcpip:192.168.1.10:5025 --cache 0.2
+
+and use 'broker' as the interface type in clients, e.g. in a .taskconfig file.
+
+.. code-block::
+
+    inst: cg, instruments.cg635, CG635, broker:/tmp/cg635.sock
+
+Requests from clients are served in the order of the I/O priority of the client thread,
+as with :class:`PriorityLock <srsgui.inst.communications.prioritylock.PriorityLock>`.
+Queries arriving while the interface is busy are written together with query_many(),
+and identical queries waiting together get a single instrument query. A reply
+is served from the cache, if it is younger than the max age of the query.
+Any set command clears the cache.
+
+The protocol is a JSON line for each request and reply. A request or a reply with 'binary'
+is followed by as many bytes of binary data.
+"""
+
+import os
+import json
+import time
+import threading
+import socketserver
+
+from .communications.prioritylock import PriorityLock, io_priority, PRIORITY_INTERACTIVE
+
+MAX_BATCH_QUERIES = 16  # Maximum number of queries written together
+
+
+class _PendingQuery(object):
+    __slots__ = ('cmd', 'event', 'reply', 'error')
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.event = threading.Event()
+        self.reply = None
+        self.error = None
+
+
+class _BlockReader(object):
+    """
+    File object reading a block of known length from the stream of a client,
+    to upload it with Interface.write_block() as it arrives
+    """
+
+    def __init__(self, stream, length):
+        self._stream = stream
+        self._length = length
+        self._position = 0
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # Only to find the length of the block. The stream is not seekable.
+        if whence == os.SEEK_END and offset == 0:
+            return self._length
+        if whence == os.SEEK_SET and offset == self._position:
+            return self._position
+        raise OSError('Block stream is not seekable')
+
+    def readinto(self, buffer):
+        view = memoryview(buffer)[:self._length - self._position]
+        n = self._stream.readinto(view) if len(view) else 0
+        self._position += n
+        return n
+
+    def discard_rest(self):
+        """
+        Read and discard the rest of the block, to keep the stream in sync with the requests
+        """
+        while self._position < self._length:
+            data = self._stream.read(min(self._length - self._position, 65536))
+            if not data:
+                break
+            self._position += len(data)
+
+
+class InstrumentBroker(object):
+    """
+    Broker serving requests from many clients with a single interface
+    """
+
+    def __init__(self, comm, cache_ttl=0.0, max_batch=MAX_BATCH_QUERIES):
+        """
+        :param Interface comm: connected interface of the instrument
+        :param float cache_ttl: seconds to serve cached replies to queries without max age
+        :param int max_batch: maximum number of queries written together
+        """
+        self.comm = comm
+        self.cache_ttl = cache_ttl
+        self.max_batch = max_batch
+        self._dispatch_lock = PriorityLock()
+        self._mutex = threading.Lock()
+        self._pending = {}
+        self._cache = {}  # cmd: (time.monotonic() of the reply, reply)
+        self._stats = {'requests': 0, 'cache_hits': 0, 'shared_queries': 0,
+                       'instrument_queries': 0, 'instrument_writes': 0}
+
+    def _count(self, key, n=1):
+        with self._mutex:
+            self._stats[key] += n
+
+    def get_stats(self):
+        """
+        Get the number of requests from clients, and the number of queries and writes to the instrument
+
+        :rtype: dict
+        """
+        with self._mutex:
+            return dict(self._stats)
+
+    def clear_cache(self):
+        with self._mutex:
+            self._cache.clear()
+
+    def query(self, cmd, max_age=None, priority=PRIORITY_INTERACTIVE):
+        """
+        Query a command, sharing the instrument query with other clients waiting for it
+
+        :param str cmd: remote command
+        :param float max_age: seconds of the cached reply acceptable. cache_ttl, if None
+        :param int priority: I/O priority of the client
+        :rtype: str
+        """
+        if max_age is None:
+            max_age = self.cache_ttl
+        with self._mutex:
+            self._stats['requests'] += 1
+            if max_age > 0 and cmd in self._cache:
+                reply_time, reply = self._cache[cmd]
+                if time.monotonic() - reply_time <= max_age:
+                    self._stats['cache_hits'] += 1
+                    return reply
+            entry = self._pending.get(cmd)
+            if entry is None:
+                entry = self._pending[cmd] = _PendingQuery(cmd)
+            else:
+                self._stats['shared_queries'] += 1
+
+        with io_priority(priority), self._dispatch_lock:
+            if not entry.event.is_set():
+                with self._mutex:
+                    batch = list(self._pending.values())[:self.max_batch]
+                    if entry not in batch:
+                        batch[-1] = entry
+                    for item in batch:
+                        del self._pending[item.cmd]
+                self._run_queries(batch)
+
+        if entry.error is not None:
+            raise entry.error
+        return entry.reply
+
+    def _run_queries(self, batch):
+        cmds = [item.cmd for item in batch]
+        try:
+            results = self.comm.run_queries(cmds, self.max_batch)
+        except Exception as e:
+            results = [(None, e)] * len(cmds)  # Clients waiting for the queries get the error
+
+        now = time.monotonic()
+        with self._mutex:
+            self._stats['instrument_queries'] += len(cmds)
+            for item, (reply, error) in zip(batch, results):
+                item.reply = reply
+                item.error = error
+                if error is None:
+                    self._cache[item.cmd] = (now, reply)
+        for item in batch:
+            item.event.set()
+
+    def send(self, cmd, priority=PRIORITY_INTERACTIVE):
+        """
+        Send a command, and clear the cache
+        """
+        self._count('requests')
+        with io_priority(priority), self._dispatch_lock:
+            self.clear_cache()
+            self.comm.send(cmd)
+        self._count('instrument_writes')
+
+    def write(self, data, priority=PRIORITY_INTERACTIVE):
+        """
+        Write bytes, e.g. commands joined in a batch, and clear the cache
+        """
+        self._count('requests')
+        with io_priority(priority), self._dispatch_lock:
+            self.clear_cache()
+            with self.comm.get_lock():
+                self.comm._write_binary(data)
+        self._count('instrument_writes')
+
+    def write_block(self, cmd, stream, length, priority=PRIORITY_INTERACTIVE):
+        """
+        Write a command followed by a binary block read from the stream of a client,
+        and clear the cache. The command, the block and the termination character
+        are written without I/O of other clients in between.
+
+        :param str cmd: remote command preceding the block
+        :param stream: binary file object of the client, positioned at the start of the block
+        :param int length: number of bytes in the block
+        """
+        self._count('requests')
+        reader = _BlockReader(stream, length)
+        try:
+            with io_priority(priority), self._dispatch_lock:
+                self.clear_cache()
+                self.comm.write_block(cmd, reader)
+        finally:
+            reader.discard_rest()
+        self._count('instrument_writes')
+
+    def query_many(self, cmds, priority=PRIORITY_INTERACTIVE):
+        """
+        Query commands together, without the cache
+        """
+        self._count('requests')
+        with io_priority(priority), self._dispatch_lock:
+            replies = self.comm.query_many(cmds)
+        self._count('instrument_queries', len(cmds))
+        return replies
+
+    def query_block(self, cmd, trailer=None, priority=PRIORITY_INTERACTIVE):
+        """
+        Query a binary block, without the cache
+
+        :rtype: bytes
+        """
+        if isinstance(trailer, dict):
+            trailer = trailer['bytes'].encode('latin-1')
+        self._count('requests')
+        with io_priority(priority), self._dispatch_lock:
+            data = self.comm.query_block(cmd, trailer=trailer)
+        self._count('instrument_queries')
+        return data.tobytes()
+
+    def get_info(self):
+        return {'interface': self.comm.get_info(),
+                'term_char': self.comm.get_term_char().decode('latin-1'),
+                'cmd_separator': self.comm.get_cmd_separator(),
+                'stats': self.get_stats()}
+
+
+class _BrokerRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        broker = self.server.broker
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            binary = None
+            try:
+                request = json.loads(line)
+                op = request.get('op')
+                priority = request.get('priority', PRIORITY_INTERACTIVE)
+                if op == 'query':
+                    result = broker.query(request['cmd'], request.get('max_age'), priority)
+                elif op == 'send':
+                    result = broker.send(request['cmd'], priority)
+                elif op == 'write':
+                    result = broker.write(self.rfile.read(request['binary']), priority)
+                elif op == 'write_block':
+                    result = broker.write_block(request['cmd'], self.rfile, request['binary'], priority)
+                elif op == 'query_many':
+                    result = broker.query_many(request['cmds'], priority)
+                elif op == 'query_block':
+                    binary = broker.query_block(request['cmd'], request.get('trailer'), priority)
+                    result = None
+                elif op == 'info':
+                    result = broker.get_info()
+                else:
+                    raise ValueError('Invalid broker request: {}'.format(op))
+                reply = {'ok': True, 'result': result}
+            except Exception as e:
+                reply = {'ok': False, 'error': str(e), 'type': e.__class__.__name__}
+            if binary is not None:
+                reply['binary'] = len(binary)
+            try:
+                self.wfile.write(bytes(json.dumps(reply), 'utf-8') + b'\n')
+                if binary is not None:
+                    self.wfile.write(binary)
+                self.wfile.flush()
+            except OSError:
+                break  # Client disconnected, e.g. after cancelling an upload
+
+
+class BrokerServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Unix domain socket server running an InstrumentBroker, to use with BrokerInterface.
+    It is available on POSIX systems.
+    """
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, broker, socket_path):
+        """
+        :param InstrumentBroker broker: broker to serve
+        :param str socket_path: path of the Unix domain socket to create
+        """
+        if os.path.exists(socket_path):
+            os.remove(socket_path)  # Left over from a broker not stopped properly
+        super().__init__(socket_path, _BrokerRequestHandler)
+        self.broker = broker
+        self.socket_path = socket_path
+        self._thread = None
+
+    def start(self):
+        """
+        Start serving in a background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True,
+                                        name='BrokerServer')
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop serving, and remove the socket file
+        """
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def main():
+    import argparse
+    import importlib
+    from .instrument import Instrument
+
+    parser = argparse.ArgumentParser(description='Share an instrument among processes over a Unix domain socket')
+    parser.add_argument('socket_path', help='Unix domain socket to create, e.g. /tmp/cg635.sock')
+    parser.add_argument('parameter_string', help='connection parameters, e.g. tcpip:192.168.1.10:5025')
+    parser.add_argument('--instrument', help='Instrument subclass, e.g. instruments.cg635.CG635, '
+                                             'to use its interfaces, termination character and separator')
+    parser.add_argument('--cache', type=float, default=0.0,
+                        help='seconds to serve cached replies, default 0')
+    args = parser.parse_args()
+
+    instrument_class = Instrument
+    if args.instrument:
+        module_name, class_name = args.instrument.rsplit('.', 1)
+        instrument_class = getattr(importlib.import_module(module_name), class_name)
+    inst = instrument_class()
+    inst.connect_with_parameter_string(args.parameter_string)
+    server = BrokerServer(InstrumentBroker(inst.comm, args.cache), args.socket_path)
+    print('Serving {} on {}'.format(args.parameter_string, args.socket_path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        inst.disconnect()
+
+
+if __name__ == '__main__':
+    main()
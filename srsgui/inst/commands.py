@@ -42,6 +42,13 @@ Now, you can use the command like an class attribute as following:
 
 Using Command class simplifies tedious usage of a many set and query remote commands
 
+If the shadow state is enabled with fg.comm.enable_shadow(), the value is kept
+for each instrument instance, and a query within the TTL returns the value
+without a query to the instrument. See :mod:`srsgui.inst.communications.shadow`.
+Set volatile to True for a command whose value changes by itself, such as a measurement.
+
+    >>> frequency.volatile = True
+
 """
 
 from .exceptions import InstCommunicationError, InstSetError, InstQueryError
@@ -64,6 +71,7 @@ class Command(object):
 
         :param str remote_command_name:
         """
+        self._query_string = None  # rendered from _get_command_format at the first query
         self.remote_command = remote_command_name
         self._get_convert_function = None
         self._set_convert_function = None
@@ -74,44 +82,103 @@ class Command(object):
             self._value = default_value
         self.fmt = ''  # format for string conversion
                        # '.3f' , '10.3e', 'd', 'x'
+        self.volatile = not self._set_enable  # Always query, bypassing the shadow state
 
     def __get__(self, instance, instance_type):
         if instance is None:
             return self
-        query_string = self._get_command_format.format(self.remote_command)
-        reply = None
+        query_string = self._get_query_string()
+        shadow = None if self.volatile else instance.comm.get_shadow()
+        if shadow is not None:
+            found, value = shadow.lookup(query_string)
+            if found:
+                return value
+            generation = shadow.generation
         try:
-            reply = instance.comm.query_text(query_string).strip(' \t\n\r\x0b\x0c\x00')
-            if callable(self._get_convert_function):
-                self._value = self._get_convert_function(reply)
-
-            else:
-                self._value = reply
+            reply = instance.comm.query_text(query_string)
         except InstCommunicationError:
             raise InstQueryError('Error during querying: CMD: {}'.format(query_string))
+        # Not kept in the descriptor, which is shared by all the instances of the class
+        value = self._convert_reply(query_string, reply)
+        if shadow is not None:
+            shadow.store(query_string, value, generation)
+        return value
+
+    def __setattr__(self, name, value):
+        if name in ('remote_command', '_get_command_format'):
+            self.__dict__['_query_string'] = None  # Render the query string again
+        object.__setattr__(self, name, value)
+
+    def _get_query_string(self):
+        """
+        Get the remote command string to query the value
+        """
+        query_string = self._query_string
+        if query_string is None:
+            query_string = self._query_string = self._get_command_format.format(self.remote_command)
+        return query_string
+
+    def _convert_reply(self, query_string, reply):
+        """
+        Convert a reply string of the query to a value
+        """
+        reply = reply.strip(' \t\n\r\x0b\x0c\x00')
+        try:
+            if callable(self._get_convert_function):
+                value = self._get_convert_function(reply)
+            else:
+                value = reply
         except ValueError:
             if reply:
                 raise InstQueryError('Error during conversion CMD: {} Reply: {}, Hex:{}'
                                      .format(query_string, reply, (*map(hex, reply.encode('ascii')),)))
             else:
                 raise InstQueryError('CMD: {} returned "{}"'.format(query_string, reply))
-        return self._value
+        return value
 
     def __set__(self, instance, value):
         if instance is None:
             return
 
+        set_string = self._get_set_string(value)
+        shadow = None
+        if self._get_enable and not self.volatile:
+            shadow = instance.comm.get_shadow()
+        if shadow is not None:
+            query_string = self._get_query_string()
+            shadow_value = self._get_shadow_value(query_string, value)
+            if shadow_value is not None and shadow.is_unchanged(query_string, shadow_value):
+                return
+        try:
+            instance.comm.send(set_string)
+        except InstCommunicationError:
+            raise InstSetError('Error during setting: CMD:{} '.format(set_string))
+        if shadow is not None and shadow_value is not None:
+            shadow.store(query_string, shadow_value)
+
+    def _get_shadow_value(self, query_string, value):
+        """
+        Get the value that the query would return after setting the value,
+        or None if it is not known without a query
+        """
+        try:
+            if callable(self._set_convert_function):
+                value = self._set_convert_function(value)
+            return self._convert_reply(query_string, str(value))
+        except (ValueError, TypeError, KeyError, InstQueryError):
+            return None
+
+    def _get_set_string(self, value):
+        """
+        Get the remote command string to set the value
+        """
+        set_string = self.remote_command
         try:
-            set_string = self.remote_command
             if callable(self._set_convert_function):
                 converted_value = self._set_convert_function(value)
             else:
                 converted_value = value
-            set_string = self._set_command_format.format(self.remote_command, converted_value)
-            instance.comm.send(set_string)
-
-        except InstCommunicationError:
-            raise InstSetError('Error during setting: CMD:{} '.format(set_string))
+            return self._set_command_format.format(self.remote_command, converted_value)
         except ValueError:
             raise InstSetError('Error during conversion: CMD: {}'
                                .format(set_string))
@@ -287,17 +354,34 @@ class DictCommand(Command):
         self.unit = unit
         self.fmt = fmt
 
+    @property
+    def get_dict(self):
+        """
+        Conversion dictionary for queries. Assign a new dictionary, instead of changing it in place,
+        to update the reverse lookup.
+        """
+        return self._get_dict
+
+    @get_dict.setter
+    def get_dict(self, get_dict):
+        self._get_dict = get_dict
+        self._value_to_key_dict = {}
+        for key, value in get_dict.items():
+            self._value_to_key_dict.setdefault(value, key)  # the first key of a value, as list.index()
+
     def key_to_value(self, key):
-        if self.key_type(key) in self.set_dict:
-            return self.set_dict[self.key_type(key)]
+        key = self.key_type(key)
+        if key in self.set_dict:
+            return self.set_dict[key]
         else:
             raise KeyError('{} not in {} for {}'
                            .format(key, self.set_dict.keys(), self.remote_command))
 
     def value_to_key(self, value):
-        index = list(self.get_dict.values()).index(self.value_type(value))
-        key = list(self.get_dict.keys())[index]
-        return key
+        try:
+            return self._value_to_key_dict[self.value_type(value)]
+        except KeyError:
+            raise ValueError('{} is not in get_dict of {}'.format(value, self.remote_command))
 
 
 class DictGetCommand(DictCommand):
@@ -310,3 +394,101 @@ class DictGetCommand(DictCommand):
     def __set__(self, instance, value):
         raise AttributeError('No set command for {}'
                              .format(self.remote_command))
+
+
+class BinaryBlockGetCommand(GetCommand):
+    """
+    Descriptor for a remote command only to **query** an IEEE 488.2 definite length
+    **binary block** as a numpy array. To **set** a value is not allowed.
+
+    The data is read directly into a numpy array of dtype without intermediate copies.
+    If scale or offset is given, it returns data * scale + offset. Scale and offset can be
+    a number or a function taking the component instance, to use other commands of the instrument.
+
+        >>> waveform = BinaryBlockGetCommand('C1:WF? DAT2', dtype='int8', trailer=2,
+        ...                                  get_command_format='{}',
+        ...                                  scale=lambda inst: inst.vdiv / 25,
+        ...                                  offset=lambda inst: -inst.voffset)
+
+    """
+
+    def __init__(self, remote_command_name, dtype='uint8', scale=None, offset=None,
+                 trailer=None, get_command_format=None):
+        """
+        :param str remote_command_name: remote command name
+        :param dtype: numpy dtype of the data in the block, e.g. 'int8', '<i2', '>f4'
+        :param scale: number or function(instance) to multiply the data with
+        :param offset: number or function(instance) to add to the data after scaling
+        :param trailer: number of bytes to discard after the block, or bytes expected after the block.
+                        The default is the length of the termination character.
+        :param str get_command_format: format to make a query string from the remote command name,
+                                       The default is '{}?'
+        """
+        super().__init__(remote_command_name)
+        self.dtype = dtype
+        self.scale = scale
+        self.offset = offset
+        self.trailer = trailer
+        if get_command_format is not None:
+            self._get_command_format = get_command_format
+
+    def __get__(self, instance, instance_type):
+        if instance is None:
+            return self
+        scale = self.scale(instance) if callable(self.scale) else self.scale
+        offset = self.offset(instance) if callable(self.offset) else self.offset
+
+        query_string = self._get_query_string()
+        try:
+            data = instance.comm.query_block(query_string, dtype=self.dtype, trailer=self.trailer)
+        except InstCommunicationError:
+            raise InstQueryError('Error during querying: CMD: {}'.format(query_string))
+        if scale is not None:
+            data = data * scale
+        if offset is not None:
+            data = data + offset
+        return data
+
+
+class FloatArrayGetCommand(GetCommand):
+    """
+    Descriptor for a remote command only to **query** a list of separated **float** values,
+    such as an ASCII trace, as a numpy array. To **set** a value is not allowed.
+
+    The reply is parsed directly into a numpy array, without a Python float for each value.
+
+        >>> trace = FloatArrayGetCommand('TRAC', get_command_format='{}? 1')
+
+    """
+    _dtype = 'float64'
+
+    def __init__(self, remote_command_name, separator=',', dtype=None, get_command_format=None):
+        """
+        :param str remote_command_name: remote command name
+        :param str separator: separator between values in the reply. ' ' matches any whitespace.
+        :param dtype: numpy dtype of the array. The default is 'float64'
+        :param str get_command_format: format to make a query string from the remote command name,
+                                       The default is '{}?'
+        """
+        super().__init__(remote_command_name)
+        self.separator = separator
+        self.dtype = self._dtype if dtype is None else dtype
+        if get_command_format is not None:
+            self._get_command_format = get_command_format
+
+    def __get__(self, instance, instance_type):
+        if instance is None:
+            return self
+        query_string = self._get_query_string()
+        try:
+            return instance.comm.query_floats(query_string, self.separator, self.dtype)
+        except InstCommunicationError:
+            raise InstQueryError('Error during querying: CMD: {}'.format(query_string))
+
+
+class IntArrayGetCommand(FloatArrayGetCommand):
+    """
+    Descriptor for a remote command only to **query** a list of separated **integer** values
+    as a numpy array. To **set** a value is not allowed.
+    """
+    _dtype = 'int64'
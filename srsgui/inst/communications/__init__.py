@@ -2,3 +2,16 @@
 from .interface import Interface
 from .serialinterface import SerialInterface
 from .tcpipinterface import TcpipInterface
+from .recordinginterface import RecordingInterface, ReplayInterface
+from .simulatedinterface import SimulatedInterface
+from .brokerinterface import BrokerInterface
+from .prioritylock import PriorityLock, io_priority, set_thread_priority, get_thread_priority, \
+                          PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_TASK
+
+
+def __getattr__(name):
+    # AsyncTcpipInterface is imported at the first access, not to import asyncio with the package
+    if name == 'AsyncTcpipInterface':
+        from .asynctcpipinterface import AsyncTcpipInterface
+        return AsyncTcpipInterface
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
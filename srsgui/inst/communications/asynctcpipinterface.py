@@ -0,0 +1,297 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+TCP/IP communication interface using `asyncio <https://docs.python.org/3/library/asyncio.html>`_ streams.
+
+Unlike :class:`TcpipInterface <srsgui.inst.communications.tcpipinterface.TcpipInterface>`,
+it does not block a thread during communication. A single event loop can drive
+many instruments concurrently with one connection each.
+
+    >>> comm = AsyncTcpipInterface()
+    >>> await comm.connect('192.168.1.10', 5025)
+    >>> await comm.query_text('*IDN?')
+    'Stanford Research Systems,CG635,s/n001234,ver1.0'
+
+"""
+
+import asyncio
+
+from srsgui.inst.exceptions import InstCommunicationError, InstTimeoutError
+from .interface import TERM_CHAR, CommandFormat, split_query_items, convert_replies
+
+STREAM_LIMIT = 2 ** 24  # Maximum length of a reply line that the stream reader accepts
+
+
+class AsyncTcpipInterface(CommandFormat):
+    """Interface to use Ethernet TCP/IP communication with asyncio"""
+
+    NAME = 'asynctcpip'
+
+    def __init__(self):
+        self.type = AsyncTcpipInterface.NAME
+        self._term_char = TERM_CHAR
+        self._cmd_separator = None
+        self._timeout = 20
+        self._is_connected = False
+        self._cmd_in_waiting = None
+        self._ip_address = ''
+        self._tcp_port = 23
+        self._reader = None
+        self._writer = None
+        self._lock = None  # asyncio.Lock is created in the event loop running connect()
+
+    async def connect(self, ip_address, port=23):
+        """
+        Connect to an instrument that does not require login
+
+        Parameters
+        -----------
+            ip_address: str
+                IP address of the instrument to connect, e.g., "192.168.1.100"
+            port: int, optional
+                TCP port number, default is 23 which is the TELNET default port.
+        """
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(ip_address, port, limit=STREAM_LIMIT), self._timeout)
+        except asyncio.TimeoutError:
+            raise InstTimeoutError('Timeout connecting to ' + str(ip_address))
+        except OSError:
+            raise InstCommunicationError('Failed connecting to ' + str(ip_address))
+        self._lock = asyncio.Lock()
+        self._ip_address = ip_address
+        self._tcp_port = port
+        self._is_connected = True
+
+    async def disconnect(self):
+        """
+        Disconnect from the instrument
+        """
+        self._is_connected = False
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+        self._reader = None
+        self._writer = None
+
+    def is_connected(self):
+        """
+        check if the communication interface is connected
+
+        :rtype: bool
+        """
+        return self._is_connected
+
+    def get_lock(self):
+        """
+        Get the asyncio lock to secure exclusive access to the connection.
+        It is available after connect().
+        """
+        return self._lock
+
+    def _get_connected_lock(self):
+        if self._lock is None:
+            raise InstCommunicationError('Not connected')
+        return self._lock
+
+    def set_timeout(self, seconds):
+        """
+        Set timeout for the communication
+
+        :param float seconds: timeout value
+        """
+        self._timeout = seconds
+
+    def get_timeout(self):
+        """
+        Get timeout value for the communication
+
+        :rtype: float
+        """
+        return self._timeout
+
+    async def _send(self, cmd):
+        """
+        Send a command without the lock.
+        Use send instead.
+        """
+        await self._write_binary(self._encode_command(cmd))
+
+    async def _write_binary(self, binary_array):
+        """
+        Write bytes without the lock. It does not append the termination character.
+        """
+        if self._writer is None:
+            raise InstCommunicationError('Not connected to write')
+        try:
+            self._writer.write(binary_array)
+            await asyncio.wait_for(self._writer.drain(), self._timeout)
+        except asyncio.TimeoutError:
+            raise InstTimeoutError("Timeout writing to IP address: '{}'".format(self._ip_address))
+        except OSError:
+            self._is_connected = False
+            raise InstCommunicationError("Writing to IP address: '{}' failed".format(self._ip_address))
+
+    async def _recv(self):
+        """
+        Receive a reply up to the termination character without the lock.
+        Use query_text instead.
+
+        :return: bytes
+        """
+        if self._reader is None:
+            raise InstCommunicationError('Not connected to read')
+        try:
+            return await asyncio.wait_for(self._reader.readuntil(self._term_char), self._timeout)
+        except asyncio.TimeoutError:
+            self._close_stream()
+            raise InstTimeoutError("Timeout with Cmd: '{}' on IP: '{}'. Connection closed "
+                                   .format(self._cmd_in_waiting, self._ip_address))
+        except asyncio.IncompleteReadError:
+            self._is_connected = False
+            raise InstCommunicationError("Connection closed with cmd: '{}' on IP: '{}' "
+                                         .format(self._cmd_in_waiting, self._ip_address))
+        except asyncio.LimitOverrunError:
+            raise InstCommunicationError("Reply too long with cmd: '{}' on IP: '{}' "
+                                         .format(self._cmd_in_waiting, self._ip_address))
+        except OSError:
+            self._is_connected = False
+            raise InstCommunicationError("Connection closed with socket error with cmd: '{}' on IP: '{}' "
+                                         .format(self._cmd_in_waiting, self._ip_address))
+
+    async def _read_binary(self, length=4):
+        """
+        Read length bytes regardless of termination character without the lock.
+        Use read_binary instead.
+        """
+        if self._reader is None:
+            raise InstCommunicationError('Not connected to read')
+        try:
+            return await asyncio.wait_for(self._reader.readexactly(length), self._timeout)
+        except asyncio.TimeoutError:
+            self._close_stream()
+            raise InstTimeoutError("Timeout with _read_binary. Connection closed")
+        except asyncio.IncompleteReadError:
+            self._is_connected = False
+            raise InstCommunicationError("Connection closed with _read_binary")
+        except OSError:
+            self._is_connected = False
+            raise InstCommunicationError("Connection closed with OSError in _read_binary")
+
+    def _close_stream(self):
+        """
+        Close the connection after a read timed out. A part of the reply may be
+        in the stream already, and the rest may arrive later, which would be read
+        as the reply of the next query.
+        """
+        self._is_connected = False
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def _query(self, cmd):
+        self._cmd_in_waiting = cmd
+        await self._send(cmd)
+        reply = await self._recv()
+        self._cmd_in_waiting = None
+        return reply
+
+    async def send(self, cmd):
+        """
+        Send a remote command to the instrument
+
+        :param str cmd: remote command to send
+        """
+        async with self._get_connected_lock():
+            await self._send(cmd)
+
+    async def write_binary(self, binary_array):
+        """
+        Write an array of bytes to the instrument, without the termination character
+
+        :param bytes binary_array: bytes to write
+        """
+        async with self._get_connected_lock():
+            await self._write_binary(binary_array)
+
+    async def read_binary(self, length=4):
+        """
+        Read length bytes from the instrument regardless of termination character
+
+        :param int length: number of bytes to read
+        :rtype: bytes
+        """
+        async with self._get_connected_lock():
+            return await self._read_binary(length)
+
+    async def query_text(self, cmd):
+        """
+        Send a remote command and receive a reply
+
+        :param str cmd: remote command
+        :rtype: str
+        """
+        async with self._get_connected_lock():
+            reply = await self._query(cmd)
+        return reply.decode(encoding='utf-8').strip()
+
+    async def query_int(self, cmd):
+        """
+        Query for an integer-returning remote command
+
+        :param str cmd: remote command
+        :rtype: int
+        """
+        return int(await self.query_text(cmd))
+
+    async def query_float(self, cmd):
+        """
+        Query for a float-returning remote command
+
+        :param str cmd: remote command
+        :rtype: float
+        """
+        return float(await self.query_text(cmd))
+
+    async def query_many(self, cmds):
+        """
+        Send multiple queries in a single write and return the replies in order.
+        See :meth:`Interface.query_many <srsgui.inst.communications.interface.Interface.query_many>`.
+
+        :param list cmds: list of remote commands, or tuples of a remote command and a function
+        :return: list of replies converted with the functions
+        """
+        queries, converters = split_query_items(cmds)
+        if not queries:
+            return []
+
+        async with self._get_connected_lock():
+            if self._cmd_separator:
+                replies = self._split_reply(await self._query(self._cmd_separator.join(queries)), len(queries))
+                if replies is None:
+                    # A reply contains the separator, e.g. a string value. Query one by one.
+                    replies = [(await self._query(cmd)).decode(encoding='utf-8').strip() for cmd in queries]
+            else:
+                await self._write_binary(self._encode_queries(queries))
+                replies = []
+                for cmd in queries:
+                    self._cmd_in_waiting = cmd
+                    replies.append((await self._recv()).decode(encoding='utf-8').strip())
+                self._cmd_in_waiting = None
+
+        return convert_replies(converters, replies)
+
+    def get_info(self):
+        """
+        Return the interface information in a dict
+        """
+        return {'type': self.type,
+                'ip_address': self._ip_address,
+                'port': self._tcp_port}
@@ -0,0 +1,281 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+import json
+import time
+import socket
+
+from srsgui.inst import exceptions
+from srsgui.inst.exceptions import InstCommunicationError, InstTimeoutError
+from .interface import Interface, UPLOAD_CHUNK_SIZE, split_query_items, convert_replies
+from .ioworker import run_in_io_thread
+from .metrics import get_mnemonic
+from .prioritylock import get_thread_priority
+
+
+class BrokerInterface(Interface):
+    """
+    Interface to an instrument shared by an :mod:`instrument broker <srsgui.inst.broker>`
+    over a Unix domain socket.
+
+    A remote command is sent, and a query is replied, as a whole by the broker,
+    so that requests from other clients never come in between. Reading replies
+    separately with recv() or read_block() is not available.
+
+    Set max_age to accept a cached reply of a query, up to max_age seconds old,
+    served by the broker without an instrument query.
+    """
+
+    NAME = 'broker'
+
+    def __init__(self):
+        super(BrokerInterface, self).__init__()
+        self.type = BrokerInterface.NAME
+        self.socket = None
+        self._socket_path = ''
+        self._timeout = 20
+        self._recv_buffer = bytearray()
+        self.max_age = None  # seconds of cached replies acceptable. None to use the broker setting
+
+    def connect(self, socket_path):
+        """
+        Connect to a broker
+
+        :param str socket_path: Unix domain socket of the broker, e.g. '/tmp/cg635.sock'
+        """
+        try:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(self._timeout)
+            deadline = time.monotonic() + self._timeout
+            while True:
+                try:
+                    self.socket.connect(socket_path)
+                    break
+                except BlockingIOError:  # Backlog of the broker is full
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.01)
+        except (OSError, AttributeError) as e:
+            raise InstCommunicationError('Failed connecting to broker {}: {}'.format(socket_path, e))
+        self._socket_path = socket_path
+        self._recv_buffer.clear()
+        self._is_connected = True
+        if self._connect_callback:
+            self._connect_callback('Connected to broker {}'.format(socket_path))
+
+    def disconnect(self):
+        self._is_connected = False
+        if self.socket is not None:
+            self.socket.close()
+        if self._disconnect_callback:
+            self._disconnect_callback('Disconnected from broker {}'.format(self._socket_path))
+
+    @staticmethod
+    def parse_parameter_string(param_string):
+        """
+        Parse 'broker:socket_path' parameter string
+        """
+        params = param_string.split(':', 1)
+        interface_type = params[0].strip().lower()
+        if interface_type != BrokerInterface.NAME:
+            return None
+        if len(params) < 2 or not params[1].strip():
+            raise ValueError('No socket path in "{}"'.format(param_string))
+        return [interface_type, params[1].strip()]
+
+    def set_timeout(self, seconds):
+        self._timeout = seconds
+        if self.socket:
+            self.socket.settimeout(seconds)
+
+    def get_timeout(self):
+        return self._timeout
+
+    def _read_exactly(self, length):
+        while len(self._recv_buffer) < length:
+            data = self.socket.recv(65536)
+            if not data:
+                self.disconnect()
+                raise InstCommunicationError('Connection closed by broker {}'.format(self._socket_path))
+            self._recv_buffer += data
+        data = bytes(self._recv_buffer[:length])
+        del self._recv_buffer[:length]
+        return data
+
+    def _request(self, request, chunks=None):
+        """
+        Send a request to the broker and read the reply without the lock
+
+        :param dict request: request, with the number of bytes in chunks as 'binary', if any
+        :param chunks: iterable of bytes-like objects sent after the request, without copies
+        :return: tuple of the result and the binary data of the reply, if any
+        """
+        if not self._is_connected:
+            raise InstCommunicationError('Not connected to broker')
+        request['priority'] = get_thread_priority()
+        try:
+            self.socket.sendall(bytes(json.dumps(request), 'utf-8') + b'\n')
+            if chunks is not None:
+                try:
+                    for chunk in chunks:
+                        self.socket.sendall(chunk)
+                except InstCommunicationError:
+                    self.disconnect()  # The broker is waiting for the rest of the request
+                    raise
+            while True:
+                index = self._recv_buffer.find(b'\n')
+                if index >= 0:
+                    break
+                data = self.socket.recv(65536)
+                if not data:
+                    self.disconnect()
+                    raise InstCommunicationError('Connection closed by broker {}'.format(self._socket_path))
+                self._recv_buffer += data
+            reply = json.loads(bytes(self._recv_buffer[:index]))
+            del self._recv_buffer[:index + 1]
+            data = self._read_exactly(reply['binary']) if 'binary' in reply else None
+        except socket.timeout:
+            self.disconnect()  # A late reply would be taken for the reply of the next request
+            raise InstTimeoutError("Timeout with broker request: {}".format(request.get('op')))
+        except OSError as e:
+            self.disconnect()
+            raise InstCommunicationError('Broker {} error: {}'.format(self._socket_path, e))
+
+        if not reply['ok']:
+            error_class = getattr(exceptions, reply.get('type', ''), None)
+            if not (isinstance(error_class, type) and issubclass(error_class, Exception)):
+                error_class = InstCommunicationError
+            raise error_class(reply['error'])
+        return reply['result'], data
+
+    def _send(self, cmd):
+        self._request({'op': 'send', 'cmd': cmd})
+
+    def _write_binary(self, binary_array):
+        self._request({'op': 'write', 'binary': memoryview(binary_array).nbytes}, [binary_array])
+
+    def _query(self, cmd):
+        self._cmd_in_waiting = cmd
+        self._command_sent(cmd)
+        reply, _ = self._request({'op': 'query', 'cmd': cmd, 'max_age': self.max_age})
+        self._cmd_in_waiting = None
+        return bytes(reply, 'utf-8')
+
+    def _recv(self):
+        raise InstCommunicationError('Reading a reply separately is not available with a broker. '
+                                     'Use query_text instead.')
+
+    def _read_binary(self, length=4):
+        raise InstCommunicationError('Reading binary data separately is not available with a broker. '
+                                     'Use query_block instead.')
+
+    @run_in_io_thread
+    def query_many(self, cmds):
+        """
+        Send multiple queries to the broker to write together, and return the replies in order.
+        See Interface.query_many() for the parameters.
+        """
+        queries, converters = split_query_items(cmds)
+        if not queries:
+            return []
+
+        mnemonic = ';'.join(get_mnemonic(cmd) for cmd in queries) if self._metrics else ''
+        with self._measure(mnemonic) as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
+            for cmd in queries:
+                self._command_sent(cmd)
+            replies, _ = self._request({'op': 'query_many', 'cmds': queries})
+            m.bytes_in = sum(len(reply) for reply in replies)
+        if self._query_callback:
+            for cmd, reply in zip(queries, replies):
+                self._query_callback('Queried Cmd: {} Reply: {}'.format(cmd, reply))
+        return convert_replies(converters, replies)
+
+    def _query_batch(self, queries):
+        """
+        Query a batch of run_queries() together. Queries joined with the separator are sent
+        as a single query, so that the broker does not query them one by one on a failure.
+        """
+        if self._cmd_separator:
+            return super()._query_batch(queries)
+        return self.query_many(queries)
+
+    @run_in_io_thread
+    def query_block(self, cmd, out=None, dtype='uint8', trailer=None):
+        """
+        Query a binary block through the broker. See Interface.query_block() for the parameters.
+
+        :rtype: numpy.ndarray
+        """
+        import numpy as np
+
+        with self._measure(cmd) as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
+            self._command_sent(cmd)
+            if isinstance(trailer, (bytes, bytearray)):
+                trailer = {'bytes': trailer.decode('latin-1')}  # Not serializable to JSON as bytes
+            _, data = self._request({'op': 'query_block', 'cmd': cmd, 'trailer': trailer})
+            m.bytes_in = len(data)
+        dtype = np.dtype(dtype)
+        if len(data) % dtype.itemsize:
+            raise InstCommunicationError('Block length {} is not a multiple of {} item size'
+                                         .format(len(data), dtype))
+        if out is None:
+            return np.frombuffer(data, dtype=dtype).copy()
+        view = memoryview(out).cast('B')
+        if len(view) < len(data):
+            raise ValueError('Buffer of {} bytes is too small for the block of {} bytes'
+                             .format(len(view), len(data)))
+        view[:len(data)] = data
+        return np.frombuffer(out, dtype=dtype, count=len(data) // dtype.itemsize)
+
+    @run_in_io_thread
+    def write_block(self, cmd, data, chunk_size=UPLOAD_CHUNK_SIZE, progress=None, cancel=None):
+        """
+        Upload a command followed by a binary block through the broker, which writes the command,
+        the block and the termination character with no I/O of other clients in between.
+        See Interface.write_block() for the parameters.
+
+        If cancelled, the connection to the broker is closed, because the broker
+        is waiting for the rest of the block.
+        """
+        if chunk_size <= 0:
+            raise ValueError('Invalid chunk size: {}'.format(chunk_size))
+        length, chunks = self._get_block_source(data, chunk_size)
+        is_cancelled = getattr(cancel, 'is_set', cancel)
+
+        def send_chunks():
+            written = 0
+            for chunk in chunks:
+                if is_cancelled is not None and is_cancelled():
+                    raise InstCommunicationError('Upload cancelled after {} of {} bytes'.format(written, length))
+                yield chunk
+                written += len(chunk)
+                if progress is not None:
+                    progress(written, length)
+
+        with self._measure(cmd, length) as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
+            self._command_sent(cmd)
+            self._request({'op': 'write_block', 'cmd': cmd, 'binary': length}, send_chunks())
+        if self._send_callback:
+            self._send_callback('Sent cmd: {} with a block of {} bytes'.format(cmd, length))
+
+    def get_broker_info(self):
+        """
+        Get the interface information and the request statistics of the broker
+
+        :rtype: dict
+        """
+        with self.get_lock():
+            result, _ = self._request({'op': 'info'})
+        return result
+
+    def get_info(self):
+        return {'type': self.type,
+                'socket_path': self._socket_path}
@@ -3,12 +3,235 @@
 ##! Subject to the MIT License
 ##! 
 
-import threading
+import os
+from concurrent.futures import Future
+
+from srsgui.inst.exceptions import InstCommunicationError, InstTimeoutError, InstSetError, InstQueryError
+from .ioworker import IoWorker, run_in_io_thread, get_caller_ident
+from .prioritylock import PriorityLock
+from .metrics import InterfaceMetrics, Measurement, NULL_MEASUREMENT, BATCH_MNEMONIC, get_mnemonic
+from .shadow import ShadowState
 
 TERM_CHAR = b'\n'   # Termination character for communication
+MAX_BATCH_LINE_LENGTH = 256  # Maximum length of a line of commands joined in batch()
+MAX_BATCH_QUERIES = 32  # Maximum number of queries written together in run_queries()
+UPLOAD_CHUNK_SIZE = 1 << 20  # Bytes written at a time in write_block()
+
+
+def parse_numbers(reply, dtype='float64', separator=','):
+    """
+    Parse a reply of separated numbers into a numpy array.
+
+        >>> parse_numbers(b'1.0,2.5,-3e-2\n')
+        array([ 1.   ,  2.5  , -0.03 ])
+
+    :param reply: reply bytes or string
+    :param dtype: numpy dtype of the array, e.g. 'float64', 'int32'
+    :param str separator: separator between numbers. ' ' matches any whitespace.
+                          A separator at the end of the reply is ignored.
+    :raises ValueError: if the reply is not a list of numbers of the dtype
+    :rtype: numpy.ndarray
+    """
+    import numpy as np
+
+    if isinstance(reply, (bytes, bytearray)):
+        reply = reply.decode('ascii', errors='replace')
+    reply = reply.strip(' \t\n\r\x0b\x0c\x00')
+    if separator.strip():
+        if reply.endswith(separator):
+            reply = reply[:-len(separator)]
+        items = reply.split(separator) if reply else []
+    else:
+        items = reply.split()
+    return np.array(items, dtype=dtype)
+
+
+class _BatchBuffer(object):
+    __slots__ = ('cmds', 'depth', 'max_line_length')
+
+    def __init__(self, max_line_length):
+        self.cmds = []
+        self.depth = 0
+        self.max_line_length = max_line_length
+
+
+class CommandBatch(object):
+    """
+    Context manager returned by :meth:`Interface.batch`.
+
+    Commands sent in the context by the thread that entered it are buffered in the interface,
+    and written in a single write when the context exits or before any query of the thread.
+    """
+
+    def __init__(self, comm, error_query=None, max_line_length=MAX_BATCH_LINE_LENGTH):
+        self.comm = comm
+        self.error_query = error_query
+        self.max_line_length = max_line_length
+
+    def __enter__(self):
+        self.comm._begin_batch(self.max_line_length)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.comm._end_batch()
+        if exc_type is None and self.error_query:
+            self.check_error()
+
+    def flush(self):
+        """
+        Write the buffered commands now, without leaving the context
+        """
+        self.comm._write_batch()
+
+    def check_error(self):
+        """
+        Send the error query, and raise InstSetError if the reply does not start with 0,
+        e.g. '0,"No error"' from 'SYST:ERR?' of SCPI instruments, or '0' from 'LERR?'
+        """
+        reply = self.comm.query_text(self.error_query)
+        try:
+            error_code = int(reply.split(',')[0])
+        except ValueError:
+            raise InstSetError("Invalid reply '{}' to error query '{}'".format(reply, self.error_query))
+        if error_code != 0:
+            raise InstSetError("Error after batch: '{}' returned '{}'".format(self.error_query, reply))
+
+
+def split_query_items(cmds):
+    """
+    Split the items of query_many() into the remote commands and the functions to convert the replies
+
+    :param list cmds: list of remote commands, or tuples of a remote command and a function
+    :return: tuple of (list of remote commands, list of functions or None)
+    """
+    queries = []
+    converters = []
+    for item in cmds:
+        if type(item) is str:
+            queries.append(item)
+            converters.append(None)
+        else:
+            cmd, converter = item
+            queries.append(cmd)
+            converters.append(converter)
+    return queries, converters
+
+
+def convert_replies(converters, replies):
+    """
+    Convert the replies of query_many() with the functions from split_query_items()
+    """
+    return [convert(reply) if callable(convert) else reply
+            for convert, reply in zip(converters, replies)]
+
+
+def split_batches(query_strings, separator, max_batch, max_line_length):
+    """
+    Split query strings into batches of up to max_batch queries, and up to max_line_length
+    characters when joined with the separator
+    """
+    batches = []
+    batch = []
+    length = 0
+    for query_string in query_strings:
+        added_length = len(query_string) + (len(separator) if batch and separator else 0)
+        if batch and (len(batch) >= max_batch or
+                      (separator and length + added_length > max_line_length)):
+            batches.append(batch)
+            batch, added_length, length = [], len(query_string), 0
+        batch.append(query_string)
+        length += added_length
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class CommandFormat(object):
+    """
+    Termination character and command separator of text-based communication,
+    shared by Interface and AsyncTcpipInterface to write commands and split replies
+    in the same way
+    """
+
+    _term_char = TERM_CHAR
+    _cmd_separator = None  # separator to join multiple commands, e.g. ';' for SCPI
+
+    def set_term_char(self, ch):
+        """
+        Set termination character for text-based communication
+
+        Some instruments use the line-feed character, b'\\ n'
+        as termination character for the remote commands and the replies,
+        or others use the carriage return character, b'\\ r'.
+
+        :param bytes ch: termination character
+        """
+
+        if type(ch) is not bytes and type(ch) is not bytearray:
+            raise TypeError('term_char is not bytes')
+        self._term_char = ch
+
+    def get_term_char(self):
+        """
+        Get termination character for text-based communication
+
+        :rtype: bytes
+        """
+        return self._term_char
+
+    def set_cmd_separator(self, separator):
+        """
+        Set the separator used to join multiple remote commands into a single command
+
+        SCPI instruments accept multiple commands joined with ';' in a single line,
+        and return the replies of joined queries in a single line separated with ';'.
+        Set it to None, if the instrument does not support it.
+
+        :param str separator: command separator, or None
+        """
+        if separator is not None and type(separator) is not str:
+            raise TypeError('cmd_separator is not str')
+        self._cmd_separator = separator
+
+    def get_cmd_separator(self):
+        """
+        Get the separator used to join multiple remote commands
+
+        :rtype: str or None
+        """
+        return self._cmd_separator
+
+    def _encode_command(self, cmd):
+        """
+        Convert a command to bytes, with the termination character appended, if not included
+        """
+        byte_cmd = bytes(cmd, 'utf-8')
+        if self._term_char not in byte_cmd:
+            byte_cmd += self._term_char
+        return byte_cmd
+
+    def _encode_queries(self, queries):
+        """
+        Convert queries to bytes to write back-to-back, each with the termination character
+        """
+        return b''.join(bytes(cmd, 'utf-8') + self._term_char for cmd in queries)
 
+    def _split_reply(self, reply, count):
+        """
+        Split the reply of queries joined with the command separator
+
+        :param bytes reply: reply of the joined queries
+        :param int count: number of the queries
+        :return: list of reply strings, or None if the number of replies is not count,
+                 e.g. when a reply contains the separator
+        """
+        replies = [r.strip() for r in reply.decode(encoding='utf-8').strip().split(self._cmd_separator)]
+        if len(replies) != count:
+            return None
+        return replies
 
-class Interface(object):
+
+class Interface(CommandFormat):
     """
     Base class for communication interfaces to be used in Instrument class.
     A subclass should implement all the methods in the class
@@ -19,11 +242,16 @@ class Interface(object):
     def __init__(self):
         self.type = None
         self._term_char = TERM_CHAR
+        self._cmd_separator = None  # separator to join multiple commands, e.g. ';' for SCPI
         self._timeout = 10  # in second
         self._is_connected = False
         self._cmd_in_waiting = None  # query command waiting for reply
         self._endian = 'little'
-        self._lock = threading.Lock()  # Any comm activity should acquire and release this lock to be thread-safe
+        self._lock = PriorityLock()  # Any comm activity should acquire and release this lock to be thread-safe
+        self._io_worker = None  # IoWorker running all the I/O requests, if started with start_io_thread()
+        self._batches = {}  # thread ident: _BatchBuffer of batch() entered by the thread
+        self._metrics = None  # InterfaceMetrics, if enabled with enable_metrics()
+        self._shadow = None  # ShadowState, if enabled with enable_shadow()
         self.set_callbacks()
 
     def set_callbacks(self, queried=None, sent=None, recvd=None, connected=None, disconnected=None):
@@ -65,10 +293,220 @@ class Interface(object):
 
     def get_lock(self):
         """
-        Get the lock to secure exclusive access to the communication interface
+        Get the lock to secure exclusive access to the communication interface.
+
+        The lock is a :class:`PriorityLock <srsgui.inst.communications.prioritylock.PriorityLock>`.
+        When multiple threads are waiting, a thread with higher I/O priority acquires the lock first.
         """
         return self._lock
 
+    def enable_metrics(self, metrics=None):
+        """
+        Start recording latency, lock wait time, bytes transferred and errors
+        of each command mnemonic. See :mod:`srsgui.inst.communications.metrics`.
+
+        :param InterfaceMetrics metrics: metrics to continue recording into, or None for new metrics
+        """
+        if metrics is None:
+            metrics = InterfaceMetrics() if self._metrics is None else self._metrics
+        self._metrics = metrics
+
+    def disable_metrics(self):
+        """
+        Stop recording metrics and discard them
+        """
+        self._metrics = None
+
+    def is_metrics_enabled(self):
+        """
+        Check if metrics are recorded
+
+        :rtype: bool
+        """
+        return self._metrics is not None
+
+    def get_metrics_recorder(self):
+        """
+        Get the metrics being recorded, to pass to enable_metrics() of another interface
+        to continue recording, or None if not enabled
+
+        :rtype: InterfaceMetrics
+        """
+        return self._metrics
+
+    def get_metrics(self):
+        """
+        Get a snapshot of the metrics, with totals and the metrics of each command mnemonic
+        in 'commands', including count, errors, timeouts, bytes_out, bytes_in, mean_time,
+        p50_time, p99_time, max_time, lock_wait_time, wire_time and the latency histogram.
+
+            >>> comm.get_metrics()['commands']['FREQ?']['p99_time']
+            0.001
+
+        :return: dict of metrics, or None if not enabled
+        """
+        if self._metrics is None:
+            return None
+        return self._metrics.snapshot()
+
+    def reset_metrics(self):
+        """
+        Clear the metrics recorded so far
+        """
+        if self._metrics is not None:
+            self._metrics.reset()
+
+    def enable_shadow(self, ttl=None, shadow=None):
+        """
+        Start keeping the values of Command and IndexCommand queried or set, to answer
+        queries without the instrument and to skip redundant set commands.
+        See :mod:`srsgui.inst.communications.shadow`.
+
+        :param float ttl: seconds to keep a value. None to keep it until invalidated.
+        :param ShadowState shadow: shadow state to continue with, or None for a new one
+        """
+        if shadow is None:
+            shadow = ShadowState(ttl)
+        self._shadow = shadow
+
+    def disable_shadow(self):
+        """
+        Stop keeping the shadow state and discard it
+        """
+        self._shadow = None
+
+    def get_shadow(self):
+        """
+        Get the shadow state
+
+        :rtype: ShadowState or None, if not enabled
+        """
+        return self._shadow
+
+    def invalidate_shadow(self, cmd=None):
+        """
+        Invalidate the shadow values with the mnemonic of the command, or all the values,
+        e.g. after the instrument settings are changed from the front panel.
+
+        :param str cmd: remote command, e.g. 'FREQ', or None for all the values
+        """
+        if self._shadow is not None:
+            self._shadow.invalidate(cmd)
+
+    def _measure(self, cmd, bytes_out=0):
+        """
+        Get a Measurement context for an operation, which does nothing if metrics are disabled.
+        """
+        if self._metrics is None:
+            return NULL_MEASUREMENT
+        return Measurement(self._metrics, cmd, bytes_out)
+
+    def start_io_thread(self):
+        """
+        Start a dedicated I/O thread for the interface.
+
+        After the I/O thread starts, send(), recv(), query_text(), query_many(), read_block(),
+        query_block() and write_block() run in the I/O thread in the order of calls, and the calling thread
+        waits for the result. Methods with the '_future' suffix, such as send_future()
+        and query_text_future(), return a `concurrent.futures.Future` without waiting,
+        so that a task can overlap computation with outstanding I/O.
+        """
+        if self._io_worker is None:
+            self._io_worker = IoWorker('IoWorker-{}'.format(self.NAME))
+
+    def stop_io_thread(self):
+        """
+        Stop the I/O thread after finishing the requests in the queue
+        """
+        worker = self._io_worker
+        self._io_worker = None
+        if worker is not None:
+            worker.stop()
+
+    def is_io_thread_running(self):
+        """
+        Check if the I/O thread is started
+
+        :rtype: bool
+        """
+        return self._io_worker is not None
+
+    def get_queue_depth(self):
+        """
+        Get the number of requests waiting for the I/O thread
+
+        :rtype: int
+        """
+        if self._io_worker is None:
+            return 0
+        return self._io_worker.get_queue_depth()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Submit a function to run in the I/O thread.
+        If the I/O thread is not started, the function runs immediately in the calling thread.
+
+        :return: Future for the return value of the function
+        :rtype: concurrent.futures.Future
+        """
+        if self._io_worker is not None:
+            return self._io_worker.submit(func, *args, **kwargs)
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def send_future(self, cmd):
+        """
+        send() without waiting for completion
+
+        :rtype: concurrent.futures.Future
+        """
+        return self.submit(self.send, cmd)
+
+    def query_text_future(self, cmd):
+        """
+        query_text() without waiting for the reply
+
+        :rtype: concurrent.futures.Future
+        """
+        return self.submit(self.query_text, cmd)
+
+    def query_int_future(self, cmd):
+        """
+        query_int() without waiting for the reply
+
+        :rtype: concurrent.futures.Future
+        """
+        return self.submit(self.query_int, cmd)
+
+    def query_float_future(self, cmd):
+        """
+        query_float() without waiting for the reply
+
+        :rtype: concurrent.futures.Future
+        """
+        return self.submit(self.query_float, cmd)
+
+    def query_many_future(self, cmds):
+        """
+        query_many() without waiting for the replies
+
+        :rtype: concurrent.futures.Future
+        """
+        return self.submit(self.query_many, cmds)
+
+    def write_block_future(self, cmd, data, chunk_size=UPLOAD_CHUNK_SIZE, progress=None, cancel=None):
+        """
+        write_block() without waiting for completion. Use it with the I/O thread started,
+        to upload without blocking the calling thread.
+
+        :rtype: concurrent.futures.Future
+        """
+        return self.submit(self.write_block, cmd, data, chunk_size, progress, cancel)
+
     def connect(self, *args, **kwargs):
         """
         connect to the communication interface
@@ -98,28 +536,116 @@ class Interface(object):
         """
         raise NotImplementedError
 
-    def set_term_char(self, ch):
+    def batch(self, error_query=None, max_line_length=MAX_BATCH_LINE_LENGTH):
         """
-        Set termination character for text-based communication
+        Get a context manager to buffer commands sent with send(), including
+        sets of Command and IndexCommand, and write them in a single write.
 
-        Some instruments use the line-feed character, b'\\ n'
-        as termination character for the remote commands and the replies,
-        or others use the carriage return character, b'\\ r'.
+        The buffered commands are written when the outermost context exits,
+        or before any query, so that the instrument receives commands in the order sent.
+        Only commands of the thread that entered the context are buffered. Commands
+        of other threads are written as usual.
+        If the command separator is set, the commands are joined with the separator
+        into lines up to max_line_length. Otherwise, the commands are written back-to-back.
 
-        :param bytes ch: termination character
+            >>> with cg.comm.batch(error_query='LERR?'):
+            ...     cg.frequency = 1000.0
+            ...     cg.phase = 0.0
+            ...     cg.cmos.voltage['low'] = 0.0
+
+        :param str error_query: query sent once after writing the commands, to check
+                                if the reply starts with 0. InstSetError is raised otherwise.
+        :param int max_line_length: maximum length of a line of joined commands
+        :rtype: CommandBatch
         """
+        return CommandBatch(self, error_query, max_line_length)
 
-        if type(ch) is not bytes and type(ch) is not bytearray:
-            raise TypeError('term_char is not bytes')
-        self._term_char = ch
+    @run_in_io_thread
+    def is_batching(self):
+        """
+        Check if commands of the current thread are buffered in batch()
 
-    def get_term_char(self):
+        :rtype: bool
         """
-        Get termination character for text-based communication
+        return get_caller_ident() in self._batches
 
-        :rtype: bytes
+    @run_in_io_thread
+    def _begin_batch(self, max_line_length):
+        with self.get_lock():
+            ident = get_caller_ident()
+            batch = self._batches.get(ident)
+            if batch is None:
+                batch = self._batches[ident] = _BatchBuffer(max_line_length)
+            batch.depth += 1
+
+    @run_in_io_thread
+    def _end_batch(self):
+        with self.get_lock():
+            ident = get_caller_ident()
+            batch = self._batches[ident]
+            batch.depth -= 1
+            if batch.depth > 0:
+                return
+            try:
+                self._flush_batch()
+            finally:
+                del self._batches[ident]
+
+    @run_in_io_thread
+    def _write_batch(self):
+        with self.get_lock():
+            self._flush_batch()
+
+    def _flush_batch(self):
         """
-        return self._term_char
+        Write the commands buffered in batch() by the current thread without the lock.
+        """
+        batch = self._batches.get(get_caller_ident()) if self._batches else None
+        if batch is None or not batch.cmds:
+            return
+        cmds = batch.cmds
+        batch.cmds = []
+
+        term_char = self._term_char
+        byte_cmds = []
+        for cmd in cmds:
+            byte_cmd = bytes(cmd, 'utf-8')
+            if byte_cmd.endswith(term_char):
+                byte_cmd = byte_cmd[:-len(term_char)]
+            byte_cmds.append(byte_cmd)
+
+        data = bytearray()
+        if self._cmd_separator:
+            separator = bytes(self._cmd_separator, 'utf-8')
+            line_length = 0
+            for byte_cmd in byte_cmds:
+                if line_length and line_length + len(separator) + len(byte_cmd) > batch.max_line_length:
+                    data += term_char
+                    line_length = 0
+                if line_length:
+                    data += separator
+                    line_length += len(separator)
+                data += byte_cmd
+                line_length += len(byte_cmd)
+            data += term_char
+        else:
+            for byte_cmd in byte_cmds:
+                data += byte_cmd
+                data += term_char
+
+        with self._measure(BATCH_MNEMONIC, len(data)):
+            self._write_binary(data)
+        if self._send_callback:
+            for cmd in cmds:
+                self._send_callback('Sent cmd: {}'.format(cmd))
+
+    def _command_sent(self, cmd):
+        """
+        Invalidate the shadow values changed by a command line written, or buffered in batch(),
+        with the lock acquired. Every write of commands calls it, including queries.
+        """
+        if self._shadow is not None:
+            self._shadow.command_sent(cmd)
 
     def _send(self, cmd):
         """
@@ -142,6 +668,16 @@ class Interface(object):
         """
         raise NotImplementedError
 
+    def _write_buffers(self, buffers):
+        """
+        Write a sequence of buffers back-to-back without the lock. A subclass can override it
+        to write them with a single system call, such as socket.sendmsg().
+
+        :param buffers: list of bytes-like objects, such as bytes and memoryview
+        """
+        for buffer in buffers:
+            self._write_binary(buffer)
+
     def _recv(self):
         """
         Receive a reply up to the termination character over an interface without the lock.
@@ -159,6 +695,221 @@ class Interface(object):
         """
         raise NotImplementedError
 
+    def _read_binary_into(self, buffer):
+        """
+        Read bytes to fill a writable buffer regardless of termination character,
+        without the lock. A subclass can override it to read directly into the buffer
+        without intermediate copies.
+
+        :param buffer: writable object supporting the buffer protocol, such as bytearray or numpy array
+        """
+        view = memoryview(buffer).cast('B')
+        data = self._read_binary(len(view))
+        if len(data) != len(view):
+            raise InstTimeoutError('Timeout with {} of {} bytes read'.format(len(data), len(view)))
+        view[:] = data
+
+    def _read_block_header(self):
+        """
+        Read the header of an IEEE 488.2 definite length block, '#<N><length>', without the lock.
+        Any bytes before '#' are skipped.
+
+        :return: length of the data block in bytes
+        :rtype: int
+        """
+        while True:
+            ch = self._read_binary(1)
+            if ch == b'#':
+                break
+            if not ch:
+                raise InstTimeoutError('Timeout waiting for a binary block header')
+        num_digits = self._read_binary(1)
+        if not num_digits.isdigit() or num_digits == b'0':
+            raise InstCommunicationError('Invalid or indefinite length block header: #{}'.format(num_digits))
+        length = self._read_binary(int(num_digits))
+        if not length.isdigit():
+            raise InstCommunicationError('Invalid block header: #{}{}'.format(num_digits, length))
+        return int(length)
+
+    def _read_block(self, out=None, dtype='uint8', trailer=None):
+        """
+        Read an IEEE 488.2 definite length block without the lock. Use read_block instead.
+        """
+        import numpy as np
+
+        length = self._read_block_header()
+        dtype = np.dtype(dtype)
+        if trailer is None:
+            trailer = len(self._term_char)
+        if length % dtype.itemsize:
+            self._discard_block(length, trailer)
+            raise InstCommunicationError('Block length {} is not a multiple of {} item size'
+                                         .format(length, dtype))
+        count = length // dtype.itemsize
+        if out is None:
+            out = np.empty(count, dtype=dtype)
+        view = memoryview(out).cast('B')
+        if len(view) < length:
+            self._discard_block(length, trailer)
+            raise ValueError('Buffer of {} bytes is too small for the block of {} bytes'
+                             .format(len(view), length))
+        self._read_binary_into(view[:length])
+        if isinstance(trailer, (bytes, bytearray)):
+            ending = self._read_binary(len(trailer)) if trailer else b''
+            if ending != trailer:
+                raise InstCommunicationError('Invalid block ending: {} instead of {}'.format(ending, trailer))
+        elif trailer:
+            self._read_binary(trailer)
+        return np.frombuffer(out, dtype=dtype, count=count)
+
+    def _discard_block(self, length, trailer):
+        """
+        Read and discard the data of a block and the trailer after the header is read,
+        to leave no part of the block in the stream for the next reply
+        """
+        remaining = length + (len(trailer) if isinstance(trailer, (bytes, bytearray)) else trailer)
+        buffer = bytearray(min(remaining, UPLOAD_CHUNK_SIZE))
+        while remaining > 0:
+            size = min(remaining, len(buffer))
+            self._read_binary_into(memoryview(buffer)[:size])
+            remaining -= size
+
+    @run_in_io_thread
+    def read_block(self, out=None, dtype='uint8', trailer=None):
+        """
+        Read an IEEE 488.2 definite length block, '#<N><length><data>',
+        and return the data as a numpy array without intermediate copies.
+
+        The data is read directly into the out buffer, if given, or a new numpy array.
+        The returned array is a view of the buffer.
+
+        :param out: writable buffer, such as bytearray or numpy array, to reuse for the data
+        :param dtype: numpy dtype of the data, e.g. 'int8', '<i2', '>f4'
+        :param trailer: number of bytes to discard after the block, or bytes expected after the block,
+                        e.g. b'\\n\\n'. InstCommunicationError is raised if they do not match.
+                        The default is the length of the termination character.
+        :rtype: numpy.ndarray
+        """
+        with self._measure('read_block') as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
+            data = self._read_block(out, dtype, trailer)
+            m.bytes_in = data.nbytes
+            return data
+
+    @run_in_io_thread
+    def query_block(self, cmd, out=None, dtype='uint8', trailer=None):
+        """
+        Send a remote command and read an IEEE 488.2 definite length block reply
+        with the lock acquired. See read_block() for the parameters.
+
+            >>> comm.query_block('C1:WF? DAT2', dtype='int8', trailer=2)
+            array([ 3,  4,  4, ..., -2, -1,  0], dtype=int8)
+
+        :param str cmd: remote command
+        :rtype: numpy.ndarray
+        """
+        with self._measure(cmd, len(cmd) + len(self._term_char)) as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
+            self._cmd_in_waiting = cmd
+            self._command_sent(cmd)
+            self._send(cmd)
+            data = self._read_block(out, dtype, trailer)
+            self._cmd_in_waiting = None
+            m.bytes_in = data.nbytes
+            return data
+
+    @staticmethod
+    def _get_block_source(data, chunk_size):
+        """
+        Get the length of the data to upload, and an iterator of memoryviews of its chunks.
+        Bytes-like objects are sliced without copies, and a file object is read chunk by chunk
+        into a reused buffer.
+        """
+        if hasattr(data, 'readinto') or hasattr(data, 'read'):
+            try:
+                length = os.fstat(data.fileno()).st_size - data.tell()
+            except (AttributeError, OSError, ValueError):
+                position = data.tell()
+                length = data.seek(0, os.SEEK_END) - position
+                data.seek(position)
+
+            def read_chunks():
+                buffer = bytearray(min(chunk_size, length))
+                view = memoryview(buffer)
+                remaining = length
+                while remaining > 0:
+                    size = min(chunk_size, remaining)
+                    if hasattr(data, 'readinto'):
+                        n = data.readinto(view[:size])
+                    else:
+                        chunk = data.read(size)
+                        n = len(chunk)
+                        view[:n] = chunk
+                    if not n:
+                        raise InstCommunicationError('File ended with {} bytes left to upload'.format(remaining))
+                    remaining -= n
+                    yield view[:n]
+            return length, read_chunks()
+
+        view = memoryview(data).cast('B')
+        length = len(view)
+        return length, (view[i:i + chunk_size] for i in range(0, length, chunk_size))
+
+    @run_in_io_thread
+    def write_block(self, cmd, data, chunk_size=UPLOAD_CHUNK_SIZE, progress=None, cancel=None):
+        """
+        Send a remote command followed by data in an IEEE 488.2 definite length block,
+        '#<N><length><data>', and the termination character, with the lock acquired.
+
+        The data is written in chunks without making a copy of the whole data, e.g.
+        an arbitrary waveform or a firmware image. The interface is locked for the whole upload,
+        so call it from a task, or use write_block_future() with the I/O thread started,
+        to keep the GUI responsive.
+
+            >>> comm.write_block('TRAC:DATA ', waveform.astype('<i2'), progress=print)
+
+        :param str cmd: remote command preceding the block, including any separator before the block
+        :param data: bytes-like object, such as bytes, memoryview or C-contiguous numpy array,
+                     or a binary file object opened for reading, uploaded from the current position
+        :param int chunk_size: number of bytes written at a time
+        :param progress: function called with the number of bytes written and the total after each chunk
+        :param cancel: threading.Event, or a function returning True, to stop the upload between chunks
+        :raises InstCommunicationError: if cancelled. The instrument may wait for the rest of the block,
+                                        and need a device clear.
+        """
+        if chunk_size <= 0:
+            raise ValueError('Invalid chunk size: {}'.format(chunk_size))
+        length, chunks = self._get_block_source(data, chunk_size)
+        length_digits = str(length)
+        header = bytes(cmd, 'utf-8') + b'#' + bytes(str(len(length_digits)), 'ascii') + \
+            bytes(length_digits, 'ascii')
+        is_cancelled = getattr(cancel, 'is_set', cancel)
+
+        with self._measure(cmd, len(header) + length + len(self._term_char)) as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
+            self._command_sent(cmd)
+            written = 0
+            pending = [header]
+            for chunk in chunks:
+                if is_cancelled is not None and is_cancelled():
+                    raise InstCommunicationError('Upload cancelled after {} of {} bytes'.format(written, length))
+                pending.append(chunk)
+                if written + len(chunk) == length:
+                    pending.append(self._term_char)
+                self._write_buffers(pending)
+                written += len(chunk)
+                pending = []
+                if progress is not None:
+                    progress(written, length)
+            if pending:  # Empty block
+                pending.append(self._term_char)
+                self._write_buffers(pending)
+        if self._send_callback:
+            self._send_callback('Sent cmd: {} with a block of {} bytes'.format(cmd, length))
+
     def _read_long(self):
         """
         Read 4 bytes from the communication interface and convert it to signed long
@@ -169,6 +920,7 @@ class Interface(object):
         value = int.from_bytes(data, self._endian, signed=True)
         return value
 
+    @run_in_io_thread
     def send(self, cmd):
         """
         Send a remote command to the instrument
@@ -177,13 +929,23 @@ class Interface(object):
         it will attach one at the end of the cmd string,
         and convert the string to a byte array before sending
 
+        In batch(), the command is buffered to be written later.
+
         :param str cmd: remote command to send
         """
-        with self.get_lock():
+        with self._measure(cmd, len(cmd) + len(self._term_char)) as m, self.get_lock():
+            m.lock_acquired()
+            self._command_sent(cmd)
+            batch = self._batches.get(get_caller_ident()) if self._batches else None
+            if batch is not None:
+                batch.cmds.append(cmd)
+                m.cancel()  # recorded when the batch is written
+                return
             self._send(cmd)
             if self._send_callback:
                 self._send_callback('Sent cmd: {}'.format(cmd))
 
+    @run_in_io_thread
     def recv(self):
         """
         Receive a byte array until a termination character and convert to a string
@@ -192,12 +954,34 @@ class Interface(object):
         :rtype: str
         """
 
-        with self.get_lock():
+        with self._measure('recv') as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
             reply = self._recv()
+            m.bytes_in = len(reply)
             if self._recv_callback:
                 self._recv_callback('Received reply: {}'.format(reply))
             return reply
 
+    def _query(self, cmd):
+        """
+        Send a remote command and receive a reply without the lock.
+        This is a protected method that a user should not call directly,
+        because it is not thread-safe. Use query_text instead.
+
+        :param str cmd: remote command
+        :return: bytes. It should be converted to string explicitly
+        """
+        self._cmd_in_waiting = cmd
+        self._command_sent(cmd)
+        self._send(cmd)
+        reply = self._recv()
+        if reply == b'':
+            raise InstTimeoutError("Cmd '{}' timeout".format(cmd))
+        self._cmd_in_waiting = None
+        return reply
+
+    @run_in_io_thread
     def query_text(self, cmd):
         """
         Send a remote command and receive a reply with the lock acquired
@@ -205,7 +989,175 @@ class Interface(object):
         :param str cmd: remote command
         :rtype: str
         """
-        raise NotImplementedError
+        with self._measure(cmd, len(cmd) + len(self._term_char)) as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
+            reply = self._query(cmd)
+            m.bytes_in = len(reply)
+        decoded_reply = reply.decode(encoding='utf-8').strip()  # returns a string not bytes
+        if self._query_callback:
+            self._query_callback('Queried Cmd: {} Reply: {}'.format(cmd, decoded_reply))
+        return decoded_reply
+
+    @run_in_io_thread
+    def query_many(self, cmds):
+        """
+        Send multiple queries in a single write and return the replies in order,
+        with the lock acquired only once.
+
+        If the command separator is set with set_cmd_separator(), the queries are joined
+        with the separator into a single command, and the reply is split with the separator.
+        Otherwise, the queries are written back-to-back, and the replies are read one by one.
+
+        An item in cmds is either a remote command string, or a tuple of a remote command
+        and a function to convert the reply string, such as int or float.
+
+            >>> comm.query_many(['*IDN?', ('FREQ?', float), ('PHAS?', float)])
+            ['Stanford Research Systems,CG635,s/n001234,ver1.0', 1000.0, 0.0]
+
+        :param list cmds: list of remote commands, or tuples of a remote command and a function
+        :return: list of replies converted with the functions
+        """
+        queries, converters = split_query_items(cmds)
+        if not queries:
+            return []
+
+        with self._measure_queries(queries) as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
+            replies = self._query_together(queries, m)
+            if replies is None:
+                # A reply contains the separator, e.g. a string value. Query one by one.
+                replies = []
+                for cmd in queries:
+                    reply = self._query(cmd)
+                    m.bytes_in += len(reply)
+                    replies.append(reply.decode(encoding='utf-8').strip())
+
+        if self._query_callback:
+            for cmd, reply in zip(queries, replies):
+                self._query_callback('Queried Cmd: {} Reply: {}'.format(cmd, reply))
+        return convert_replies(converters, replies)
+
+    def _measure_queries(self, queries):
+        """
+        Get a Measurement context for queries written together
+        """
+        if self._metrics is None:
+            return NULL_MEASUREMENT
+        mnemonic = ';'.join(get_mnemonic(cmd) for cmd in queries)
+        bytes_out = sum(len(cmd) + len(self._term_char) for cmd in queries)
+        return self._measure(mnemonic, bytes_out)
+
+    def _query_together(self, queries, measurement):
+        """
+        Write queries together and read the replies without the lock.
+
+        :return: list of reply strings, or None if the queries are joined with the separator,
+                 and the reply does not split into as many replies
+        """
+        if self._cmd_separator:
+            reply = self._query(self._cmd_separator.join(queries))
+            measurement.bytes_in = len(reply)
+            return self._split_reply(reply, len(queries))
+
+        self._cmd_in_waiting = queries[0]
+        for cmd in queries:
+            self._command_sent(cmd)
+        self._write_binary(self._encode_queries(queries))
+        replies = []
+        for cmd in queries:
+            self._cmd_in_waiting = cmd
+            reply = self._recv()
+            if reply == b'':
+                raise InstTimeoutError("Cmd '{}' timeout".format(cmd))
+            measurement.bytes_in += len(reply)
+            replies.append(reply.decode(encoding='utf-8').strip())
+        self._cmd_in_waiting = None
+        return replies
+
+    def _query_batch(self, queries):
+        """
+        Query a batch of run_queries() together with the lock acquired once,
+        without falling back to queries one by one
+
+        :return: list of reply strings, or None if the replies do not match the queries
+        """
+        with self._measure_queries(queries) as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
+            replies = self._query_together(queries, m)
+        if replies is not None and self._query_callback:
+            for cmd, reply in zip(queries, replies):
+                self._query_callback('Queried Cmd: {} Reply: {}'.format(cmd, reply))
+        return replies
+
+    @run_in_io_thread
+    def run_queries(self, query_strings, max_batch=MAX_BATCH_QUERIES, max_line_length=MAX_BATCH_LINE_LENGTH):
+        """
+        Run many queries in batches written together, and return the reply or the error of each query.
+
+        Unlike query_many(), a failing query does not fail the others. If a batch fails,
+        e.g. with an invalid query in it, the queries in the batch are run one by one
+        to find the failing ones.
+
+        :param list query_strings: remote commands to query
+        :param int max_batch: maximum number of queries written together
+        :param int max_line_length: maximum length of queries joined with the command separator
+        :return: list of tuples of (reply, exception), with None for the reply of a failed query
+        """
+        results = []
+        for batch in split_batches(query_strings, self._cmd_separator, max_batch, max_line_length):
+            replies = None
+            if len(batch) > 1:
+                try:
+                    replies = self._query_batch(batch)
+                except InstCommunicationError:
+                    pass
+            if replies is not None:
+                results.extend((reply, None) for reply in replies)
+                continue
+            for query_string in batch:
+                try:
+                    results.append((self.query_text(query_string), None))
+                except InstCommunicationError as e:
+                    results.append((None, e))
+        return results
+
+    @run_in_io_thread
+    def query_floats(self, cmd, separator=',', dtype='float64'):
+        """
+        Query a remote command returning a list of numbers, e.g. an ASCII trace,
+        and parse the reply directly into a numpy array.
+
+            >>> comm.query_floats('TRAC? 1')
+            array([0.012, 0.013, ..., 0.011])
+
+        :param str cmd: remote command
+        :param str separator: separator between numbers. ' ' matches any whitespace.
+        :param dtype: numpy dtype of the array
+        :rtype: numpy.ndarray
+        """
+        with self._measure(cmd, len(cmd) + len(self._term_char)) as m, self.get_lock():
+            m.lock_acquired()
+            self._flush_batch()
+            reply = self._query(cmd)
+            m.bytes_in = len(reply)
+        if self._query_callback:
+            self._query_callback('Queried Cmd: {} Reply: {} bytes'.format(cmd, len(reply)))
+        try:
+            return parse_numbers(reply, dtype, separator)
+        except ValueError as e:
+            raise InstQueryError("Invalid reply to '{}': {}".format(cmd, e))
+
+    def query_ints(self, cmd, separator=',', dtype='int64'):
+        """
+        Query a remote command returning a list of integers, and parse the reply
+        directly into a numpy array. See query_floats().
+
+        :rtype: numpy.ndarray
+        """
+        return self.query_floats(cmd, separator, dtype)
 
     def query_int(self, cmd):
         """
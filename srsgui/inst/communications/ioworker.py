@@ -0,0 +1,106 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+import queue
+import functools
+import threading
+from concurrent.futures import Future
+
+from .prioritylock import get_thread_priority, set_thread_priority
+
+_request = threading.local()  # ident of the thread that submitted the request running in a worker thread
+
+
+def get_caller_ident():
+    """
+    Get the identifier of the thread making an I/O request: the thread that submitted
+    the request running in an I/O thread, or the current thread otherwise
+
+    :rtype: int
+    """
+    return getattr(_request, 'caller_ident', None) or threading.get_ident()
+
+
+class IoWorker(object):
+    """
+    Thread to run I/O requests of an interface one by one in the order of submission.
+
+    A request is submitted with a function and its arguments, and the result is
+    available from the returned `concurrent.futures.Future
+    <https://docs.python.org/3/library/concurrent.futures.html#future-objects>`_ object.
+    A request runs with the I/O priority of the thread that submitted it, and
+    get_caller_ident() in the request returns the identifier of the thread.
+    """
+
+    def __init__(self, name='IoWorker'):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                break
+            future, priority, caller_ident, func, args, kwargs = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            set_thread_priority(priority)
+            _request.caller_ident = caller_ident
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Submit a function to run in the worker thread
+
+        :return: Future for the return value of the function
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        self._queue.put((future, get_thread_priority(), get_caller_ident(), func, args, kwargs))
+        return future
+
+    def in_worker_thread(self):
+        """
+        Check if the current thread is the worker thread
+
+        :rtype: bool
+        """
+        return threading.current_thread() is self._thread
+
+    def get_queue_depth(self):
+        """
+        Get the number of requests waiting in the queue
+
+        :rtype: int
+        """
+        return self._queue.qsize()
+
+    def stop(self, timeout=None):
+        """
+        Stop the worker thread after running the requests already in the queue
+        """
+        self._queue.put(None)
+        if not self.in_worker_thread():
+            self._thread.join(timeout)
+
+
+def run_in_io_thread(method):
+    """
+    Decorator for an Interface method to run in the I/O thread of the interface,
+    if the I/O thread is started, and wait for the result.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        worker = self._io_worker
+        if worker is None or worker.in_worker_thread():
+            return method(self, *args, **kwargs)
+        return worker.submit(method, self, *args, **kwargs).result()
+    return wrapper
@@ -0,0 +1,240 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Find instruments on the local network.
+
+Hosts are scanned with non-blocking connects on the given TCP ports, hundreds of
+sockets at a time, so that a /24 subnet is swept in about the connect timeout,
+instead of waiting for a failed connect per host. The ID query command is sent to
+every port that accepted the connection, and the replies are matched with
+_IdString of Instrument subclasses, the same way as Instrument.check_id() does.
+
+    >>> from srsgui.inst.communications.lan_discovery import find_instruments
+    >>> find_instruments('192.168.1.0/24', [CG635, SR860])
+    [DiscoveredInstrument(ip_address='192.168.1.10', port=5025,
+                          id_string='Stanford Research Systems,CG635,s/n001234,ver1.03',
+                          instrument_class=<class 'CG635'>)]
+
+Hosts can be given as a network in CIDR notation, a range in the last octet,
+e.g. '192.168.1.10-40', a single address, or a list of them.
+"""
+
+import re
+import time
+import errno
+import socket
+import selectors
+import ipaddress
+from collections import namedtuple
+
+DEFAULT_PORTS = (5025, 23, 818)  # SCPI raw socket, TELNET, SRS RGA
+CONNECT_TIMEOUT = 0.5  # seconds to wait for connects
+QUERY_TIMEOUT = 0.5  # seconds to wait for replies to the ID query
+MAX_SOCKETS = 512  # sockets open at a time, below the usual limit of 1024 file descriptors
+
+DiscoveredInstrument = namedtuple('DiscoveredInstrument',
+                                  ['ip_address', 'port', 'id_string', 'instrument_class'])
+DiscoveredInstrument.__doc__ = """
+Instrument found with find_instruments(). instrument_class is None,
+if the reply does not match any of the given Instrument subclasses.
+"""
+
+
+def expand_hosts(hosts):
+    """
+    Expand a host specification to a list of IP address strings
+
+    :param hosts: a network in CIDR notation, e.g. '192.168.1.0/24',
+                  a range in the last octet, e.g. '192.168.1.10-40', an address,
+                  or a list of them
+    :rtype: list of str
+    """
+    if isinstance(hosts, str):
+        hosts = [hosts]
+    addresses = []
+    for host in hosts:
+        host = str(host).strip()
+        if '/' in host:
+            network = ipaddress.ip_network(host, strict=False)
+            addresses.extend(str(address) for address in network.hosts())
+        elif '-' in host:
+            first, last = host.rsplit('-', 1)
+            first_address = ipaddress.ip_address(first.strip())
+            prefix = str(first_address).rsplit('.', 1)[0]
+            start = int(str(first_address).rsplit('.', 1)[1])
+            for octet in range(start, int(last) + 1):
+                addresses.append(str(ipaddress.ip_address('{}.{}'.format(prefix, octet))))
+        else:
+            addresses.append(str(ipaddress.ip_address(host)))
+    return addresses
+
+
+def get_local_network(prefix_length=24):
+    """
+    Get the network of the local address used for the default route, e.g. '192.168.1.0/24'.
+    No packet is sent to find the address.
+
+    :rtype: str or None, if no network is available
+    """
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(('10.255.255.255', 1))
+        address = s.getsockname()[0]
+    except OSError:
+        return None
+    finally:
+        s.close()
+    if address.startswith('127.') or address == '0.0.0.0':
+        return None
+    return str(ipaddress.ip_network('{}/{}'.format(address, prefix_length), strict=False))
+
+
+def _connect_all(targets, timeout):
+    """
+    Start non-blocking connects to all the targets, and wait until the timeout
+
+    :return: list of ((ip_address, port), socket) connected
+    """
+    selector = selectors.DefaultSelector()
+    connected = []
+    try:
+        for target in targets:
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.setblocking(False)
+            error = s.connect_ex(target)
+            if error == 0:
+                connected.append((target, s))
+            elif error in (errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, 'WSAEWOULDBLOCK', -1)):
+                selector.register(s, selectors.EVENT_WRITE, target)
+            else:
+                s.close()
+
+        deadline = time.monotonic() + timeout
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for key, _ in selector.select(remaining):
+                selector.unregister(key.fileobj)
+                s = key.fileobj
+                if s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                    connected.append((key.data, s))
+                else:
+                    s.close()
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
+    return connected
+
+
+def _query_all(connections, query, term_char, timeout):
+    """
+    Send the query to all the connected sockets, and read replies up to the termination
+    character until the timeout
+
+    :return: dict of (ip_address, port): reply string
+    """
+    selector = selectors.DefaultSelector()
+    replies = {}
+    buffers = {}
+    try:
+        for target, s in connections:
+            try:
+                s.sendall(query)
+            except OSError:
+                s.close()
+                continue
+            buffers[target] = bytearray()
+            selector.register(s, selectors.EVENT_READ, target)
+
+        deadline = time.monotonic() + timeout
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for key, _ in selector.select(remaining):
+                target = key.data
+                try:
+                    data = key.fileobj.recv(4096)
+                except OSError:
+                    data = b''
+                buffers[target] += data
+                if not data or term_char in buffers[target]:
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
+
+    for target, data in buffers.items():
+        reply = data.split(term_char, 1)[0]
+        # Drop TELNET negotiation and other non-printable bytes
+        reply = re.sub(rb'\xff[\xfb-\xfe].|\xff.', b'', bytes(reply), flags=re.DOTALL)
+        replies[target] = reply.decode('ascii', errors='ignore').strip()
+    return replies
+
+
+def match_instrument_class(id_string, instrument_classes):
+    """
+    Find the first instrument class whose _IdString is found in the ID string
+
+    :rtype: a subclass of Instrument, or None
+    """
+    if not id_string:
+        return None
+    for cls in instrument_classes:
+        if re.search(cls._IdString, id_string):
+            return cls
+    return None
+
+
+def find_instruments(hosts=None, instrument_classes=(), ports=DEFAULT_PORTS,
+                     connect_timeout=CONNECT_TIMEOUT, query_timeout=QUERY_TIMEOUT,
+                     id_query_cmd=None, term_char=b'\n', matched_only=False):
+    """
+    Find instruments on the network with concurrent connects and ID queries
+
+    :param hosts: hosts to scan, as in expand_hosts(). The local /24 network, if None
+    :param instrument_classes: Instrument subclasses to match with the ID strings
+    :param ports: TCP ports to connect to
+    :param float connect_timeout: seconds to wait for connects
+    :param float query_timeout: seconds to wait for replies to the ID query
+    :param str id_query_cmd: ID query command. id_query_cmd of the first instrument class,
+                             or '*IDN?', if None
+    :param bytes term_char: termination character of the query and replies
+    :param bool matched_only: return only the instruments matching one of instrument_classes
+    :return: list of DiscoveredInstrument sorted by address and port
+    """
+    if hosts is None:
+        hosts = get_local_network()
+        if hosts is None:
+            return []
+    if id_query_cmd is None:
+        id_query_cmd = instrument_classes[0].id_query_cmd if instrument_classes else '*IDN?'
+    query = bytes(id_query_cmd, 'utf-8') + term_char
+
+    targets = [(address, int(port)) for address in expand_hosts(hosts) for port in ports]
+    found = []
+    for i in range(0, len(targets), MAX_SOCKETS):
+        connections = _connect_all(targets[i:i + MAX_SOCKETS], connect_timeout)
+        if not connections:
+            continue
+        replies = _query_all(connections, query, term_char, query_timeout)
+        for (address, port), id_string in replies.items():
+            cls = match_instrument_class(id_string, instrument_classes)
+            if matched_only and cls is None:
+                continue
+            found.append(DiscoveredInstrument(address, port, id_string, cls))
+    found.sort(key=lambda d: (ipaddress.ip_address(d.ip_address), d.port))
+    return found
+
+
+if __name__ == '__main__':
+    import sys
+    for item in find_instruments(sys.argv[1] if len(sys.argv) > 1 else None):
+        print('{}:{}  {}'.format(item.ip_address, item.port, item.id_string))
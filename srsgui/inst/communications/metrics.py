@@ -0,0 +1,249 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Latency and throughput metrics of a communication interface, keyed with command mnemonics.
+
+Metrics are disabled by default, and cost a method call per I/O operation when disabled.
+
+    >>> cg.comm.enable_metrics()
+    >>> cg.frequency, cg.phase
+    >>> cg.comm.get_metrics()['commands']['FREQ?']['mean_time']
+    0.00052
+
+A mnemonic is the first word of a command, e.g. 'PARAM?' for 'PARAM? 1'.
+The time of an operation is split into the lock wait time, waiting for other threads
+using the interface, and the wire time, spent in writing the command and reading the reply.
+"""
+
+import time
+import socket
+import bisect
+import threading
+import concurrent.futures
+
+from srsgui.inst.exceptions import InstTimeoutError
+
+LATENCY_BUCKETS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+                   0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)
+"""Upper bounds of the latency histogram buckets in seconds. The last bucket is unbounded."""
+
+BATCH_MNEMONIC = '(batch)'
+"""Mnemonic used for commands written together from a batch"""
+
+TIMEOUT_ERRORS = (InstTimeoutError, socket.timeout, TimeoutError, concurrent.futures.TimeoutError)
+"""Exception types counted as timeouts"""
+
+
+def get_mnemonic(cmd):
+    """
+    Get the mnemonic of a command, e.g. 'PARAM?' from 'PARAM? 1'
+    """
+    words = cmd.split(None, 1)
+    return words[0] if words else ''
+
+
+class CommandMetrics(object):
+    """
+    Metrics of a command mnemonic
+    """
+    __slots__ = ('count', 'errors', 'timeouts', 'bytes_out', 'bytes_in',
+                 'total_time', 'lock_wait_time', 'min_time', 'max_time', 'histogram')
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.total_time = 0.0
+        self.lock_wait_time = 0.0
+        self.min_time = float('inf')
+        self.max_time = 0.0
+        self.histogram = [0] * (bucket_count + 1)
+
+    def get_percentile(self, percent, buckets):
+        """
+        Estimate a percentile of latency with the upper bound of the histogram bucket containing it
+        """
+        if self.count == 0:
+            return 0.0
+        target = self.count * percent / 100.0
+        accumulated = 0
+        for i, count in enumerate(self.histogram):
+            accumulated += count
+            if accumulated >= target:
+                return buckets[i] if i < len(buckets) else self.max_time
+        return self.max_time
+
+    def to_dict(self, buckets):
+        count = self.count
+        return {
+            'count': count,
+            'errors': self.errors,
+            'timeouts': self.timeouts,
+            'bytes_out': self.bytes_out,
+            'bytes_in': self.bytes_in,
+            'total_time': self.total_time,
+            'lock_wait_time': self.lock_wait_time,
+            'wire_time': self.total_time - self.lock_wait_time,
+            'mean_time': self.total_time / count if count else 0.0,
+            'min_time': self.min_time if count else 0.0,
+            'max_time': self.max_time,
+            'p50_time': self.get_percentile(50, buckets),
+            'p99_time': self.get_percentile(99, buckets),
+            'histogram': list(zip(list(buckets) + [float('inf')], self.histogram)),
+        }
+
+
+class InterfaceMetrics(object):
+    """
+    Metrics of an interface, recorded with Measurement
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._commands = {}
+        self._start_time = time.time()
+
+    def record(self, cmd, elapsed, lock_wait, bytes_out=0, bytes_in=0, error=None):
+        """
+        Record an I/O operation of a command
+
+        :param str cmd: command, or a mnemonic
+        :param float elapsed: seconds from the start of the operation to the end
+        :param float lock_wait: seconds waited for the lock
+        :param int bytes_out: number of bytes written
+        :param int bytes_in: number of bytes read
+        :param Exception error: exception raised during the operation, if any
+        """
+        mnemonic = get_mnemonic(cmd)
+        with self._lock:
+            stats = self._commands.get(mnemonic)
+            if stats is None:
+                stats = self._commands[mnemonic] = CommandMetrics(len(self.buckets))
+            stats.count += 1
+            stats.bytes_out += bytes_out
+            stats.bytes_in += bytes_in
+            stats.total_time += elapsed
+            stats.lock_wait_time += lock_wait
+            if elapsed < stats.min_time:
+                stats.min_time = elapsed
+            if elapsed > stats.max_time:
+                stats.max_time = elapsed
+            stats.histogram[bisect.bisect_left(self.buckets, elapsed)] += 1
+            if error is not None:
+                stats.errors += 1
+                if isinstance(error, TIMEOUT_ERRORS):
+                    stats.timeouts += 1
+
+    def snapshot(self):
+        """
+        Get the metrics as a dict, with totals over all the commands,
+        and the metrics of each command mnemonic in 'commands'
+
+        :rtype: dict
+        """
+        with self._lock:
+            commands = {mnemonic: stats.to_dict(self.buckets)
+                        for mnemonic, stats in self._commands.items()}
+        totals = {}
+        for key in ('count', 'errors', 'timeouts', 'bytes_out', 'bytes_in',
+                    'total_time', 'lock_wait_time', 'wire_time'):
+            totals[key] = sum(stats[key] for stats in commands.values())
+        totals['duration'] = time.time() - self._start_time
+        totals['commands'] = commands
+        return totals
+
+    def summary(self, slowest=5):
+        """
+        Get a short summary of the commands with the longest mean time
+
+        :param int slowest: number of commands to include
+        :rtype: dict
+        """
+        with self._lock:
+            items = [(stats.total_time / stats.count, mnemonic, stats)
+                     for mnemonic, stats in self._commands.items() if stats.count]
+        items.sort(reverse=True)
+        return {mnemonic: {'count': stats.count,
+                           'mean_ms': round(mean_time * 1000, 3),
+                           'max_ms': round(stats.max_time * 1000, 3),
+                           'errors': stats.errors}
+                for mean_time, mnemonic, stats in items[:slowest]}
+
+    def reset(self):
+        """
+        Clear all the metrics
+        """
+        with self._lock:
+            self._commands = {}
+            self._start_time = time.time()
+
+
+class Measurement(object):
+    """
+    Context manager to measure an I/O operation of a command.
+    Call lock_acquired() right after acquiring the interface lock,
+    and set bytes_in after reading a reply. An exception raised in the context
+    is counted as an error.
+    """
+    __slots__ = ('metrics', 'cmd', 'bytes_out', 'bytes_in', 'start', 'lock_time')
+
+    def __init__(self, metrics, cmd, bytes_out=0):
+        self.metrics = metrics
+        self.cmd = cmd
+        self.bytes_out = bytes_out
+        self.bytes_in = 0
+        self.start = 0.0
+        self.lock_time = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def lock_acquired(self):
+        self.lock_time = time.perf_counter()
+
+    def cancel(self):
+        """
+        Do not record the operation
+        """
+        self.metrics = None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.metrics is None:
+            return
+        end = time.perf_counter()
+        lock_wait = 0.0 if self.lock_time is None else self.lock_time - self.start
+        self.metrics.record(self.cmd, end - self.start, lock_wait,
+                            self.bytes_out, self.bytes_in, exc_value)
+
+
+class NullMeasurement(object):
+    """
+    Measurement used when metrics are disabled. It does nothing.
+    """
+    bytes_out = 0
+    bytes_in = 0
+
+    def __enter__(self):
+        return self
+
+    def lock_acquired(self):
+        pass
+
+    def cancel(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_MEASUREMENT = NullMeasurement()
@@ -0,0 +1,243 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Lock granting access to a communication interface in the order of priority.
+
+When the interface is busy, a thread waiting with a higher priority acquires the lock
+before threads waiting with lower priorities, and threads with the same priority
+acquire the lock in the order of arrival. A running task uses PRIORITY_TASK,
+the GUI terminal and control panel use PRIORITY_INTERACTIVE, and periodic polling
+uses PRIORITY_BACKGROUND. Lower priorities can be paused while a time-critical
+loop runs.
+
+The priority of a thread is set with set_thread_priority(), or temporarily with io_priority().
+
+    >>> with io_priority(PRIORITY_BACKGROUND):
+    ...     value = inst.frequency
+"""
+
+import time
+import heapq
+import itertools
+import threading
+
+PRIORITY_BACKGROUND = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_TASK = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_BACKGROUND: 'background',
+    PRIORITY_INTERACTIVE: 'interactive',
+    PRIORITY_TASK: 'task',
+}
+
+_local = threading.local()
+
+
+def set_thread_priority(priority):
+    """
+    Set the I/O priority of the current thread
+
+    :param int priority: PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE or PRIORITY_TASK
+    """
+    _local.priority = priority
+
+
+def get_thread_priority():
+    """
+    Get the I/O priority of the current thread. The default is PRIORITY_INTERACTIVE.
+
+    :rtype: int
+    """
+    return getattr(_local, 'priority', PRIORITY_INTERACTIVE)
+
+
+class io_priority(object):
+    """
+    Context manager to set the I/O priority of the current thread temporarily
+    """
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.old_priority = None
+
+    def __enter__(self):
+        self.old_priority = get_thread_priority()
+        set_thread_priority(self.priority)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        set_thread_priority(self.old_priority)
+
+
+class PriorityLock(object):
+    """
+    Lock with priority classes, used in place of threading.Lock in Interface.
+    It records wait-time statistics for each priority.
+
+    When the lock is released, it is handed over directly to the waiting thread
+    with the highest priority, without waking up the other waiting threads.
+    The thread holding the lock can acquire it again, as with threading.RLock,
+    and it is released when released as many times as acquired.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()  # protects the state below
+        self._locked = False
+        self._owner = None  # ident of the thread holding the lock
+        self._depth = 0  # number of times acquired by the owner
+        self._waiters = []  # heap of [-priority, arrival order, lock to wake up, start time, granted, ident]
+        self._order = itertools.count()
+        self._pause_levels = []  # priorities lower than the max level are paused
+        self._stats = {}
+
+    def _is_allowed(self, priority):
+        return not self._pause_levels or priority >= max(self._pause_levels)
+
+    def _record_wait(self, priority, wait_time):
+        stats = self._stats.get(priority)
+        if stats is None:
+            stats = self._stats[priority] = [0, 0.0, 0.0]  # count, total wait, max wait
+        stats[0] += 1
+        stats[1] += wait_time
+        if wait_time > stats[2]:
+            stats[2] = wait_time
+
+    def _hand_over(self):
+        """
+        Give the lock to the waiter with the highest priority, if allowed. Call with the mutex.
+        """
+        if self._waiters and self._is_allowed(-self._waiters[0][0]):
+            waiter = heapq.heappop(self._waiters)
+            waiter[4] = True
+            self._locked = True
+            self._owner = waiter[5]
+            self._depth = 1
+            self._record_wait(-waiter[0], time.perf_counter() - waiter[3])
+            waiter[2].release()
+        else:
+            self._locked = False
+            self._owner = None
+            self._depth = 0
+
+    def acquire(self, blocking=True, timeout=-1, priority=None):
+        """
+        Acquire the lock
+
+        :param bool blocking: wait for the lock, if True
+        :param float timeout: seconds to wait, -1 to wait forever
+        :param int priority: priority to use instead of the priority of the current thread
+        :return: True if acquired
+        """
+        if priority is None:
+            priority = get_thread_priority()
+        ident = threading.get_ident()
+        with self._mutex:
+            if self._locked and self._owner == ident:
+                self._depth += 1
+                return True
+            if not self._locked and not self._waiters and self._is_allowed(priority):
+                self._locked = True
+                self._owner = ident
+                self._depth = 1
+                self._record_wait(priority, 0.0)
+                return True
+            if not blocking:
+                return False
+            wake_up = threading.Lock()
+            wake_up.acquire()
+            waiter = [-priority, next(self._order), wake_up, time.perf_counter(), False, ident]
+            heapq.heappush(self._waiters, waiter)
+            if not self._locked:
+                self._hand_over()  # The lock is free, but paused for the waiters before
+
+        if wake_up.acquire(timeout=timeout):
+            return True
+        with self._mutex:
+            if waiter[4]:  # Handed over after the timeout
+                return True
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+            return False
+
+    def release(self):
+        """
+        Release the lock
+        """
+        with self._mutex:
+            if not self._locked:
+                raise RuntimeError('release unlocked lock')
+            if self._depth > 1:
+                self._depth -= 1
+                return
+            self._hand_over()
+
+    def locked(self):
+        """
+        Check if the lock is acquired
+
+        :rtype: bool
+        """
+        return self._locked
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def pause(self, below=PRIORITY_INTERACTIVE):
+        """
+        Pause acquisition with priorities lower than below, until resume() is called.
+        The threads already holding the lock are not affected.
+
+        :param int below: the lowest priority still allowed to acquire the lock
+        """
+        with self._mutex:
+            self._pause_levels.append(below)
+
+    def resume(self):
+        """
+        Resume the acquisition paused with the last pause() call
+        """
+        with self._mutex:
+            if self._pause_levels:
+                self._pause_levels.pop()
+            if not self._locked:
+                self._hand_over()
+
+    def is_paused(self, priority=PRIORITY_BACKGROUND):
+        """
+        Check if the acquisition with the priority is paused
+
+        :rtype: bool
+        """
+        return not self._is_allowed(priority)
+
+    def get_stats(self):
+        """
+        Get the wait-time statistics for each priority
+
+        :return: dict of dicts with 'count', 'total_wait', 'mean_wait' and 'max_wait' in seconds,
+                 keyed with priority names
+        """
+        with self._mutex:
+            stats = {}
+            for priority, (count, total_wait, max_wait) in sorted(self._stats.items()):
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                stats[name] = {'count': count,
+                               'total_wait': total_wait,
+                               'mean_wait': total_wait / count if count else 0.0,
+                               'max_wait': max_wait}
+            return stats
+
+    def reset_stats(self):
+        """
+        Clear the wait-time statistics
+        """
+        with self._mutex:
+            self._stats = {}
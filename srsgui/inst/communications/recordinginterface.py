@@ -0,0 +1,361 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Interfaces to record the communication with an instrument to a file,
+and to replay the recorded session without the instrument.
+
+:class:`RecordingInterface` wraps a connected interface, and records every write
+and every reply, including binary blocks, with timestamps.
+
+    >>> cg = CG635('tcpip', '192.168.1.10', 5025)
+    >>> cg.start_recording('cg635_session.rec.gz')
+    >>> cg.frequency = 1000.0
+    >>> cg.stop_recording()
+
+:class:`ReplayInterface` serves the recorded replies to the same writes,
+as fast as possible or at the recorded speed. Use 'replay' as the interface type,
+in a .taskconfig file to run a task with the recorded session.
+
+.. code-block::
+
+    inst: cg, instruments.cg635, CG635, replay:cg635_session.rec.gz
+    inst: sds, instruments.sds1202, SDS1202, replay:sds1202_session.rec.gz:realtime
+
+A recording file is a text file with a JSON header line, followed by a JSON line for
+each event: [seconds from the start, kind, data]. The kind is 'w' for a write and 'r' for
+a read, or 'W' and 'R' with base64-encoded data for binary data.
+The file is compressed with gzip, if the file name ends with '.gz'.
+"""
+
+import io
+import gzip
+import json
+import time
+import base64
+import threading
+from collections import deque
+
+from srsgui.inst.exceptions import InstCommunicationError
+from .interface import Interface
+
+RECORDING_FORMAT = 'srsgui-recording'
+RECORDING_VERSION = 1
+
+_TEXT_BYTES = frozenset(range(0x20, 0x7f)) | {0x09, 0x0a, 0x0d}
+
+
+def _open_recording(file_name, mode):
+    if str(file_name).endswith('.gz'):
+        return gzip.open(file_name, mode + 't', encoding='utf-8')
+    return io.open(file_name, mode, encoding='utf-8')
+
+
+def _encode_event(timestamp, kind, data):
+    if _TEXT_BYTES.issuperset(data):
+        return json.dumps([round(timestamp, 6), kind, data.decode('ascii')])
+    return json.dumps([round(timestamp, 6), kind.upper(), base64.b64encode(data).decode('ascii')])
+
+
+def _decode_event(line):
+    timestamp, kind, text = json.loads(line)
+    if kind.isupper():
+        return timestamp, kind.lower(), base64.b64decode(text)
+    return timestamp, kind, text.encode('ascii')
+
+
+def load_recording(file_name):
+    """
+    Load a recording file
+
+    :return: tuple of the header dict and a list of (seconds, kind, bytes) events
+    """
+    with _open_recording(file_name, 'r') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != RECORDING_FORMAT:
+            raise ValueError('{} is not a recording file'.format(file_name))
+        events = [_decode_event(line) for line in f if line.strip()]
+    return header, events
+
+
+class RecordingInterface(Interface):
+    """
+    Interface wrapping another interface to record the communication to a file
+    """
+
+    NAME = 'recording'
+
+    def __init__(self, comm, file_name):
+        """
+        :param Interface comm: interface to record, usually connected already
+        :param str file_name: recording file to write. It is compressed, if it ends with '.gz'.
+        """
+        super(RecordingInterface, self).__init__()
+        self.type = RecordingInterface.NAME
+        self.comm = comm
+        self._term_char = comm.get_term_char()
+        self._cmd_separator = comm.get_cmd_separator()
+        self._file_name = file_name
+        self._file_lock = threading.Lock()
+        self._file = _open_recording(file_name, 'w')
+        self._file.write(json.dumps({'format': RECORDING_FORMAT,
+                                     'version': RECORDING_VERSION,
+                                     'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                                     'interface': comm.get_info(),
+                                     'term_char': self._term_char.decode('latin-1')}) + '\n')
+        self._start_time = time.perf_counter()
+
+    def _record(self, kind, data):
+        if not data:
+            return
+        timestamp = time.perf_counter() - self._start_time
+        with self._file_lock:
+            if self._file is not None:
+                self._file.write(_encode_event(timestamp, kind, bytes(data)) + '\n')
+
+    def close(self):
+        """
+        Stop recording and close the file
+
+        :return: the wrapped interface
+        """
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        return self.comm
+
+    def connect(self, *args, **kwargs):
+        self.comm.connect(*args, **kwargs)
+
+    def disconnect(self):
+        self.comm.disconnect()
+        with self._file_lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def is_connected(self):
+        return self.comm.is_connected()
+
+    def set_term_char(self, ch):
+        super(RecordingInterface, self).set_term_char(ch)
+        self.comm.set_term_char(ch)
+
+    def set_cmd_separator(self, separator):
+        super(RecordingInterface, self).set_cmd_separator(separator)
+        self.comm.set_cmd_separator(separator)
+
+    def set_timeout(self, seconds):
+        self.comm.set_timeout(seconds)
+
+    def get_timeout(self):
+        return self.comm.get_timeout()
+
+    def _send(self, cmd):
+        self.comm._send(cmd)
+        byte_cmd = bytes(cmd, 'utf-8')
+        if self._term_char not in byte_cmd:
+            byte_cmd += self._term_char
+        self._record('w', byte_cmd)
+
+    def _write_binary(self, binary_array):
+        self.comm._write_binary(binary_array)
+        self._record('w', binary_array)
+
+    def _recv(self):
+        reply = self.comm._recv()
+        self._record('r', reply)
+        return reply
+
+    def _read_binary(self, length=4):
+        data = self.comm._read_binary(length)
+        self._record('r', data)
+        return data
+
+    def _read_binary_into(self, buffer):
+        self.comm._read_binary_into(buffer)
+        self._record('r', memoryview(buffer).cast('B'))
+
+    def clear_buffer(self):
+        if hasattr(self.comm, 'clear_buffer'):
+            self.comm.clear_buffer()
+
+    def get_info(self):
+        d = self.comm.get_info()
+        if type(d) is dict:
+            d['recording'] = self._file_name
+        return d
+
+
+class ReplayInterface(Interface):
+    """
+    Interface to replay a recording file made with RecordingInterface, without the instrument.
+
+    A write is matched with a recorded write, and the replies recorded after it
+    become available to read. With strict matching, writes should come in the recorded
+    order. Otherwise, the recording is searched from the last match, wrapping around
+    to the beginning, and a write not found in the recording gets no reply.
+    """
+
+    NAME = 'replay'
+
+    def __init__(self):
+        super(ReplayInterface, self).__init__()
+        self.type = ReplayInterface.NAME
+        self._file_name = ''
+        self._header = {}
+        self._transactions = []  # list of (write bytes, [(delay from the write, read bytes), ...])
+        self._position = 0
+        self._realtime = False
+        self._strict = False
+        self._timeout = 10
+        self._chunks = deque()  # (time available, bytes) of replies not read yet
+        self._recv_buffer = bytearray()
+
+    def connect(self, file_name, realtime=False, strict=False):
+        """
+        Load a recording file to replay
+
+        :param str file_name: recording file made with RecordingInterface
+        :param bool realtime: replay replies at the recorded speed, if True, or as fast as possible
+        :param bool strict: raise InstCommunicationError if a write does not match
+                            the next recorded write
+        """
+        header, events = load_recording(file_name)
+        transactions = []
+        write_time = 0.0
+        for timestamp, kind, data in events:
+            if kind == 'w':
+                write_time = timestamp
+                transactions.append((data, []))
+            else:
+                if not transactions:
+                    transactions.append((None, []))  # replies without a write, available at connect
+                transactions[-1][1].append((timestamp - write_time, data))
+
+        self._file_name = file_name
+        self._header = header
+        self._transactions = transactions
+        self._position = 0
+        self._realtime = realtime
+        self._strict = strict
+        self._chunks.clear()
+        self._recv_buffer.clear()
+        if 'term_char' in header:
+            self._term_char = header['term_char'].encode('latin-1')
+        if transactions and transactions[0][0] is None:
+            self._queue_replies(transactions[0][1])
+            self._position = 1
+        self._is_connected = True
+        if self._connect_callback:
+            self._connect_callback('Replaying {}'.format(file_name))
+
+    def disconnect(self):
+        self._is_connected = False
+        if self._disconnect_callback:
+            self._disconnect_callback('Stopped replaying {}'.format(self._file_name))
+
+    @staticmethod
+    def parse_parameter_string(param_string):
+        """
+        Parse 'replay:file_name', optionally followed by ':realtime' and ':strict'
+        """
+        params = param_string.split(':')
+        interface_type = params[0].strip().lower()
+        if interface_type != ReplayInterface.NAME:
+            return None
+        options = []
+        while len(params) > 2 and params[-1].strip().lower() in ('realtime', 'strict', 'fast'):
+            options.append(params.pop().strip().lower())
+        file_name = ':'.join(params[1:]).strip()
+        if not file_name:
+            raise ValueError('No file name in "{}"'.format(param_string))
+        return [interface_type, file_name, 'realtime' in options, 'strict' in options]
+
+    def set_timeout(self, seconds):
+        self._timeout = seconds
+
+    def get_timeout(self):
+        return self._timeout
+
+    def _find_transaction(self, data):
+        transactions = self._transactions
+        if self._strict:
+            if self._position < len(transactions) and transactions[self._position][0] == data:
+                return self._position
+            return None
+        for index in range(self._position, len(transactions)):
+            if transactions[index][0] == data:
+                return index
+        for index in range(0, min(self._position, len(transactions))):
+            if transactions[index][0] == data:
+                return index
+        return None
+
+    def _queue_replies(self, replies):
+        now = time.perf_counter()
+        for delay, data in replies:
+            self._chunks.append((now + delay, data))
+
+    def _next_chunk(self):
+        available_time, data = self._chunks.popleft()
+        if self._realtime:
+            delay = available_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self._recv_buffer += data
+
+    def _send(self, cmd):
+        byte_cmd = bytes(cmd, 'utf-8')
+        if self._term_char not in byte_cmd:
+            byte_cmd += self._term_char
+        self._write_binary(byte_cmd)
+
+    def _write_binary(self, binary_array):
+        if not self._is_connected:
+            raise InstCommunicationError('Not connected to write')
+        data = bytes(binary_array)
+        index = self._find_transaction(data)
+        if index is None:
+            if self._strict:
+                expected = self._transactions[self._position][0] \
+                    if self._position < len(self._transactions) else None
+                raise InstCommunicationError('Replay mismatch: wrote {!r}, expected {!r}'
+                                             .format(data, expected))
+            return
+        self._position = index + 1
+        self._queue_replies(self._transactions[index][1])
+
+    def _recv(self):
+        while True:
+            index = self._recv_buffer.find(self._term_char)
+            if index >= 0:
+                end = index + len(self._term_char)
+                reply = bytes(self._recv_buffer[:end])
+                del self._recv_buffer[:end]
+                return reply
+            if not self._chunks:
+                reply = bytes(self._recv_buffer)  # Timeout with a partial reply, as SerialInterface
+                self._recv_buffer.clear()
+                return reply
+            self._next_chunk()
+
+    def _read_binary(self, length=4):
+        while len(self._recv_buffer) < length and self._chunks:
+            self._next_chunk()
+        data = bytes(self._recv_buffer[:length])
+        del self._recv_buffer[:length]
+        return data
+
+    def clear_buffer(self):
+        with self.get_lock():
+            self._chunks.clear()
+            self._recv_buffer.clear()
+
+    def get_info(self):
+        return {'type': self.type,
+                'file_name': self._file_name,
+                'recorded_interface': self._header.get('interface'),
+                'realtime': self._realtime}
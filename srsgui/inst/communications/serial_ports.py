@@ -1,46 +1,141 @@
-##! 
+##!
 ##! Copyright(c) 2022, 2023 Stanford Research Systems, All rights reserved
 ##! Subject to the MIT License
-##! 
+##!
 
 """
 Get all available serial ports.
 
-Snippet from http://stackoverflow.com/questions/12090503/listing-available-com-ports-with-python
+Candidate ports come from the port listing of pyserial, which uses sysfs on Linux,
+the registry on Windows and IOKit on macOS, instead of opening every /dev/tty* device.
+The candidates are probed concurrently with a short timeout, to exclude ports in use,
+and the result is cached until the listing changes or the cache expires.
+A port that does not open or fail within the timeout, e.g. a slow USB-serial adapter,
+is listed as unverified.
 """
 
 import sys
 import glob
+import time
+import threading
 import serial
 
+CACHE_TTL = 60.0  # seconds to keep the result while the port listing does not change
+PROBE_TIMEOUT = 0.5  # seconds to wait for a port to open
 
-def serial_ports():
-    """ Lists serial port names
+_cache_lock = threading.Lock()
+_cached_candidates = None
+_cached_ports = []
+_cached_unverified = []
+_cached_time = 0.0
 
-        :raises EnvironmentError:
-            On unsupported or unknown platforms
-        :returns:
-            A list of the serial ports available on the system
+
+def _list_candidates():
     """
+    List candidate port names from pyserial port listing, without opening them.
+    Fall back to the device name patterns, if the listing is not available.
+    """
+    try:
+        from serial.tools import list_ports
+        return sorted(port.device for port in list_ports.comports())
+    except Exception:
+        pass
+
     if sys.platform.startswith('win'):
-        ports = ['COM%s' % (i + 1) for i in range(256)]
+        return ['COM%s' % (i + 1) for i in range(256)]
     elif sys.platform.startswith('linux') or sys.platform.startswith('cygwin'):
         # this excludes your current terminal "/dev/tty"
-        ports = glob.glob('/dev/tty[A-Za-z]*')
+        return sorted(glob.glob('/dev/tty[A-Za-z]*'))
     elif sys.platform.startswith('darwin'):
-        ports = glob.glob('/dev/tty.*')
+        return sorted(glob.glob('/dev/tty.*'))
     else:
         raise EnvironmentError('Unsupported platform')
 
-    result = []
-    for port in ports:
+
+def _probe(ports, timeout=PROBE_TIMEOUT):
+    """
+    Open the ports concurrently
+
+    :return: tuple of the list of ports opened, and the list of ports not probed within the timeout
+    """
+    opened = {}
+
+    def probe(port):
         try:
             s = serial.Serial(port)
             s.close()
-            result.append(port)
-        except (OSError, serial.SerialException):
+            opened[port] = True
+        except (OSError, serial.SerialException, ValueError):
             pass
-    return result
+
+    threads = [threading.Thread(target=probe, args=(port,), daemon=True) for port in ports]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, deadline - time.monotonic()))
+    unverified = [port for port, thread in zip(ports, threads) if thread.is_alive()]
+    return [port for port in ports if opened.get(port)], unverified
+
+
+def serial_ports(use_cache=True, probe_timeout=PROBE_TIMEOUT):
+    """ Lists serial port names
+
+        :param bool use_cache: use the cached result, if the port listing
+                               has not changed within CACHE_TTL
+        :param float probe_timeout: seconds to wait for the ports to open.
+                                    Ports not probed within it are listed as unverified.
+        :raises EnvironmentError:
+            On unsupported or unknown platforms
+        :returns:
+            A list of the serial ports available on the system,
+            including the ports returned by get_unverified_ports()
+    """
+    global _cached_candidates, _cached_ports, _cached_unverified, _cached_time
+
+    candidates = _list_candidates()
+    with _cache_lock:
+        if use_cache and candidates == _cached_candidates and \
+                time.monotonic() - _cached_time < CACHE_TTL:
+            return list(_cached_ports)
+
+    opened, unverified = _probe(candidates, probe_timeout)
+    ports = [port for port in candidates if port in opened or port in unverified]
+    with _cache_lock:
+        _cached_candidates = candidates
+        _cached_ports = ports
+        _cached_unverified = unverified
+        _cached_time = time.monotonic()
+    return list(ports)
+
+
+def get_unverified_ports():
+    """
+    Get the ports in the last serial_ports() result that did not open or fail within the probe timeout
+
+    :rtype: list of str
+    """
+    with _cache_lock:
+        return list(_cached_unverified)
+
+
+def invalidate_cache():
+    """
+    Discard the cached result, to probe the ports again in the next serial_ports() call
+    """
+    global _cached_candidates
+    with _cache_lock:
+        _cached_candidates = None
+
+
+def refresh_in_background():
+    """
+    Update the cache in a background thread, so that the next serial_ports() call returns immediately
+    """
+    thread = threading.Thread(target=serial_ports, kwargs={'use_cache': False},
+                              name='SerialPortDiscovery', daemon=True)
+    thread.start()
+    return thread
 
 
 if __name__ == '__main__':
@@ -5,7 +5,7 @@
 
 import time
 
-from srsgui.inst.exceptions import InstCommunicationError
+from srsgui.inst.exceptions import InstCommunicationError, InstTimeoutError
 from .interface import Interface
 from .serial_ports import serial_ports
 
@@ -34,6 +34,10 @@ class SerialInterface(Interface):
         self._is_connected = False
         self._timeout = 3.0
 
+        # Bytes read from the port, but not consumed yet.
+        # Bytes left over after a reply are kept for the next read.
+        self._recv_buffer = bytearray()
+
         if hasattr(serial, 'PortNotOpenError'):
             self.port_not_open_error = serial.PortNotOpenError
         elif hasattr(serial, 'portNotOpenError'):
@@ -142,36 +146,60 @@ class SerialInterface(Interface):
             self._serial.write(bytecmd)
         except (self.port_not_open_error, AttributeError):
             raise InstCommunicationError('Port not open to write')
+        except serial.SerialTimeoutException:
+            raise InstTimeoutError("Timeout sending cmd '{}' to port '{}'".format(cmd, self._port))
         except serial.SerialException:
             raise InstCommunicationError("Sending cmd '{}' to port '{}' failed".format(cmd, self._port))
 
     def _write_binary(self, binary_array):
-        if type(binary_array) not in (bytes, bytearray):
-            raise TypeError('_write_binary requires bytes or bytearray')
+        if type(binary_array) not in (bytes, bytearray, memoryview):
+            raise TypeError('_write_binary requires bytes, bytearray or memoryview')
         try:
             self._serial.write(binary_array)
         except (self.port_not_open_error, AttributeError):
             raise InstCommunicationError('Port not open to write')
+        except serial.SerialTimeoutException:
+            raise InstTimeoutError("Timeout writing {} bytes of binary to port '{}'".format(
+                memoryview(binary_array).nbytes, self._port))
         except serial.SerialException:
-            raise InstCommunicationError("writing binary '{}' to port '{}' failed".format(
-                (*map(hex, binary_array),), self._port))
+            raise InstCommunicationError("writing {} bytes of binary to port '{}' failed".format(
+                memoryview(binary_array).nbytes, self._port))
 
     def _recv(self):
         """
         Receive a reply over serial interface without the lock.
+        It reads all the bytes waiting in the port at once, instead of one byte at a time.
+        Any bytes received after the termination character are kept in the receive buffer
+        for the next read.
         This is a protected method that a user should not call directly,
         because it is not thread-safe. Use recv instead.
 
-        :return: bytes. It should be converted to string explicitly
+        :return: bytes. It should be converted to string explicitly.
+                 If timeout occurs, it returns the bytes received so far.
         """
 
         try:
-            reply = b''
+            deadline = time.monotonic() + self._timeout
+            term_length = len(self._term_char)
+            start = 0
             while True:
-                out = self._serial.read(1)
-                reply += out
-                if out == self._term_char or out == b'':
+                index = self._recv_buffer.find(self._term_char, start)
+                if index >= 0:
+                    end = index + term_length
+                    reply = bytes(self._recv_buffer[:end])
+                    del self._recv_buffer[:end]
+                    return reply
+                # No need to search again the bytes already searched
+                start = max(0, len(self._recv_buffer) - term_length + 1)
+                if time.monotonic() > deadline:
+                    break
+                # read(1) blocks until a byte arrives or timeout occurs.
+                data = self._serial.read(self._serial.in_waiting or 1)
+                if not data:
                     break
+                self._recv_buffer += data
+            reply = bytes(self._recv_buffer)
+            self._recv_buffer.clear()
             return reply
         except (self.port_not_open_error, AttributeError):
             raise InstCommunicationError('Port not open to read')
@@ -181,8 +209,13 @@ class SerialInterface(Interface):
 
     def _read_binary(self, length=4):
 
+        # Use the bytes left in the receive buffer first
+        data = bytes(self._recv_buffer[:length])
+        del self._recv_buffer[:length]
         try:
-            data = self._serial.read(length)
+            rem = length - len(data)
+            if rem > 0:
+                data += self._serial.read(rem)
             rem = length - len(data)
             if rem > 0:
                 data += self._serial.read(rem)
@@ -193,34 +226,43 @@ class SerialInterface(Interface):
             raise InstCommunicationError('Receive failed with cmd {} on port {}'
                                          .format(self._cmd_in_waiting, self._port))
 
-    def query_text(self, cmd):
-        with self.get_lock():
-            self._cmd_in_waiting = cmd
-            self._send(cmd)
-            reply = self._recv()
-            if reply == b'':
-                raise InstCommunicationError("Cmd '{}' on port '{}' timeout".format(cmd, self._port))
-            if self._term_char not in reply:
-                time.sleep(0.5)
-                reply += self._recv()
-            self._cmd_in_waiting = None
-            decoded_reply = reply.decode(encoding='utf-8').strip()  # returns a string not bytes
-            if self._query_callback:
-                self._query_callback('Queried Cmd: {} Reply: {}'.format(cmd, decoded_reply))
-            return decoded_reply
+    def _read_binary_into(self, buffer):
+        """
+        Read bytes to fill a writable buffer without the lock,
+        directly from the port with readinto().
+
+        :param buffer: writable object supporting the buffer protocol, such as bytearray or numpy array
+        """
+        view = memoryview(buffer).cast('B')
+        length = len(view)
+
+        # Use the bytes left in the receive buffer first
+        pos = min(length, len(self._recv_buffer))
+        view[:pos] = self._recv_buffer[:pos]
+        del self._recv_buffer[:pos]
+        try:
+            while pos < length:
+                n = self._serial.readinto(view[pos:])
+                if not n:
+                    raise InstTimeoutError('Timeout with {} of {} bytes read on port {}'
+                                           .format(pos, length, self._port))
+                pos += n
+        except (self.port_not_open_error, AttributeError):
+            raise InstCommunicationError('Port not open to read')
+        except serial.SerialException:
+            raise InstCommunicationError('Receive failed with cmd {} on port {}'
+                                         .format(self._cmd_in_waiting, self._port))
 
     def clear_buffer(self):
         """
-        Read out any characters left in the communication buffer.
+        Discard any characters left in the receive buffer and the input buffer of the port.
         """
-        old_timeout = self._timeout
-        self.set_timeout(0.1)
-        while True:
+        with self.get_lock():
+            self._recv_buffer.clear()
             try:
-                self.query_text('')
-            except InstCommunicationError:
-                break
-        self.set_timeout(old_timeout)
+                self._serial.reset_input_buffer()
+            except (self.port_not_open_error, AttributeError, serial.SerialException):
+                pass
 
     def get_info(self):
         """
@@ -0,0 +1,152 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Shadow state of the values of Command and IndexCommand of an instrument.
+
+Shadow state is disabled by default. When enabled with Interface.enable_shadow(),
+a query of a Command or an IndexCommand is answered from the value last queried or set,
+until the value gets older than the TTL, and setting a command to the value it already
+has is not sent to the instrument.
+
+    >>> cg.comm.enable_shadow(ttl=5.0)
+    >>> cg.frequency        # Queried from the instrument
+    1000.0
+    >>> cg.frequency        # From the shadow state
+    1000.0
+    >>> cg.frequency = 1000 # Not sent, because the value is unchanged
+    >>> cg.frequency = 500  # Sent, and the shadow state is updated
+
+Any command written to the instrument invalidates the values with the same mnemonic,
+e.g. 'FREQ 500' typed in a terminal invalidates 'FREQ?', and a command in
+INVALIDATING_COMMANDS, such as '*RST' in '*RST;*OPC?', invalidates all the values. A command with
+the volatile attribute set, such as a measurement, is always queried.
+Commands only to query are volatile by default.
+
+    >>> CG635.frequency.volatile = True
+"""
+
+import time
+import threading
+
+INVALIDATING_COMMANDS = ('*RST', '*RCL', 'SYST:PRES', 'SYSTEM:PRESET')
+"""Mnemonics of commands that change the instrument state beyond their own values"""
+
+COMMAND_SEPARATOR = ';'
+
+
+def _get_key_mnemonic(cmd):
+    """
+    Get the upper case mnemonic without '?', e.g. 'PARAM' from 'PARAM? 1' or 'param 1, 5'
+    """
+    words = cmd.split(None, 1)
+    return words[0].rstrip('?').upper() if words else ''
+
+
+class ShadowState(object):
+    """
+    Values of commands of an instrument, keyed with the query string, e.g. 'FREQ?' or 'PARAM? 1'
+    """
+
+    def __init__(self, ttl=None):
+        """
+        :param float ttl: seconds to keep a value. None to keep it until invalidated.
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = {}  # query string: (time.monotonic() of the value, value)
+        self._keys = {}  # mnemonic: set of query strings
+        self._generation = 0  # incremented whenever a value is invalidated
+        self._stats = {'hits': 0, 'misses': 0, 'suppressed_writes': 0}
+
+    @property
+    def generation(self):
+        """
+        Counter to pass to store(), to discard a value queried before an invalidation
+        """
+        return self._generation
+
+    def lookup(self, key):
+        """
+        Get the value of the query string
+
+        :return: tuple of (True, value) if a valid value is found, or (False, None)
+        """
+        with self._lock:
+            item = self._values.get(key)
+            if item is not None and (self.ttl is None or time.monotonic() - item[0] <= self.ttl):
+                self._stats['hits'] += 1
+                return True, item[1]
+            self._stats['misses'] += 1
+            return False, None
+
+    def store(self, key, value, generation=None):
+        """
+        Store a value queried or set
+
+        :param str key: query string
+        :param value: value converted from the reply
+        :param int generation: generation before the query. The value is discarded,
+                               if any value has been invalidated since.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._values[key] = (time.monotonic(), value)
+            self._keys.setdefault(_get_key_mnemonic(key), set()).add(key)
+
+    def is_unchanged(self, key, value):
+        """
+        Check if a valid value of the query string is equal to the value,
+        to suppress a redundant set command
+        """
+        with self._lock:
+            item = self._values.get(key)
+            if item is not None and item[1] == value and \
+                    (self.ttl is None or time.monotonic() - item[0] <= self.ttl):
+                self._stats['suppressed_writes'] += 1
+                return True
+            return False
+
+    def invalidate(self, cmd=None):
+        """
+        Invalidate the values with the mnemonic of the command, or all the values if cmd is None
+
+        :param str cmd: remote command, e.g. 'FREQ 500', 'FREQ?' or 'FREQ'
+        """
+        with self._lock:
+            self._generation += 1
+            if cmd is None:
+                self._values.clear()
+                self._keys.clear()
+                return
+            for key in self._keys.pop(_get_key_mnemonic(cmd), ()):
+                self._values.pop(key, None)
+
+    def command_sent(self, cmd):
+        """
+        Invalidate the values affected by the commands in a line sent to the instrument.
+        Queries in the line do not change any value.
+        """
+        for item in cmd.split(COMMAND_SEPARATOR):
+            words = item.split(None, 1)
+            if not words or words[0].endswith('?'):
+                continue
+            mnemonic = words[0].upper()
+            if mnemonic in INVALIDATING_COMMANDS:
+                self.invalidate()
+                return
+            self.invalidate(mnemonic)
+
+    def get_stats(self):
+        """
+        Get the number of hits, misses and suppressed writes, and the number of values stored
+
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['values'] = len(self._values)
+            return stats
@@ -0,0 +1,105 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+from srsgui.inst.exceptions import InstCommunicationError
+from .interface import Interface
+
+
+class SimulatedInterface(Interface):
+    """
+    Interface to an in-process :class:`InstrumentSimulator <srsgui.inst.simulator.InstrumentSimulator>`,
+    to use an instrument without hardware
+    """
+
+    NAME = 'sim'
+
+    def __init__(self):
+        super(SimulatedInterface, self).__init__()
+        self.type = SimulatedInterface.NAME
+        self._simulator = None
+        self._session = None
+        self._recv_buffer = bytearray()
+
+    def connect(self, simulator):
+        """
+        Connect to a simulator
+
+        :param simulator: InstrumentSimulator instance, or an Instrument subclass to simulate
+        """
+        from srsgui.inst.simulator import InstrumentSimulator, SimulatorSession
+
+        if not isinstance(simulator, InstrumentSimulator):
+            simulator = InstrumentSimulator(simulator)
+        self._simulator = simulator
+        self._session = SimulatorSession(simulator)
+        self._recv_buffer.clear()
+        self._is_connected = True
+        if self._connect_callback:
+            self._connect_callback('Connected to simulated {}'
+                                   .format(simulator.instrument_class.__name__))
+
+    def disconnect(self):
+        self._is_connected = False
+        if self._disconnect_callback and self._simulator is not None:
+            self._disconnect_callback('Disconnected from simulated {}'
+                                      .format(self._simulator.instrument_class.__name__))
+
+    def get_simulator(self):
+        """
+        Get the simulator connected, to set replies and registers
+        """
+        return self._simulator
+
+    @staticmethod
+    def parse_parameter_string(param_string):
+        """
+        Parse 'sim:' parameter string. The Instrument subclass to simulate
+        is given by the instrument using the interface.
+        """
+        params = param_string.split(':')
+        interface_type = params[0].strip().lower()
+        if interface_type != SimulatedInterface.NAME:
+            return None
+        return [interface_type]
+
+    def set_timeout(self, seconds):
+        self._timeout = seconds
+
+    def get_timeout(self):
+        return self._timeout
+
+    def _send(self, cmd):
+        byte_cmd = bytes(cmd, 'utf-8')
+        if self._term_char not in byte_cmd:
+            byte_cmd += self._term_char
+        self._write_binary(byte_cmd)
+
+    def _write_binary(self, binary_array):
+        if not self._is_connected:
+            raise InstCommunicationError('Not connected to simulator')
+        self._recv_buffer += self._session.write(bytes(binary_array))
+
+    def _recv(self):
+        index = self._recv_buffer.find(self._term_char)
+        if index < 0:
+            reply = bytes(self._recv_buffer)  # No reply to wait for. Return as timeout
+        else:
+            reply = bytes(self._recv_buffer[:index + len(self._term_char)])
+        del self._recv_buffer[:len(reply)]
+        return reply
+
+    def _read_binary(self, length=4):
+        data = bytes(self._recv_buffer[:length])
+        del self._recv_buffer[:length]
+        return data
+
+    def clear_buffer(self):
+        with self.get_lock():
+            self._recv_buffer.clear()
+
+    def get_info(self):
+        simulator = self._simulator
+        return {'type': self.type,
+                'simulated': simulator.instrument_class.__name__ if simulator else None}
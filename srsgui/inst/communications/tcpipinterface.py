@@ -8,10 +8,14 @@ import time
 import socket
 import select
 
-from srsgui.inst.exceptions import InstCommunicationError, InstLoginFailureError
+from srsgui.inst.exceptions import InstCommunicationError, InstTimeoutError, InstLoginFailureError
 from .interface import Interface
 
 EMPTY_BYTES = b''   # When socekt.recv() returns b'', the socket is closed.
+RECV_CHUNK_SIZE = 65536  # Maximum number of bytes to read from the socket at a time
+MAX_IOV_COUNT = 64  # Maximum number of buffers written with a sendmsg() call
+LOGIN_PROMPT_RETRIES = 3  # Number of blank commands sent to get the login prompt
+LOGIN_PROMPT_TIMEOUT = 2.0  # Seconds to wait for a login prompt before sending again
 
 
 class TcpipInterface(Interface):
@@ -37,6 +41,11 @@ class TcpipInterface(Interface):
         self._password = ''
         self._tcp_port = 23  # TELNET port
         self._timeout = 20
+        self._login_timing = {}  # Seconds spent in each phase of the last login
+
+        # Bytes received from the socket, but not consumed yet.
+        # Bytes left over after a reply are kept for the next read.
+        self._recv_buffer = bytearray()
 
     def _send(self, cmd):
         """
@@ -59,36 +68,63 @@ class TcpipInterface(Interface):
                                          .format(cmd, self._ip_address))
 
     def _write_binary(self, binary_array):
-        if type(binary_array) not in (bytes, bytearray):
-            raise TypeError('_write_binary requires bytes or bytearray')
+        if type(binary_array) not in (bytes, bytearray, memoryview):
+            raise TypeError('_write_binary requires bytes, bytearray or memoryview')
+        self._write_buffers([binary_array])
+
+    def _write_buffers(self, buffers):
+        """
+        Write buffers back-to-back with scatter/gather socket.sendmsg(), where available,
+        without the lock and without joining them.
+        """
+        views = [memoryview(buffer).cast('B') for buffer in buffers]
+        total = sum(len(view) for view in views)
+        views = [view for view in views if len(view)]
         try:
-            self.socket.sendall(binary_array)
+            while views:
+                if not hasattr(self.socket, 'sendmsg'):
+                    self.socket.sendall(views.pop(0))
+                    continue
+                try:
+                    sent = self.socket.sendmsg(views[:MAX_IOV_COUNT])
+                except BlockingIOError:
+                    # The socket is non-blocking after login
+                    _, ready, _ = select.select([], [self.socket], [], self._timeout)
+                    if not ready:
+                        raise InstTimeoutError("Timeout writing {} bytes to IP address: '{}'"
+                                               .format(total, self._ip_address))
+                    continue
+                while sent:
+                    if sent >= len(views[0]):
+                        sent -= len(views.pop(0))
+                    else:
+                        views[0] = views[0][sent:]
+                        sent = 0
         except OSError:
-            raise InstCommunicationError("Writing binary '{}' to IP address: '{}' failed"
-                                         .format((*map(hex, binary_array),), self._ip_address))
+            raise InstCommunicationError("Writing {} bytes to IP address: '{}' failed"
+                                         .format(total, self._ip_address))
 
-    def _recv(self):
+    def _fill_buffer(self, deadline):
         """
-        Receive a reply over TCP/IP without the lock.
-        This is a protected method that a user should not call directly,
-        because it is not thread-safe.  Use recv instead.
+        Read bytes available from the socket into the receive buffer,
+        waiting for data until the deadline.
 
-        :return: bytes. It should be converted to string explicitly
+        :param float deadline: time.monotonic() value to give up waiting
         """
-
-        reply = None
+        remaining = deadline - time.monotonic()
         try:
-            # Now receive data
-            ready, _, _ = select.select([self.socket], [], [], self._timeout)
-            if self.socket in ready:
-                reply = self.socket.recv(1024)
-                if reply == EMPTY_BYTES:
-                    self.disconnect()
-                    raise InstCommunicationError("Connection closed with cmd: '{}' on IP: '{}' "
-                                                 .format(self._cmd_in_waiting, self._ip_address))
+            ready, _, _ = select.select([self.socket], [], [], max(remaining, 0.0))
+            if self.socket not in ready:
+                raise InstTimeoutError("Timeout with Cmd: '{}' on IP: '{}' "
+                                       .format(self._cmd_in_waiting, self._ip_address))
+            data = self.socket.recv(RECV_CHUNK_SIZE)
+            if data == EMPTY_BYTES:
+                self.disconnect()
+                raise InstCommunicationError("Connection closed with cmd: '{}' on IP: '{}' "
+                                             .format(self._cmd_in_waiting, self._ip_address))
         except TimeoutError:
-            raise InstCommunicationError("Socket timeout with cmd: '{}' on IP: '{}' "
-                                         .format(self._cmd_in_waiting, self._ip_address))
+            raise InstTimeoutError("Socket timeout with cmd: '{}' on IP: '{}' "
+                                   .format(self._cmd_in_waiting, self._ip_address))
         except ConnectionResetError:
             self.disconnect()
             raise InstCommunicationError("Connection Reset with cmd: '{}' on IP: '{}' "
@@ -97,31 +133,79 @@ class TcpipInterface(Interface):
             self.disconnect()
             raise InstCommunicationError("Connection closed with socket error with cmd: '{}' on IP: '{}' "
                                          .format(self._cmd_in_waiting, self._ip_address))
+        self._recv_buffer += data
 
-        if reply is None:
-            raise InstCommunicationError("Timeout with Cmd: '{}' on IP: '{}' "
-                                         .format(self._cmd_in_waiting, self._ip_address))
+    def _recv(self):
+        """
+        Receive a reply up to the termination character over TCP/IP without the lock.
+        Any bytes received after the termination character are kept in the receive buffer
+        for the next read.
+        This is a protected method that a user should not call directly,
+        because it is not thread-safe.  Use recv instead.
+
+        :return: bytes. It should be converted to string explicitly
+        """
+
+        deadline = time.monotonic() + self._timeout
+        term_length = len(self._term_char)
+        start = 0
+        while True:
+            index = self._recv_buffer.find(self._term_char, start)
+            if index >= 0:
+                end = index + term_length
+                reply = bytes(self._recv_buffer[:end])
+                del self._recv_buffer[:end]
+                return reply
+            # No need to search again the bytes already searched
+            start = max(0, len(self._recv_buffer) - term_length + 1)
+            self._fill_buffer(deadline)
+
+    def _recv_available(self, timeout=None):
+        """
+        Receive whatever bytes are available, regardless of termination character,
+        waiting up to timeout if nothing is in the receive buffer.
+
+        :return: bytes
+        """
+        if not self._recv_buffer:
+            if timeout is None:
+                timeout = self._timeout
+            self._fill_buffer(time.monotonic() + timeout)
+        reply = bytes(self._recv_buffer)
+        self._recv_buffer.clear()
         return reply
 
     def _read_binary(self, length=4):
+        data_buffer = bytearray(length)
+        self._read_binary_into(data_buffer)
+        return bytes(data_buffer)
 
+    def _read_binary_into(self, buffer):
+        """
+        Read bytes to fill a writable buffer without the lock,
+        directly from the socket with recv_into().
+
+        :param buffer: writable object supporting the buffer protocol, such as bytearray or numpy array
+        """
+        view = memoryview(buffer).cast('B')
+        length = len(view)
+
+        # Use the bytes left in the receive buffer first
+        pos = min(length, len(self._recv_buffer))
+        view[:pos] = self._recv_buffer[:pos]
+        del self._recv_buffer[:pos]
         try:
-            data_buffer = b''
-            rem = length
-            while rem > 0:
+            while pos < length:
                 ready, _, _ = select.select([self.socket], [], [], self._timeout)
-                if ready:
-                    data = self.socket.recv(rem)
-                else:
-                    raise InstCommunicationError("Timeout with _read_binary")
-                if data == EMPTY_BYTES:
+                if not ready:
+                    raise InstTimeoutError("Timeout with _read_binary")
+                n = self.socket.recv_into(view[pos:])
+                if n == 0:
                     self.disconnect()
                     raise InstCommunicationError(" Connection closed with _read_binary ")
-                data_buffer += data
-                rem = length - len(data_buffer)
-            return data_buffer
+                pos += n
         except TimeoutError:
-            raise InstCommunicationError("Socket timeout with _read_binary")
+            raise InstTimeoutError("Socket timeout with _read_binary")
         except ConnectionResetError:
             self.disconnect()
             raise InstCommunicationError("Connection Reset with _read_binary")
@@ -129,19 +213,23 @@ class TcpipInterface(Interface):
             self.disconnect()
             raise InstCommunicationError("Connection closed with OSError in _read_binary")
 
-    def query_text(self, cmd):
-        with self.get_lock():
-            self._cmd_in_waiting = cmd
-            self._send(cmd)
-            reply = self._recv()
-            if self._term_char not in reply:
-                time.sleep(0.5)
-                reply += self._recv()
-            self._cmd_in_waiting = None
-            decoded_reply = reply.decode(encoding='utf-8').strip()  # returns a string not bytes
-            if self._query_callback:
-                self._query_callback('Queried Cmd: {} Reply: {}'.format(cmd, decoded_reply))
-            return decoded_reply
+    def set_recv_buffer_size(self, size):
+        """
+        Set the size of the socket receive buffer (SO_RCVBUF) in bytes.
+        A larger buffer helps transfer of large binary blocks, such as multi-megabyte waveforms.
+        The operating system may adjust or limit the size.
+
+        :param int size: buffer size in bytes
+        """
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+
+    def get_recv_buffer_size(self):
+        """
+        Get the size of the socket receive buffer (SO_RCVBUF) in bytes.
+
+        :rtype: int
+        """
+        return self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
 
     def set_timeout(self, seconds):
         self._timeout = seconds
@@ -160,6 +248,7 @@ class TcpipInterface(Interface):
         try:
             self.socket.settimeout(self._timeout)
             self.socket.connect((ip_address, port))
+            self._recv_buffer.clear()
             self._is_connected = True
             self._ip_address = ip_address
             self._tcp_port = port
@@ -168,14 +257,48 @@ class TcpipInterface(Interface):
                                        .format(ip_address, port))
 
         except TimeoutError:
-            raise InstCommunicationError('Timeout connecting to ' + str(ip_address))
+            raise InstTimeoutError('Timeout connecting to ' + str(ip_address))
         except OSError:
             raise InstCommunicationError('Failed connecting to ' + str(ip_address))
 
+    def _expect(self, patterns, deadline):
+        """
+        Read from the socket until one of the patterns appears in the receive buffer,
+        or until the deadline, without the lock.
+
+        :param list patterns: list of bytes to look for
+        :param float deadline: time.monotonic() value to give up waiting
+        :return: tuple of the index of the pattern found first and the bytes up to the end of it,
+                 consumed from the receive buffer, or (-1, b'') if none is found until the deadline
+        """
+        while True:
+            found = -1
+            found_end = len(self._recv_buffer) + 1
+            for i, pattern in enumerate(patterns):
+                index = self._recv_buffer.find(pattern)
+                if 0 <= index and index + len(pattern) < found_end:
+                    found = i
+                    found_end = index + len(pattern)
+            if found >= 0:
+                data = bytes(self._recv_buffer[:found_end])
+                del self._recv_buffer[:found_end]
+                return found, data
+            if time.monotonic() >= deadline:
+                return -1, b''
+            try:
+                self._fill_buffer(deadline)
+            except InstCommunicationError:
+                if not self._is_connected or time.monotonic() < deadline:
+                    raise
+
     def connect_with_login(self, ip_address, userid, password, port=818):
         """
         Connect and login to an instrument
 
+        Instead of waiting for fixed delays, it sends each login input as soon as
+        the prompt for it arrives, so that the login time scales with the link latency.
+        The time spent in each phase is available with get_login_timing().
+
         Parameters
         -----------
             ip_address: str
@@ -187,40 +310,53 @@ class TcpipInterface(Interface):
             port: int, optional
                 the default is 818, SRS RGA port.
         """
-
+        timing = {}
+        start = time.perf_counter()
         self.socket.settimeout(self._timeout)
         try:
             self.socket.connect((ip_address, port))
+            self._recv_buffer.clear()
             self._is_connected = True
         except TimeoutError:
-            raise InstCommunicationError('Timeout connecting to ' + str(ip_address))
+            raise InstTimeoutError('Timeout connecting to ' + str(ip_address))
         except OSError:
             raise InstCommunicationError('Failed connecting to ' + str(ip_address))
+        timing['connect'] = time.perf_counter() - start
+        self._login_timing = timing
 
-        rep = 3
-        i = 0
+        deadline = time.monotonic() + self._timeout
         with self._lock:
-            for i in range(rep):
-                self._send(' ')  # Send a blank command
-                time.sleep(2.0)  # This delay is important to sync the log in prompts.
-                                 # 1.0 s is not enough for VPN connection during backup.
-                reply = self._recv()
-                a = reply.split(b'\r')
-                if reply is not None:
-                    if b'Name:' in a[-1]:  # Is the last prompt 'Name:' ?
-                        break
-            if i == rep - 1:
+            phase_start = time.perf_counter()
+            for i in range(LOGIN_PROMPT_RETRIES):
+                self._send(' ')  # Send a blank command to get the login prompt
+                attempt_deadline = min(deadline, time.monotonic() + LOGIN_PROMPT_TIMEOUT)
+                found, _ = self._expect([b'Name:'], attempt_deadline)
+                if found == 0:
+                    break
+            else:
+                self.disconnect()
                 raise InstCommunicationError('No login prompt error')
+            timing['name_prompt'] = time.perf_counter() - phase_start
 
+            phase_start = time.perf_counter()
             self._send(userid)
-            time.sleep(0.5)
-            self._recv()
+            found, _ = self._expect([b'Password:'], min(deadline, time.monotonic() + LOGIN_PROMPT_TIMEOUT))
+            if found != 0:
+                self.disconnect()
+                raise InstLoginFailureError('No password prompt after user id')
+            timing['password_prompt'] = time.perf_counter() - phase_start
 
+            phase_start = time.perf_counter()
             self._send(password)
-            time.sleep(0.5)
-            reply = self._recv()
-
-            if b'Welcome' in reply:
+            found, _ = self._expect([b'Welcome', b'Name:'], deadline)
+            if found == 0:
+                # Discard the rest of the welcome message
+                self._expect([b'\n', b'\r'], min(deadline, time.monotonic() + LOGIN_PROMPT_TIMEOUT))
+                self._recv_buffer.clear()
+            timing['welcome'] = time.perf_counter() - phase_start
+            timing['total'] = time.perf_counter() - start
+
+            if found == 0:
                 self._ip_address = ip_address
                 self._tcp_port = port
                 self._userid = userid
@@ -234,6 +370,15 @@ class TcpipInterface(Interface):
                 self.disconnect()
                 raise InstLoginFailureError('Check if user id and password are correct.')
 
+    def get_login_timing(self):
+        """
+        Get the seconds spent in each phase of the last connect_with_login():
+        'connect', 'name_prompt', 'password_prompt', 'welcome' and 'total'
+
+        :rtype: dict
+        """
+        return dict(self._login_timing)
+
     def connect(self, *args):
         num = len(args)
         if num == 4 or num == 3:
@@ -280,11 +425,22 @@ class TcpipInterface(Interface):
 
     def clear_buffer(self):
         """
-        It does not do anything for TCPIP interface
+        Discard any bytes left in the receive buffer and the socket.
         """
-        pass
+        with self.get_lock():
+            self._recv_buffer.clear()
+            try:
+                while True:
+                    ready, _, _ = select.select([self.socket], [], [], 0)
+                    if not ready or self.socket.recv(RECV_CHUNK_SIZE) == EMPTY_BYTES:
+                        break
+            except OSError:
+                pass
 
     def get_info(self):
-        return {'type': self.type,
-                'ip_address': self._ip_address,
-                'port': self._tcp_port}
+        d = {'type': self.type,
+             'ip_address': self._ip_address,
+             'port': self._tcp_port}
+        if self._userid:
+            d['login_timing'] = self.get_login_timing()
+        return d
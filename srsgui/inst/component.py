@@ -3,12 +3,69 @@
 ##! Subject to the MIT License
 ##! 
 
+import logging
+from types import MappingProxyType
+from collections import namedtuple
+
 from .communications import Interface
+from .exceptions import InstCommunicationError, InstQueryError, InstIndexError
 from .commands import Command, GetCommand, BoolCommand, IntCommand, \
                       FloatCommand, DictCommand
 from .indexcommands import IndexCommand, BoolIndexCommand, IntIndexCommand, \
                            FloatIndexCommand, DictIndexCommand
 
+logger = logging.getLogger(__name__)
+
+
+CommandRegistry = namedtuple('CommandRegistry', ['attributes', 'commands',
+                                                 'command_dict', 'own_command_dict',
+                                                 'methods', 'own_methods'])
+CommandRegistry.__doc__ = """
+Attributes of a Component subclass and its superclasses, built once when the class is created.
+
+attributes is a tuple of (name, value) of the class attributes, with the ones of a subclass
+overriding the ones of superclasses. commands maps the names to the Command and IndexCommand
+instances. command_dict and own_command_dict are the class part of get_command_dict() with
+and without superclasses, and methods and own_methods are the ones of get_method_list().
+"""
+
+
+def _build_registry(cls):
+    """
+    Walk the classes in the MRO of cls up to Component, and build a CommandRegistry
+    """
+    attributes = {}
+    owners = {}
+    for c in cls.__mro__:
+        if not issubclass(c, Component) or c is Component:
+            break
+        for key, value in c.__dict__.items():
+            if key not in attributes and key != '_registry':
+                attributes[key] = value
+                owners[key] = c
+
+    commands = {}
+    command_dict = {}
+    own_command_dict = {}
+    methods = []
+    own_methods = []
+    for key, value in attributes.items():
+        if isinstance(value, (Command, IndexCommand)):
+            commands[key] = value
+            if not key.startswith('_'):
+                command_dict[key] = (value.__class__.__name__, value.remote_command)
+                if owners[key] is cls:
+                    own_command_dict[key] = command_dict[key]
+        if key == '_parent' or key.startswith('__') or isinstance(value, Component):
+            continue
+        if callable(value):
+            methods.append(key)
+            if owners[key] is cls:
+                own_methods.append(key)
+    return CommandRegistry(tuple(attributes.items()), MappingProxyType(commands),
+                           MappingProxyType(command_dict), MappingProxyType(own_command_dict),
+                           tuple(methods), tuple(own_methods))
+
 
 class DirCommand(GetCommand):
     """
@@ -72,6 +129,37 @@ class Component(object):
     allow_run_button = []
     """Allow methods to have run buttons in the GUI control panel"""
 
+    restore_order = []
+    """Names of commands to set first in restore(), such as a mode that other settings depend on"""
+
+    _registry = None  # CommandRegistry of the class, built in __init_subclass__()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._registry = _build_registry(cls)
+
+    @classmethod
+    def get_command_registry(cls):
+        """
+        Get the CommandRegistry of the class, to look up the commands and methods
+        defined in the class and its superclasses without walking through them.
+
+        Call update_command_registry() after adding a command to the class
+        after the class is created.
+
+        :rtype: CommandRegistry
+        """
+        return cls._registry
+
+    @classmethod
+    def update_command_registry(cls):
+        """
+        Rebuild the CommandRegistry of the class and its subclasses
+        """
+        cls._registry = _build_registry(cls)
+        for subclass in cls.__subclasses__():
+            subclass.update_command_registry()
+
     def __init__(self, parent, name='unnamed'):
         self._name = name
         self._children = []
@@ -136,15 +224,10 @@ class Component(object):
         }
 
     def add_parent_to_index_commands(self):
-        # Add parent to ListCommands
-        commands = self.get_command_dict()
-        for cmd in commands:
-            instance = None
-            if cmd in self.__class__.__dict__:
-                instance = instance = self.__class__.__dict__[cmd]
-            elif cmd in self.__dict__:
-                instance = instance = self.__dict__[cmd]
-            if hasattr(instance, "_add_parent"):
+        # Add parent to IndexCommands defined in the instance.
+        # The ones defined in the class are bound to the instance when accessed, as Commands are.
+        for instance in self.__dict__.values():
+            if isinstance(instance, IndexCommand):
                 instance._add_parent(self)
 
     def get_component_dict(self):
@@ -176,35 +259,14 @@ class Component(object):
             list(str)
                 list of commands
         """
-        command_list = {}
-        current_attributes = []
-        end = -1 if include_superclass else 1
-        for c in self.__class__.__mro__[:end]:  # loop through the classes including super classes
-            if not issubclass(c, Component):  # it should be a subclass of Component
-                break
-            if c == Component:  # But it should not be Component
-                break
-            for key in c.__dict__:
-                if key.startswith('_'):
-                    continue
-                if key in current_attributes:
-                    continue
-                current_attributes.append(key)
-
-                instance = c.__dict__[key]
-                if issubclass(instance.__class__, Command) or \
-                   issubclass(instance.__class__, IndexCommand):
-                    command_list[key] = (instance.__class__.__name__, instance.remote_command)
-        for key in self.__dict__:
-            if key.startswith('_'):
-                continue
-            if key in current_attributes:
+        if include_superclass:
+            command_list = dict(self._registry.command_dict)
+        else:
+            command_list = dict(self._registry.own_command_dict)
+        for key, instance in self.__dict__.items():
+            if key.startswith('_') or key in command_list:
                 continue
-            current_attributes.append(key)
-
-            instance = self.__dict__[key]
-            if issubclass(instance.__class__, Command) or \
-                    issubclass(instance.__class__, IndexCommand):
+            if isinstance(instance, (Command, IndexCommand)):
                 command_list[key] = (instance.__class__.__name__, instance.remote_command)
 
         return command_list
@@ -219,29 +281,9 @@ class Component(object):
             list(str)
                 list of string of method names
         """
-        method_list = []
-        current_attributes = []
-        end = -1 if include_superclass else 1
-        for c in self.__class__.__mro__[:end]:  # loop through the classes including super classes
-            if not issubclass(c, Component):  # it should be subclass of Component
-                break
-            if c == Component:  # But it should not be Component
-                break
-
-            for key in c.__dict__:
-                if key == '_parent':
-                    continue
-                if key.startswith('__'):
-                    continue
-                child = c.__dict__[key]
-                if issubclass(type(child), Component):
-                    continue
-                if key in current_attributes:
-                    continue
-                current_attributes.append(key)
-                if callable(child):
-                    method_list.append('{}'.format(key))
-        return method_list
+        if include_superclass:
+            return list(self._registry.methods)
+        return list(self._registry.own_methods)
 
     def get_command_info(self, command_name):
         """
@@ -253,11 +295,8 @@ class Component(object):
                 dictionary of information on the command
         """
 
-        if hasattr(self.__class__, command_name):
-            cmd = self.__class__.__dict__[command_name]
-        elif hasattr(self, command_name):
-            cmd = self.__dict__[command_name]
-        else:
+        cmd = self.__dict__.get(command_name, self._registry.commands.get(command_name))
+        if cmd is None:
             raise AttributeError("No command named '{}' in {}".format(command_name, self.__class__.__name__))
 
         if issubclass(cmd.__class__, DictCommand):
@@ -287,11 +326,8 @@ class Component(object):
         the command has the key in its set_dict.
         """
 
-        if hasattr(self.__class__, command):
-            cmd = self.__class__.__dict__[command]
-        elif hasattr(self, command):
-            cmd = self.__dict__[command]
-        else:
+        cmd = self.__dict__.get(command, self._registry.commands.get(command))
+        if cmd is None:
             raise AttributeError("No command named '{}' in {}".format(command, self.__class__.__name__))
 
         if not issubclass(cmd.__class__, DictCommand) and not issubclass(cmd.__class__, DictIndexCommand):
@@ -301,11 +337,116 @@ class Component(object):
             raise KeyError(f" '{key}' is NOT in {cmd.set_dict} of command '{command}'.")
         return True
 
+    def _find_command(self, command_name):
+        """
+        Find the Command or IndexCommand instance with command_name
+        in the component instance and its classes
+        """
+        cmd = self.__dict__.get(command_name)
+        if cmd is None:
+            cmd = self._registry.commands.get(command_name)
+        if not isinstance(cmd, (Command, IndexCommand)):
+            raise AttributeError("No command named '{}' in {}".format(command_name, self.__class__.__name__))
+        return cmd
+
+    def query_commands(self, names):
+        """
+        Query multiple commands of the component in a single pipelined transaction,
+        instead of a round trip for each command.
+
+        An item in names is either a name of a Command, or a tuple of a name of an IndexCommand
+        and an index.
+
+            >>> cg.query_commands(['frequency', 'phase'])
+            {'frequency': 1000.0, 'phase': 0.0}
+            >>> fg.query_commands([('fit_parameter', 0), ('fit_parameter', 'back')])
+            {('fit_parameter', 0): 1000.0, ('fit_parameter', 'back'): 500.0}
+
+        :param list names: list of command names, or tuples of a command name and an index
+        :return: dict of values keyed with the items in names
+        :rtype: dict
+        """
+        plan = []
+        for name in names:
+            if type(name) is tuple:
+                command_name, index = name
+            else:
+                command_name, index = name, None
+            cmd = self._find_command(command_name)
+            if not cmd._get_enable:
+                raise AttributeError('No query command for {}'.format(cmd.remote_command))
+            if isinstance(cmd, IndexCommand):
+                if index is None:
+                    raise InstIndexError('No index given for index command {}'.format(cmd.remote_command))
+                query_string = cmd._get_query_string(index)
+            else:
+                query_string = cmd._get_query_string()
+            plan.append((name, cmd, query_string))
+
+        try:
+            replies = self.comm.query_many([query_string for _, _, query_string in plan])
+        except InstCommunicationError:
+            raise InstQueryError('Error during querying: CMDs: {}'
+                                 .format([query_string for _, _, query_string in plan]))
+        return {name: cmd._convert_reply(query_string, reply)
+                for (name, cmd, query_string), reply in zip(plan, replies)}
+
+    def batch(self, error_query=None, max_line_length=256):
+        """
+        Get a context manager to buffer the commands set in the context, and
+        write them in a single write when the context exits or before any query.
+        See :meth:`Interface.batch <srsgui.inst.communications.interface.Interface.batch>`.
+
+            >>> with sg.batch(error_query='LERR?'):
+            ...     for i, value in enumerate(values):
+            ...         sg.fit_parameter[i] = value
+
+        :param str error_query: query to check errors once after writing the commands
+        :param int max_line_length: maximum length of a line of joined commands
+        :rtype: CommandBatch
+        """
+        return self.comm.batch(error_query, max_line_length)
+
     def capture_commands(self, include_query_only=False, include_set_only=False,
-                         include_excluded=False, include_methods=False, show_raw_cmds=False):
+                         include_excluded=False, include_methods=False, show_raw_cmds=False,
+                         errors=None):
         """
         Query all commands with both set and get methods in the component
         and its subcomponents
+
+        The queries are planned first, and run in batches with query_many().
+        See :mod:`srsgui.inst.snapshot`. Use capture_snapshot() to get
+        a serializable Snapshot instead of nested dictionaries.
+
+        A command or an index whose query fails is left out of the dictionaries,
+        and the error is logged.
+
+        :param dict errors: dict to collect the error messages of the failed queries,
+                            keyed with the query strings, as Snapshot.errors
+        """
+        from .snapshot import capture_plan
+
+        pending = []
+        commands = self._capture_commands(include_query_only, include_set_only, include_excluded,
+                                          include_methods, show_raw_cmds, pending)
+        results = capture_plan(self.comm, [(component, '', '', cmd, index)
+                                           for _, _, component, cmd, index in pending])
+        for (node, key, _, cmd, index), (value, error) in zip(pending, results):
+            if error is None:
+                node[key] = value
+                continue
+            del node[key]
+            query_string = cmd._get_query_string() if index is None else cmd._get_query_string(index)
+            logger.warning('Capture of {} failed: {}'.format(query_string, error))
+            if errors is not None:
+                errors[query_string] = str(error)
+        return commands
+
+    def _capture_commands(self, include_query_only, include_set_only, include_excluded,
+                          include_methods, show_raw_cmds, pending):
+        """
+        Build the dictionary of capture_commands(), with the queries to run appended to pending
+        as tuples of (dictionary, key, component, command, index)
         """
         commands = {}
 
@@ -318,17 +459,17 @@ class Component(object):
                 if instance in self.exclude_capture:
                     if not include_excluded:
                         continue
-                commands[j] = instance.capture_commands(include_query_only, include_set_only,
-                                    include_excluded, include_methods, show_raw_cmds)
+                commands[j] = instance._capture_commands(include_query_only, include_set_only,
+                                    include_excluded, include_methods, show_raw_cmds, pending)
 
-        # Capture commands from the current component
-        current_attributes = []
+        # Capture commands from the instance, and the classes including super classes
+        current_attributes = set()
+        attributes = list(self.__dict__.items()) + list(self._registry.attributes)
 
-        for key in self.__dict__:  # loop through the instance
-            cmd_instance = self.__dict__[key]
+        for key, cmd_instance in attributes:
             if key in current_attributes:
                 continue
-            current_attributes.append(key)
+            current_attributes.add(key)
 
             if show_raw_cmds and \
                (issubclass(cmd_instance.__class__, Command) or \
@@ -368,7 +509,8 @@ class Component(object):
                     name = k + ' [QO]'
                 else:
                     name = k
-                commands[name] = cmd_instance.__get__(self, self.__class__)
+                commands[name] = None
+                pending.append((commands, name, self, cmd_instance, None))
 
             elif issubclass(cmd_instance.__class__, IndexCommand):
                 if include_query_only:
@@ -382,103 +524,52 @@ class Component(object):
                     name = k + ' [QO]'
                 else:
                     name = k
-                print('Name: {}'.format(name))
 
                 commands[name] = {}
-                index = cmd_instance.index_min
-                while index <= cmd_instance.index_max:
-                    try:
-                        if cmd_instance.index_dict is None:
-                            commands[name][index] = cmd_instance.__getitem__(index)
-                        else:
-                            for key, value in cmd_instance.index_dict.items():
-                                if value == index:
-                                    commands[name][key] = cmd_instance.__getitem__(index)
-                                    break
-                        index += 1
-                    except Exception as e:
-                        print(f'  {type(e)} {e} command:{k} index: {index}')
-                        break
-
-        for c in self.__class__.__mro__:  # loop through the classes including super classes
-            if not issubclass(c, Component):  # it should be subclass of Component
-                break
-            if c == Component:  # But it should not be Component
-                break
-
-            for key in c.__dict__:
-                cmd_instance = c.__dict__[key]
-                if key in current_attributes:
-                    continue
-                current_attributes.append(key)
+                for index in range(cmd_instance.index_min, cmd_instance.index_max + 1):
+                    if cmd_instance.index_dict is not None:
+                        keys = [key for key, value in cmd_instance.index_dict.items() if value == index]
+                        if not keys:
+                            continue
+                        index = keys[0]
+                    commands[name][index] = None
+                    pending.append((commands[name], index, self, cmd_instance, index))
+        return commands
 
-                if show_raw_cmds and \
-                    (issubclass(cmd_instance.__class__, Command) or \
-                     issubclass(cmd_instance.__class__, IndexCommand)):
-                    k = key + f' <{cmd_instance.remote_command}>'
-                else:
-                    k = key
+    def capture_snapshot(self, include_query_only=False, include_excluded=False):
+        """
+        Capture the values of the commands in the component and its subcomponents
+        with batched queries. See :mod:`srsgui.inst.snapshot`.
 
-                if callable(cmd_instance):
-                    if issubclass(cmd_instance.__class__, type):
-                        continue
-                    if cmd_instance in self.exclude_capture:
-                        if include_excluded:
-                            commands[k + '() [M][EX]'] = ''
-                    if include_methods and not k.startswith('_'):
-                        commands[k + '() [M]'] = ''
-                    continue
+            >>> snapshot = cg.capture_snapshot()
+            >>> snapshot.save('cg635.json')
 
-                if cmd_instance in self.exclude_capture:
-                    if include_excluded:
-                        commands[k + ' [EX]'] = ''
-                    continue
+        :param bool include_query_only: include commands only to query, such as measurements
+        :param bool include_excluded: include commands and subcomponents in exclude_capture
+        :rtype: Snapshot
+        """
+        from .snapshot import capture
 
-                if issubclass(cmd_instance.__class__, Command):
-                    if include_set_only:
-                        if cmd_instance._set_enable and not cmd_instance._get_enable:
-                            commands[k + ' [SO]'] = ''
-                            continue
+        return capture(self, include_query_only, include_excluded)
 
-                    if include_query_only:
-                        allowed = cmd_instance._get_enable
-                    else:
-                        allowed = cmd_instance._set_enable and cmd_instance._get_enable
-                    if not allowed:
-                        continue
+    def restore(self, snapshot, opc_query='*OPC?'):
+        """
+        Set only the commands in the snapshot whose values differ from the current values,
+        taken from the shadow state if enabled, or queried in batches.
 
-                    if not cmd_instance._set_enable:
-                        name = k + ' [QO]'
-                    else:
-                        name = k
-                    commands[name] = cmd_instance.__get__(self, self.__class__)
-
-                elif issubclass(cmd_instance.__class__, IndexCommand):
-                    if include_query_only:
-                        allowed = cmd_instance._get_enable
-                    else:
-                        allowed = cmd_instance._set_enable and cmd_instance._get_enable
-                    if not allowed:
-                        continue
+        Commands in restore_order of each component are set first, and the others in the order
+        of the snapshot. The set commands are written together, and opc_query is sent once
+        at the end to wait until the instrument finishes. See :mod:`srsgui.inst.snapshot`.
 
-                    if not cmd_instance._set_enable:
-                        name = k + ' [QO]'
-                    else:
-                        name = k
-
-                    commands[name] = {}
-                    index = cmd_instance.index_min
-                    while index <= cmd_instance.index_max:
-                        try:
-                            if cmd_instance.index_dict is None:
-                                commands[name][index] = cmd_instance.__getitem__(index)
-                            else:
-                                for key, value in cmd_instance.index_dict.items():
-                                    if value == index:
-                                        commands[name][key] = cmd_instance.__getitem__(index)
-                                        break
-                            index += 1
-                        except Exception as e:
-                            print(f'  {type(e)} {e} command:{k} index: {index}')
-                            break
-        return commands
+            >>> cg.restore(Snapshot.load('cg635.json'))
+
+        :param snapshot: Snapshot from capture_snapshot(), or dictionaries from capture_commands()
+        :param str opc_query: query to wait for the instrument, or None not to wait
+        :return: list of SnapshotEntry set
+        """
+        from .snapshot import restore
+
+        return restore(self, snapshot, opc_query)
+
+
+Component._registry = _build_registry(Component)
@@ -15,6 +15,11 @@ class InstCommunicationError(InstException):
     pass
 
 
+class InstTimeoutError(InstCommunicationError):
+    """Exception for a timeout during communication"""
+    pass
+
+
 class InstLoginFailureError(InstException):
     """
     Exception for TCPIP login error
@@ -51,6 +51,23 @@ You can assign  an index_dict to use the dictionary keys instead of the numberic
 
 Using IndexCommand class simplifies tedious usage of a many set and query remote commands
 with an index argument
+
+An IndexCommand defined as a class attribute is bound to the instance it is accessed from,
+as a Command is, so that instruments of the same class do not share the comm.
+
+As with Command, the value at each index is kept in the shadow state, if enabled with
+fg.comm.enable_shadow(), unless volatile is set to True.
+
+Multiple indexes are accessed with a slice of index values, a list of indexes or keys,
+or a numpy array, with all the queries or set commands written together.
+FloatIndexCommand and IntIndexCommand return numpy arrays, and others return lists.
+
+    >>> fg.fit_parameter[0:2]
+    array([1000.,  500.])
+    >>> fg.fit_parameter[['front', 'back']]
+    array([1000.,  500.])
+    >>> fg.fit_parameter[:] = [0, 0, 0, 0]
+    >>> fg.fit_parameter[1:] = 10
 """
 
 from .exceptions import InstCommunicationError, InstSetError, InstQueryError, InstIndexError
@@ -64,6 +81,7 @@ class IndexCommand(object):
     """
     _get_enable = True
     _set_enable = True
+    _array_dtype = None  # numpy dtype of the values of multiple indexes, or None for a list
 
     def __init__(self, remote_command_name, index_max, index_min=0, index_dict=None):
         """
@@ -79,6 +97,7 @@ class IndexCommand(object):
             index_min: int, optional
         :param str remote_command_name:
         """
+        self._query_strings = {}  # index: query string, rendered at the first query
         self.index_max = index_max
         self.index_min = index_min
         self.remote_command = remote_command_name
@@ -87,25 +106,80 @@ class IndexCommand(object):
         self._parent = None
         self._get_convert_function = None
         self._set_convert_function = None
+        self.volatile = not self._set_enable  # Always query, bypassing the shadow state
 
     def __set__(self, instance, value):
         raise InstSetError('No set for IndexCommand for {}'
                            .format(self.remote_command))
 
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return BoundIndexCommand(self, instance)
+
     def __getitem__(self, index):
+        return self._get_item(self._get_parent(), index)
+
+    def _get_parent(self):
+        """
+        Get the component of an IndexCommand defined as an instance attribute
+        """
+        if self._parent is None:
+            raise InstCommunicationError('No component for IndexCommand {}'.format(self.remote_command))
+        return self._parent
+
+    def _get_item(self, component, index):
+        """
+        Get the value at the index, with the comm of the component owning the command
+        """
+        if self._is_multiple(index):
+            return self._get_items(component, self._expand_index(index))
+        query_string = self._get_query_string(index)
+        comm = component.comm
+        shadow = None if self.volatile else comm.get_shadow()
+        if shadow is not None:
+            found, value = shadow.lookup(query_string)
+            if found:
+                return value
+            generation = shadow.generation
+        try:
+            reply = comm.query_text(query_string)
+        except InstCommunicationError:
+            raise InstQueryError('Error during querying: CMD: {}'.format(query_string))
+        value = self._convert_reply(query_string, reply)
+        if shadow is not None:
+            shadow.store(query_string, value, generation)
+        return value
+
+    def __setattr__(self, name, value):
+        if name in ('remote_command', 'index_max', 'index_min', 'index_dict'):
+            self.__dict__['_query_strings'] = {}  # Render the query strings again
+        object.__setattr__(self, name, value)
+
+    def _get_query_string(self, index):
+        """
+        Get the remote command string to query the value at the index
+        """
+        if type(index) is not bool:  # True would be found as 1
+            try:
+                return self._query_strings[index]
+            except (KeyError, TypeError):
+                pass
         converted_index = self._convert_index(index)
         query_string = '{}? {}'.format(self.remote_command, converted_index)
-        reply = None
-        value = None
+        self._query_strings[index] = query_string
+        return query_string
+
+    def _convert_reply(self, query_string, reply):
+        """
+        Convert a reply string of the query to a value
+        """
+        reply = reply.strip(' \t\n\r\x0b\x0c\x00')
         try:
-            reply = self._parent.comm.query_text(query_string).strip(' \t\n\r\x0b\x0c\x00')
             if callable(self._get_convert_function):
                 value = self._get_convert_function(reply)
-
             else:
                 value = reply
-        except InstCommunicationError:
-            raise InstQueryError('Error during querying: CMD: {}'.format(query_string))
         except ValueError:
             if reply:
                 raise InstQueryError('Error during conversion CMD: {} Reply: {}, Hex:{}'
@@ -115,6 +189,51 @@ class IndexCommand(object):
         return value
 
     def __setitem__(self, index, value):
+        self._set_item(self._get_parent(), index, value)
+
+    def _set_item(self, component, index, value):
+        """
+        Set the value at the index, with the comm of the component owning the command
+        """
+        if not self._set_enable:
+            raise InstIndexError('No set allowed for index command {}'
+                                 .format(self.remote_command))
+        if self._is_multiple(index):
+            self._set_items(component, self._expand_index(index), value)
+            return
+        set_string = self._get_set_string(index, value)
+        comm = component.comm
+        shadow = None
+        if self._get_enable and not self.volatile:
+            shadow = comm.get_shadow()
+        if shadow is not None:
+            query_string = self._get_query_string(index)
+            shadow_value = self._get_shadow_value(query_string, value)
+            if shadow_value is not None and shadow.is_unchanged(query_string, shadow_value):
+                return
+        try:
+            comm.send(set_string)
+        except InstCommunicationError:
+            raise InstSetError('Error during setting: CMD:{} ' + set_string)
+        if shadow is not None and shadow_value is not None:
+            shadow.store(query_string, shadow_value)
+
+    def _get_shadow_value(self, query_string, value):
+        """
+        Get the value that the query would return after setting the value,
+        or None if it is not known without a query
+        """
+        try:
+            if callable(self._set_convert_function):
+                value = self._set_convert_function(value)
+            return self._convert_reply(query_string, str(value))
+        except (ValueError, TypeError, KeyError, InstQueryError):
+            return None
+
+    def _get_set_string(self, index, value):
+        """
+        Get the remote command string to set the value at the index
+        """
         converted_index = self._convert_index(index)
         set_string = '{} {}, '.format(self.remote_command, converted_index)
         try:
@@ -122,15 +241,104 @@ class IndexCommand(object):
                 converted_value = self._set_convert_function(value)
             else:
                 converted_value = value
-            set_string = '{} {}'.format(set_string, converted_value)
-            self._parent.comm.send(set_string)
-
-        except InstCommunicationError:
-            raise InstSetError('Error during setting: CMD:{} ' + set_string)
+            return '{} {}'.format(set_string, converted_value)
         except ValueError:
             raise InstSetError('Error during conversion: CMD: {}'
                                .format(set_string))
 
+    @staticmethod
+    def _is_multiple(index):
+        """
+        Check if the index is a slice or an iterable of indexes
+        """
+        return isinstance(index, slice) or (hasattr(index, '__iter__') and not isinstance(index, str))
+
+    def _expand_index(self, index):
+        """
+        Expand a slice of index values or an iterable of indexes to a list of indexes.
+        Slice bounds are index values, not positions, and the stop value is excluded.
+        """
+        if isinstance(index, slice):
+            start = self.index_min if index.start is None else self._convert_index(index.start)
+            if index.stop is None:
+                stop = self.index_max + 1
+            elif type(index.stop) is str:
+                stop = self._convert_index(index.stop)
+            else:
+                stop = index.stop
+            return list(range(start, stop, 1 if index.step is None else index.step))
+        if hasattr(index, 'tolist'):  # numpy array
+            return index.tolist()
+        return list(index)
+
+    def _convert_indexes(self, indexes):
+        """
+        Convert indexes and keys in index_dict to index values, and check the range at once
+        """
+        converted_indexes = []
+        for index in indexes:
+            if type(index) is int:
+                converted_indexes.append(index)
+            elif type(index) is str and type(self.index_dict) is dict and index in self.index_dict:
+                converted_indexes.append(self.index_dict[index])
+            else:
+                converted_indexes.append(self._convert_index(index))  # Raises InstIndexError
+        if converted_indexes and (min(converted_indexes) < self.index_min or
+                                  max(converted_indexes) > self.index_max):
+            bad_index = [i for i in converted_indexes if not self.index_min <= i <= self.index_max][0]
+            raise InstIndexError('Index {} is out of range from {} to {} for {}'
+                                 .format(bad_index, self.index_min, self.index_max, self.remote_command))
+        return converted_indexes
+
+    def _get_items(self, component, indexes):
+        """
+        Query the values at the indexes with the queries written together
+        """
+        query_strings = [self._get_query_string(i) for i in self._convert_indexes(indexes)]
+        comm = component.comm
+        shadow = None if self.volatile else comm.get_shadow()
+        values = [None] * len(query_strings)
+        missing = []
+        generation = None
+        if shadow is not None:
+            generation = shadow.generation
+            for i, query_string in enumerate(query_strings):
+                found, values[i] = shadow.lookup(query_string)
+                if not found:
+                    missing.append(i)
+        else:
+            missing = list(range(len(query_strings)))
+
+        results = comm.run_queries([query_strings[i] for i in missing])
+        for i, (reply, error) in zip(missing, results):
+            if error is not None:
+                raise InstQueryError('Error during querying: CMD: {}'.format(query_strings[i]))
+            values[i] = self._convert_reply(query_strings[i], reply)
+            if shadow is not None:
+                shadow.store(query_strings[i], values[i], generation)
+
+        if self._array_dtype is None:
+            return values
+        import numpy as np
+        return np.array(values, dtype=self._array_dtype)
+
+    def _set_items(self, component, indexes, values):
+        """
+        Set the values at the indexes with the set commands written together.
+        A single value is set to all the indexes.
+        """
+        if isinstance(values, str) or not hasattr(values, '__iter__'):
+            values = [values] * len(indexes)
+        else:
+            values = values.tolist() if hasattr(values, 'tolist') else list(values)
+            if len(values) != len(indexes):
+                raise InstSetError('{} values for {} indexes of {}'
+                                   .format(len(values), len(indexes), self.remote_command))
+        converted_indexes = self._convert_indexes(indexes)
+        with component.comm.batch():
+            for index, value in zip(converted_indexes, values):
+                self._set_item(component, index, value)
+
     def _add_parent(self, parent):
         if not (hasattr(parent, 'comm') and issubclass(type(parent.comm), Interface)):
             raise InstCommunicationError('parent is not Interface class')
@@ -155,6 +363,42 @@ class IndexCommand(object):
         return converted_index
 
 
+class BoundIndexCommand(object):
+    """
+    IndexCommand defined as a class attribute, bound to a component instance.
+    It is returned when the command is accessed from the instance, so that instances
+    of the same class use their own comm and shadow state.
+    Other attributes are those of the IndexCommand, and isinstance() checks
+    against the class of the IndexCommand pass.
+    """
+
+    __slots__ = ('_command', '_instance')
+
+    def __init__(self, command, instance):
+        object.__setattr__(self, '_command', command)
+        object.__setattr__(self, '_instance', instance)
+
+    @property
+    def __class__(self):
+        return type(self._command)
+
+    def __getitem__(self, index):
+        return self._command._get_item(self._instance, index)
+
+    def __setitem__(self, index, value):
+        self._command._set_item(self._instance, index, value)
+
+    def __getattr__(self, name):
+        return getattr(self._command, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._command, name, value)
+
+    def __repr__(self):
+        return '<{} {} of {}>'.format(type(self._command).__name__, self._command.remote_command,
+                                      type(self._instance).__name__)
+
+
 class IndexGetCommand(IndexCommand):
     """
     Command class for a remote command with index
@@ -194,6 +438,7 @@ class IntIndexCommand(IndexCommand):
     Command class for a remote command with index
     using **set** and **query** returning an **integer**
     """
+    _array_dtype = 'int64'
 
     def __init__(self, remote_command_name, index_max, index_min=0, index_dict=None,
                  unit='', value_min=0, value_nax=65535, step=1):
@@ -223,6 +468,7 @@ class FloatIndexCommand(IndexCommand):
     Command class for a remote command with index
     using **set** and **query** returning an **float**
     """
+    _array_dtype = 'float64'
 
     def __init__(self, remote_command_name, index_max, index_min=0, index_dict=None,
                  unit='', value_min=-1e6, value_max=1e6, step=1e-9, significant_figures=4, default_valaue=0.0 ):
@@ -260,6 +506,8 @@ class DictIndexCommand(IndexCommand):
         self.set_dict = set_dict
         if get_dict is None:
             self.get_dict = self.set_dict
+        else:
+            self.get_dict = get_dict
         self.key_type = type(list(set_dict.keys())[0])
         self.value_type = type(list(set_dict.values())[0])
 
@@ -268,14 +516,31 @@ class DictIndexCommand(IndexCommand):
 
         self.unit = unit
 
+    @property
+    def get_dict(self):
+        """
+        Conversion dictionary for queries. Assign a new dictionary, instead of changing it in place,
+        to update the reverse lookup.
+        """
+        return self._get_dict
+
+    @get_dict.setter
+    def get_dict(self, get_dict):
+        self._get_dict = get_dict
+        self._value_to_key_dict = {}
+        for key, value in get_dict.items():
+            self._value_to_key_dict.setdefault(value, key)  # the first key of a value, as list.index()
+
     def key_to_value(self, key):
-        if self.key_type(key) in self.set_dict:
-            return self.set_dict[self.key_type(key)]
+        key = self.key_type(key)
+        if key in self.set_dict:
+            return self.set_dict[key]
         else:
             raise KeyError('{} not exists in {}'
                            .format(key, self.set_dict.keys()))
 
     def value_to_key(self, value):
-        index = list(self.get_dict.values()).index(self.value_type(value))
-        key = list(self.get_dict.keys())[index]
-        return key
+        try:
+            return self._value_to_key_dict[self.value_type(value)]
+        except KeyError:
+            raise ValueError('{} is not in get_dict of {}'.format(value, self.remote_command))
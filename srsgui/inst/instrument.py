@@ -5,7 +5,10 @@
 
 import re
 import time
-from .communications import Interface, SerialInterface, TcpipInterface
+from .communications import Interface, SerialInterface, TcpipInterface, \
+                             RecordingInterface, ReplayInterface, SimulatedInterface, \
+                             BrokerInterface
+from .communications.interface import UPLOAD_CHUNK_SIZE
 from .component import Component
 from .exceptions import InstIdError
 
@@ -19,6 +22,10 @@ class Instrument(Component):
     # Termination character used in text communication
     _term_char = b'\n'
 
+    # Separator to join multiple remote commands in a single line, e.g. ';' for SCPI instruments
+    # None if the instrument does not support it.
+    _cmd_separator = None
+
     # String should be in the ID string of the instrument
     _IdString = "Not Available"
 
@@ -47,6 +54,15 @@ class Instrument(Component):
     As default, SerialInterface and TcpipInterface is provided with the base class.
     VXI11 interface and VISA interface is available in srsinst.sr860 package.
     """
+
+    offline_interfaces = [ReplayInterface, SimulatedInterface, BrokerInterface]
+    """
+    Interfaces available with any instrument, in addition to available_interfaces,
+    e.g. 'replay:session.rec' in a .taskconfig file to replay a session recorded with start_recording(),
+    'sim:' to use a simulator built from the commands of the instrument class,
+    or 'broker:/tmp/inst.sock' to use an instrument shared by a broker process.
+    """
+
     def __init__(self, interface_type=None, *args):
         """
         Initialize an instance of Instrument class
@@ -60,6 +76,7 @@ class Instrument(Component):
         super().__init__(None)
         self.comm = SerialInterface()
         self.set_term_char(self._term_char)
+        self.set_cmd_separator(self._cmd_separator)
         self._id_string = None
         self._model_name = None
         self._serial_number = None
@@ -96,24 +113,88 @@ class Instrument(Component):
             port: int, optional
                 TCP port number, default is 23 which is the TELNET default port.
         """
+        self.stop_recording()
         term_char = self.get_term_char()  # To retain the term char when reopening
+        cmd_separator = self.get_cmd_separator()
+        io_thread = self.comm.is_io_thread_running()  # To retain the I/O thread mode
+        metrics = self.comm.get_metrics_recorder()  # To continue recording metrics, if enabled
+        shadow = self.comm.get_shadow()  # To keep the shadow state enabled, with the values discarded
+        self.comm.stop_io_thread()
         if self.comm.is_connected():
             self.comm.disconnect()
             time.sleep(0.1)
         if not interface_type:
             return
         matched = False
-        for interface, _ in self.available_interfaces:
+        interfaces = [interface for interface, _ in self.available_interfaces] + self.offline_interfaces
+        for interface in interfaces:
             if interface_type == interface.NAME:
                 matched = True
                 self.comm = interface()
                 self.set_term_char(term_char)
+                self.set_cmd_separator(cmd_separator)
+                if io_thread:
+                    self.comm.start_io_thread()
+                if metrics is not None:
+                    self.comm.enable_metrics(metrics)
+                if shadow is not None:
+                    self.comm.enable_shadow(shadow.ttl)
+                if interface is SimulatedInterface and not args:
+                    args = (self.__class__,)  # Simulate this instrument class
                 self.comm.connect(*args)
                 self.update_components()
                 break
         if not matched:
             raise TypeError("Invalid interface_type: {}".format(interface_type))
 
+    def start_recording(self, file_name):
+        """
+        Record the communication with the instrument to a file, until stop_recording()
+        is called or the instrument is connected again.
+        The file can be replayed with 'replay' interface type without the instrument.
+        See :mod:`srsgui.inst.communications.recordinginterface`.
+
+        :param str file_name: recording file to write. It is compressed, if it ends with '.gz'.
+        """
+        self.stop_recording()
+        comm = self.comm
+        io_thread = comm.is_io_thread_running()
+        comm.stop_io_thread()
+        self.comm = RecordingInterface(comm, file_name)
+        if comm.get_metrics_recorder() is not None:
+            self.comm.enable_metrics(comm.get_metrics_recorder())
+        if comm.get_shadow() is not None:
+            self.comm.enable_shadow(shadow=comm.get_shadow())
+        if io_thread:
+            self.comm.start_io_thread()
+        self.update_components()
+
+    def stop_recording(self):
+        """
+        Stop recording started with start_recording() and close the file
+        """
+        if not isinstance(self.comm, RecordingInterface):
+            return
+        recording = self.comm
+        io_thread = recording.is_io_thread_running()
+        recording.stop_io_thread()
+        self.comm = recording.close()
+        if recording.get_metrics_recorder() is not None:
+            self.comm.enable_metrics(recording.get_metrics_recorder())
+        if recording.get_shadow() is not None:
+            self.comm.enable_shadow(shadow=recording.get_shadow())
+        if io_thread:
+            self.comm.start_io_thread()
+        self.update_components()
+
+    def is_recording(self):
+        """
+        Check if the communication is recorded with start_recording()
+
+        :rtype: bool
+        """
+        return isinstance(self.comm, RecordingInterface)
+
     def disconnect(self):
         """
         Disconnect from the instrument
@@ -152,6 +233,24 @@ class Instrument(Component):
         ch = self.comm.get_term_char()
         return ch
 
+    def set_cmd_separator(self, separator):
+        """
+        Set the separator used to join multiple remote commands into a single command,
+        e.g. ';' for SCPI instruments
+
+        :param str separator: command separator, or None if not supported
+        """
+        self._cmd_separator = separator
+        self.comm.set_cmd_separator(separator)
+
+    def get_cmd_separator(self):
+        """
+        Get the separator used to join multiple remote commands
+
+        :rtype: str or None
+        """
+        return self.comm.get_cmd_separator()
+
     def send(self, cmd):
         """
         Send a remote command without a reply
@@ -190,6 +289,53 @@ class Instrument(Component):
         """
         return self.comm.query_float(cmd)
 
+    def query_floats(self, cmd, separator=',', dtype='float64'):
+        """
+        Send a remote command with a reply of separated numbers, and return the reply
+        parsed directly into a numpy array.
+
+        :param str cmd: remote command
+        :param str separator: separator between numbers
+        :param dtype: numpy dtype of the array
+        :rtype: numpy.ndarray
+        """
+        return self.comm.query_floats(cmd, separator, dtype)
+
+    def query_ints(self, cmd, separator=',', dtype='int64'):
+        """
+        Send a remote command with a reply of separated integers, and return the reply
+        parsed directly into a numpy array.
+
+        :param str cmd: remote command
+        :param str separator: separator between numbers
+        :param dtype: numpy dtype of the array
+        :rtype: numpy.ndarray
+        """
+        return self.comm.query_ints(cmd, separator, dtype)
+
+    def query_many(self, cmds):
+        """
+        Send multiple queries in a single write and return the replies in order.
+        An item in cmds is either a remote command string, or a tuple of a remote command
+        and a function to convert the reply string, such as int or float.
+
+            >>> cg.query_many(['*IDN?', ('FREQ?', float)])
+            ['Stanford Research Systems,CG635,s/n001234,ver1.0', 1000.0]
+
+        :param list cmds: list of remote commands, or tuples of a remote command and a function
+        :return: list of replies
+        """
+        return self.comm.query_many(cmds)
+
+    def write_block(self, cmd, data, chunk_size=UPLOAD_CHUNK_SIZE, progress=None, cancel=None):
+        """
+        Send a remote command followed by data in an IEEE 488.2 definite length block,
+        e.g. an arbitrary waveform or a firmware image, in chunks without copying the data.
+        See :meth:`Interface.write_block <srsgui.inst.communications.interface.Interface.write_block>`
+        for the parameters.
+        """
+        self.comm.write_block(cmd, data, chunk_size, progress, cancel)
+
     def check_id(self):
         """
         Check if the ID string of the instrument contains _IdString of the Instrument class.
@@ -231,13 +377,40 @@ class Instrument(Component):
             d[interface[0].NAME] = interface
         return d
 
+    @classmethod
+    def find_on_network(cls, hosts=None, ports=None, connect_timeout=0.5, query_timeout=0.5):
+        """
+        Find instruments of the class on the network, matching ID query replies with _IdString.
+        The local /24 network is scanned, if hosts is None.
+
+            >>> CG635.find_on_network('192.168.1.0/24')
+
+        :param hosts: a network in CIDR notation, e.g. '192.168.1.0/24', a range in the last octet,
+                      e.g. '192.168.1.10-40', an address, or a list of them
+        :param ports: TCP ports to scan. The default ports and the port of TcpipInterface
+                      in available_interfaces, if None
+        :return: list of DiscoveredInstrument with ip_address, port, id_string and instrument_class
+        """
+        from .communications.lan_discovery import find_instruments, DEFAULT_PORTS
+
+        if ports is None:
+            ports = list(DEFAULT_PORTS)
+            tcpip = cls.get_available_interfaces().get(TcpipInterface.NAME)
+            if tcpip and isinstance(tcpip[1].get('port'), IntegerInput):
+                port = tcpip[1]['port'].value
+                if port not in ports:
+                    ports.insert(0, port)
+        return find_instruments(hosts, [cls], ports, connect_timeout, query_timeout,
+                                cls.id_query_cmd, cls._term_char, matched_only=True)
+
     def get_info(self):
         """
         Get the instrument information
 
         default return value is a dictionary containing model name, serial number,
         firmware version. A subclass can add more information into the dictionary
-        as needed.
+        as needed. If metrics are enabled with comm.enable_metrics(), the commands
+        with the longest mean time are included in 'slowest_commands'.
 
         :rtype: dict
         """
@@ -248,6 +421,8 @@ class Instrument(Component):
             d['model_name'] = self._model_name
             d['serial_number'] = self._serial_number
             d['firmware_version'] = self._firmware_version
+            if self.comm.is_metrics_enabled():
+                d['slowest_commands'] = self.comm.get_metrics_recorder().summary()
         return d
 
     def get_status(self):
@@ -294,8 +469,13 @@ class Instrument(Component):
         if len(params) < 2:
             raise ValueError('Not enough parameters in "{}"'.format(parameter_string))
         interface_type = params[0].strip().lower()
-        if interface_type in self.interface_dict:
-            parameters = self.interface_dict[interface_type][0].parse_parameter_string(parameter_string)
+        offline_interface_dict = {interface.NAME: interface for interface in self.offline_interfaces}
+        if interface_type in self.interface_dict or interface_type in offline_interface_dict:
+            if interface_type in self.interface_dict:
+                interface = self.interface_dict[interface_type][0]
+            else:
+                interface = offline_interface_dict[interface_type]
+            parameters = interface.parse_parameter_string(parameter_string)
 
             self.connect(*parameters)
         else:
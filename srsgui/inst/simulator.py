@@ -0,0 +1,445 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Simulator of an instrument built from the Command and IndexCommand definitions
+of an Instrument subclass, to run tasks, plots and data writers without hardware.
+
+The simulator keeps a register for each command and index. A query returns the register value,
+and a set changes it. Replies to queries without a Command definition, and binary blocks
+for BinaryBlockGetCommand, are provided with set_reply(), set_handler() and set_block_generator().
+
+In-process, connect an instrument with the 'sim' interface type,
+e.g. 'sim:' in a .taskconfig file, or
+
+    >>> cg = CG635('sim')
+    >>> cg.frequency = 1e6
+    >>> cg.frequency
+    1000000.0
+
+To use the real TcpipInterface, run the simulator as a TCP server on localhost.
+
+    >>> server = SimulatorServer(InstrumentSimulator(CG635), port=5025)
+    >>> server.start()
+    >>> cg = CG635('tcpip', '127.0.0.1', 5025)
+
+or from the command line,
+
+.. code-block::
+
+    python -m srsgui.inst.simulator instruments.cg635.CG635 --port 5025
+"""
+
+import re
+import time
+import math
+import socket
+import threading
+import socketserver
+
+from .commands import BoolCommand, IntCommand, FloatCommand, DictCommand, BinaryBlockGetCommand
+from .indexcommands import IndexCommand, BoolIndexCommand, IntIndexCommand, \
+                           FloatIndexCommand, DictIndexCommand
+
+SIMULATOR_MANUFACTURER = 'Stanford Research Systems'
+SIMULATED_WAVEFORM_LENGTH = 1000
+
+
+def sine_waveform(dtype, length=SIMULATED_WAVEFORM_LENGTH, cycles=5):
+    """
+    Default block generator returning a sine wave of dtype filling the range of an integer dtype
+
+    :rtype: numpy.ndarray
+    """
+    import numpy as np
+
+    dtype = np.dtype(dtype)
+    wave = np.sin(np.linspace(0.0, 2 * math.pi * cycles, length, endpoint=False))
+    if dtype.kind in 'iu':
+        info = np.iinfo(dtype)
+        center = (int(info.max) + int(info.min)) / 2
+        amplitude = (int(info.max) - int(info.min)) / 2 * 0.8
+        return (center + amplitude * wave).astype(dtype)
+    return wave.astype(dtype)
+
+
+def _normalize(cmd):
+    return ' '.join(cmd.split()).upper()
+
+
+def _default_value(cmd):
+    """
+    Get the initial register value of a command as a reply string
+    """
+    default_value = getattr(cmd, 'default_value', None)
+    if default_value is None:
+        default_value = getattr(cmd, 'default_valaue', None)  # name used in FloatIndexCommand
+
+    if isinstance(cmd, (DictCommand, DictIndexCommand)):
+        if default_value is not None and default_value in cmd.set_dict:
+            return str(cmd.set_dict[default_value])
+        return str(list(cmd.get_dict.values())[0])
+    if isinstance(cmd, (BoolCommand, BoolIndexCommand)):
+        return '1' if default_value else '0'
+    if isinstance(cmd, (IntCommand, IntIndexCommand)):
+        value = int(default_value) if default_value is not None else 0
+        return str(min(max(value, cmd.minimum), cmd.maximum))
+    if isinstance(cmd, (FloatCommand, FloatIndexCommand)):
+        value = float(default_value) if default_value is not None else 0.0
+        return repr(min(max(value, cmd.minimum), cmd.maximum))
+    if default_value is not None:
+        return str(default_value)
+    return '0'
+
+
+class InstrumentSimulator(object):
+    """
+    Simulator answering remote commands of an Instrument subclass from in-memory registers
+    """
+
+    def __init__(self, instrument_class, serial_number='00000', firmware_version='1.0', latency=0.0):
+        """
+        :param instrument_class: Instrument subclass to simulate
+        :param str serial_number: serial number in the reply to '*IDN?'
+        :param str firmware_version: firmware version in the reply to '*IDN?'
+        :param float latency: seconds to wait before replying to a query, to emulate an instrument
+        """
+        self.instrument_class = instrument_class
+        self.latency = latency
+        self.term_char = instrument_class._term_char
+        self.cmd_separator = instrument_class._cmd_separator
+        self._lock = threading.RLock()
+
+        model = re.sub(r'[^\w\- ]', '', instrument_class._IdString) or instrument_class.__name__
+        self.id_string = '{},{},s/n{},ver{}'.format(SIMULATOR_MANUFACTURER, model,
+                                                    serial_number, firmware_version)
+
+        self._commands = {}  # remote command name -> Command or IndexCommand
+        self._queries = {}   # normalized query string of a Command -> Command
+        self._registers = {}  # (remote command name, index) -> reply string
+        self._handlers = {}  # normalized command or header -> function(args) returning a reply
+        self._block_generators = {}  # normalized query string or header -> function(args)
+        self._errors = []
+        self.query_count = 0
+        self.set_count = 0
+
+        self._add_component(instrument_class())
+
+    def _add_component(self, component):
+        for name in component.get_command_dict(include_superclass=True):
+            cmd = component._find_command(name)
+            key = cmd.remote_command.upper()
+            self._commands.setdefault(key, cmd)
+            if not isinstance(cmd, IndexCommand):
+                self._queries.setdefault(_normalize(cmd._get_query_string()), cmd)
+        for child in component._children:
+            self._add_component(child)
+
+    def reset(self):
+        """
+        Reset all the registers to the default values, like '*RST'
+        """
+        with self._lock:
+            self._registers = {}
+            self._errors = []
+
+    def set_reply(self, cmd, reply):
+        """
+        Set a fixed reply for a query without a Command definition
+
+            >>> sim.set_reply('SARA?', '1.00GSa')
+
+        :param str cmd: query string, or the header of a query
+        :param str reply: reply string
+        """
+        self._handlers[_normalize(cmd)] = lambda args: reply
+
+    def set_handler(self, cmd, handler):
+        """
+        Set a function to handle a command. The function takes the argument string
+        of the command, and returns a reply string for a query, or None for a set.
+
+        :param str cmd: command string, or the header of a command
+        :param handler: function(args: str) -> str or None
+        """
+        self._handlers[_normalize(cmd)] = handler
+
+    def set_block_generator(self, cmd, generator):
+        """
+        Set a function to generate the data of a binary block reply.
+        The function takes the argument string of the query, and returns bytes or a numpy array.
+
+            >>> sim.set_block_generator('C1:WF? DAT2', lambda args: sine_waveform('int8', 70000))
+
+        :param str cmd: query string, or the header of a query
+        :param generator: function(args: str) -> bytes or numpy.ndarray
+        """
+        self._block_generators[_normalize(cmd)] = generator
+
+    def get_register(self, remote_command, index=None):
+        """
+        Get the register value of a remote command as a string
+        """
+        key = (remote_command.upper(), index)
+        value = self._registers.get(key)
+        if value is None:
+            cmd = self._commands.get(remote_command.upper())
+            value = _default_value(cmd) if cmd is not None else '0'
+        return value
+
+    def set_register(self, remote_command, value, index=None):
+        """
+        Set the register value of a remote command
+        """
+        self._registers[(remote_command.upper(), index)] = str(value)
+
+    def get_errors(self):
+        """
+        Get the errors from unknown commands, and clear them
+
+        :rtype: list of str
+        """
+        with self._lock:
+            errors, self._errors = self._errors, []
+            return errors
+
+    def handle_line(self, line):
+        """
+        Handle a line of commands, joined with the command separator,
+        and return the replies as bytes, with the termination character
+
+        :param str line: a line without the termination character
+        :rtype: bytes
+        """
+        cmds = line.split(self.cmd_separator) if self.cmd_separator else [line]
+        text_replies = []
+        binary_reply = b''
+        with self._lock:
+            for cmd in cmds:
+                cmd = cmd.strip()
+                if not cmd:
+                    continue
+                reply = self._handle_command(cmd)
+                if reply is None:
+                    continue
+                if type(reply) is bytes:
+                    binary_reply += reply
+                else:
+                    text_replies.append(reply)
+        if (text_replies or binary_reply) and self.latency:
+            time.sleep(self.latency)
+        if text_replies:
+            separator = self.cmd_separator or ''
+            binary_reply = bytes(separator.join(text_replies), 'utf-8') + self.term_char + binary_reply
+        return binary_reply
+
+    def _handle_command(self, cmd):
+        normalized = _normalize(cmd)
+        words = cmd.split(None, 1)
+        header = words[0].upper()
+        args = words[1].strip() if len(words) > 1 else ''
+
+        for key in (normalized, header):
+            if key in self._block_generators:
+                self.query_count += 1
+                return self._make_block(self._block_generators[key](args),
+                                        self._queries.get(normalized) or self._queries.get(header))
+            if key in self._handlers:
+                return self._handlers[key](args)
+
+        common_reply = self._handle_common_command(header)
+        if common_reply is not False:
+            return common_reply
+
+        block_cmd = self._queries.get(normalized) or self._queries.get(header)
+        if isinstance(block_cmd, BinaryBlockGetCommand):
+            self.query_count += 1
+            return self._make_block(sine_waveform(block_cmd.dtype), block_cmd)
+
+        is_query = header.endswith('?')
+        name = header[:-1] if is_query else header
+        cmd_def = self._commands.get(name)
+        if cmd_def is None:
+            self._errors.append('Unknown command: {}'.format(cmd))
+            return None
+
+        index = None
+        if isinstance(cmd_def, IndexCommand):
+            index_string, _, args = args.partition(',')
+            try:
+                index = int(index_string)
+            except ValueError:
+                self._errors.append('Invalid index: {}'.format(cmd))
+                return None
+            args = args.strip()
+
+        if is_query:
+            self.query_count += 1
+            if not cmd_def._get_enable:
+                self._errors.append('Query not allowed: {}'.format(cmd))
+                return None
+            return self.get_register(name, index)
+
+        self.set_count += 1
+        if not cmd_def._set_enable:
+            self._errors.append('Set not allowed: {}'.format(cmd))
+            return None
+        self.set_register(name, args, index)
+        return None
+
+    def _handle_common_command(self, header):
+        """
+        Handle IEEE 488.2 common commands and error queries.
+        Return False if the header is not one of them.
+        """
+        if header == '*IDN?':
+            return self.id_string
+        if header == '*OPC?':
+            return '1'
+        if header in ('*ESR?', '*STB?'):
+            return '0'
+        if header == '*RST':
+            self._registers = {}
+            return None
+        if header in ('*CLS', '*OPC', '*WAI'):
+            if header == '*CLS':
+                self._errors = []
+            return None
+        if header == 'SYST:ERR?':
+            if self._errors:
+                return '-100,"{}"'.format(self._errors.pop(0))
+            return '0,"No error"'
+        if header == 'LERR?':
+            if self._errors:
+                self._errors.pop(0)
+                return '1'
+            return '0'
+        return False
+
+    def _make_block(self, data, block_cmd=None):
+        data = bytes(memoryview(data).cast('B')) if not isinstance(data, bytes) else data
+        length = str(len(data))
+        trailer = getattr(block_cmd, 'trailer', None)
+        if trailer is None:
+            trailer_bytes = self.term_char
+        else:
+            trailer_bytes = (self.term_char * trailer)[:trailer]
+        return b'#' + str(len(length)).encode() + length.encode() + data + trailer_bytes
+
+
+class SimulatorSession(object):
+    """
+    Buffer of bytes written to a simulator, split into lines with the termination character
+    """
+
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self._buffer = bytearray()
+
+    def write(self, data):
+        """
+        Write bytes to the simulator
+
+        :return: replies to the complete lines written so far
+        :rtype: bytes
+        """
+        self._buffer += data
+        term_char = self.simulator.term_char
+        replies = bytearray()
+        while True:
+            index = self._buffer.find(term_char)
+            if index < 0:
+                break
+            line = self._buffer[:index].decode('utf-8', errors='replace')
+            del self._buffer[:index + len(term_char)]
+            replies += self.simulator.handle_line(line)
+        return bytes(replies)
+
+
+class _SimulatorRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        session = SimulatorSession(self.server.simulator)
+        while True:
+            try:
+                data = self.request.recv(65536)
+            except OSError:
+                break
+            if not data:
+                break
+            replies = session.write(data)
+            if replies:
+                try:
+                    self.request.sendall(replies)
+                except OSError:
+                    break
+
+
+class SimulatorServer(socketserver.ThreadingTCPServer):
+    """
+    TCP server on localhost running an InstrumentSimulator, to use with TcpipInterface
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, simulator, host='127.0.0.1', port=0):
+        """
+        :param InstrumentSimulator simulator: simulator to serve
+        :param str host: address to listen, localhost by default
+        :param int port: TCP port number, 0 to use a free port
+        """
+        super().__init__((host, port), _SimulatorRequestHandler)
+        self.simulator = simulator
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """
+        Start serving in a background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True,
+                                        name='SimulatorServer-{}'.format(self.port))
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop serving and close the server socket
+        """
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main():
+    import argparse
+    import importlib
+
+    parser = argparse.ArgumentParser(description='Run a simulated instrument as a TCP server')
+    parser.add_argument('instrument', help='Instrument subclass, e.g. instruments.cg635.CG635')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5025)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before a reply')
+    args = parser.parse_args()
+
+    module_name, class_name = args.instrument.rsplit('.', 1)
+    instrument_class = getattr(importlib.import_module(module_name), class_name)
+    server = SimulatorServer(InstrumentSimulator(instrument_class, latency=args.latency),
+                             args.host, args.port)
+    print('Simulating {} on {}:{}'.format(class_name, args.host, server.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
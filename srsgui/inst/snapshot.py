@@ -0,0 +1,455 @@
+##!
+##! Copyright(c) 2022-2024 Stanford Research Systems, All rights reserved
+##! Subject to the MIT License
+##!
+
+"""
+Snapshot of the settings of an instrument, captured with batched queries.
+
+All the queries of the commands of a component and its subcomponents are planned first,
+and run with Interface.query_many() in batches, joined with the command separator,
+if the instrument has one, or written back-to-back otherwise. A capture takes about
+a round trip per batch, instead of a round trip per setting.
+
+    >>> snapshot = cg.capture_snapshot()
+    >>> snapshot.get('frequency')
+    1000.0
+    >>> snapshot.save('cg635.json')
+    >>> Snapshot.load('cg635.json').to_tree()
+    {'frequency': 1000.0, 'phase': 0.0, 'output': {'level': 1.0}}
+
+Instruments in an inst_dict, e.g. Task.inst_dict, are captured in parallel with capture_all().
+
+A snapshot is restored with only the settings that differ from the current values,
+written together in batches, with an '*OPC?' query at the end to wait until
+the instrument finishes.
+
+    >>> cg.restore(Snapshot.load('cg635.json'))
+    [SnapshotEntry(path='', name='frequency', index=None, ...)]
+"""
+
+import re
+import json
+import time
+import logging
+from contextlib import ExitStack
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .component import Component
+from .commands import Command
+from .indexcommands import IndexCommand
+from .exceptions import InstCommunicationError, InstQueryError, InstSetError
+from .communications.interface import MAX_BATCH_QUERIES
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 'srsgui-snapshot'
+MAX_LINE_LENGTH = 256  # Maximum length of a line of queries joined with the command separator
+OPC_QUERY = '*OPC?'  # Query to wait for the instrument to finish the commands restored
+
+SnapshotEntry = namedtuple('SnapshotEntry', ['path', 'name', 'index', 'command_class',
+                                             'query_string', 'value'])
+SnapshotEntry.__doc__ = """
+Value of a command in a Snapshot. path is the dot-separated names of the subcomponents
+from the captured component, e.g. 'output.channel1', or '' for the component itself.
+index is None for a Command.
+"""
+
+
+class Snapshot(object):
+    """
+    Typed and serializable state of a component, with a value for each command and index
+    """
+
+    def __init__(self, instrument_class='', id_string='', entries=(), errors=None, timestamp=None):
+        """
+        :param str instrument_class: class name of the captured component
+        :param str id_string: ID string of the instrument, if known
+        :param entries: list of SnapshotEntry
+        :param dict errors: error messages keyed with the query strings that failed
+        :param float timestamp: time.time() of the capture
+        """
+        self.instrument_class = instrument_class
+        self.id_string = id_string
+        self.entries = list(entries)
+        self.errors = {} if errors is None else dict(errors)
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self._index = {(e.path, e.name, e.index): e for e in self.entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __repr__(self):
+        return '<Snapshot of {} with {} values>'.format(self.instrument_class, len(self.entries))
+
+    def get(self, name, index=None, path=''):
+        """
+        Get the captured value of a command
+
+        :param str name: command name
+        :param index: index of an IndexCommand, or None
+        :param str path: dot-separated names of the subcomponents
+        :raises KeyError: if the command is not in the snapshot
+        """
+        return self._index[(path, name, index)].value
+
+    def get_entry(self, name, index=None, path=''):
+        """
+        Get the SnapshotEntry of a command, or None if not in the snapshot
+        """
+        return self._index.get((path, name, index))
+
+    def to_tree(self):
+        """
+        Get the values in nested dictionaries of subcomponents, with a dictionary
+        keyed with indexes for each IndexCommand, as returned by capture_commands()
+
+        :rtype: dict
+        """
+        tree = {}
+        for entry in self.entries:
+            node = tree
+            if entry.path:
+                for name in entry.path.split('.'):
+                    node = node.setdefault(name, {})
+            if entry.index is None:
+                node[entry.name] = entry.value
+            else:
+                node.setdefault(entry.name, {})[entry.index] = entry.value
+        return tree
+
+    def to_dict(self):
+        """
+        Get a dictionary of the snapshot, to serialize with json
+
+        :rtype: dict
+        """
+        return {'format': SNAPSHOT_FORMAT,
+                'instrument_class': self.instrument_class,
+                'id_string': self.id_string,
+                'timestamp': self.timestamp,
+                'entries': [{'path': e.path, 'name': e.name, 'index': e.index,
+                             'command_class': e.command_class, 'query_string': e.query_string,
+                             'value': e.value.tolist() if hasattr(e.value, 'tolist') else e.value}
+                            for e in self.entries],
+                'errors': self.errors}
+
+    @classmethod
+    def from_dict(cls, d):
+        """
+        Create a snapshot from a dictionary made with to_dict()
+        """
+        if d.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError('Not a snapshot: format is {}'.format(d.get('format')))
+        entries = [SnapshotEntry(e['path'], e['name'], e['index'], e['command_class'],
+                                 e['query_string'], e['value'])
+                   for e in d['entries']]
+        return cls(d.get('instrument_class', ''), d.get('id_string', ''), entries,
+                   d.get('errors'), d.get('timestamp'))
+
+    def save(self, file_name):
+        """
+        Save the snapshot to a JSON file
+        """
+        with open(file_name, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+    @classmethod
+    def load(cls, file_name):
+        """
+        Load a snapshot saved with save()
+        """
+        with open(file_name) as f:
+            return cls.from_dict(json.load(f))
+
+
+def _is_text_query(cmd):
+    """
+    Check if the command is queried with a text query and _convert_reply(),
+    or with its own __get__(), such as BinaryBlockGetCommand
+    """
+    return isinstance(cmd, IndexCommand) or type(cmd).__get__ is Command.__get__
+
+
+def plan_capture(component, include_query_only=False, include_excluded=False, path=''):
+    """
+    List the commands to query in the component and its subcomponents,
+    in the same order as capture_commands()
+
+    :return: list of tuples of (component, path, name, command, index)
+    """
+    plan = []
+    for name, child in component.__dict__.items():
+        if name == '_parent' or not isinstance(child, Component):
+            continue
+        if child in component.exclude_capture and not include_excluded:
+            continue
+        child_path = '{}.{}'.format(path, name) if path else name
+        plan.extend(plan_capture(child, include_query_only, include_excluded, child_path))
+
+    commands = {}
+    for name, cmd in component.__dict__.items():
+        if isinstance(cmd, (Command, IndexCommand)):
+            commands[name] = cmd
+    for name, cmd in component.get_command_registry().commands.items():
+        commands.setdefault(name, cmd)
+
+    for name, cmd in commands.items():
+        if name.startswith('_'):
+            continue
+        if cmd in component.exclude_capture and not include_excluded:
+            continue
+        if not cmd._get_enable or not (cmd._set_enable or include_query_only):
+            continue
+        if isinstance(cmd, IndexCommand):
+            for index in range(cmd.index_min, cmd.index_max + 1):
+                if cmd.index_dict is not None:
+                    keys = [key for key, value in cmd.index_dict.items() if value == index]
+                    if not keys:
+                        continue
+                    index = keys[0]
+                plan.append((component, path, name, cmd, index))
+        else:
+            plan.append((component, path, name, cmd, None))
+    return plan
+
+
+def capture_plan(comm, plan, max_batch=MAX_BATCH_QUERIES, max_line_length=MAX_LINE_LENGTH):
+    """
+    Query the commands in a plan made with plan_capture(), and convert the replies.
+    The values of non-volatile commands are stored in the shadow state, if enabled.
+
+    :return: list of tuples of (value, exception) in the order of the plan
+    """
+    shadow = comm.get_shadow()
+    generation = shadow.generation if shadow is not None else None
+    text_queries = []
+    for component, path, name, cmd, index in plan:
+        if _is_text_query(cmd):
+            text_queries.append(cmd._get_query_string() if index is None else cmd._get_query_string(index))
+    replies = iter(comm.run_queries(text_queries, max_batch, max_line_length))
+
+    results = []
+    for component, path, name, cmd, index in plan:
+        if not _is_text_query(cmd):
+            try:
+                results.append((cmd.__get__(component, type(component)), None))
+            except (InstCommunicationError, InstQueryError, ValueError) as e:
+                results.append((None, e))
+            continue
+        query_string = cmd._get_query_string() if index is None else cmd._get_query_string(index)
+        reply, error = next(replies)
+        if error is None:
+            try:
+                value = cmd._convert_reply(query_string, reply)
+            except InstQueryError as e:
+                value, error = None, e
+            else:
+                if shadow is not None and not cmd.volatile:
+                    shadow.store(query_string, value, generation)
+            results.append((value, error))
+        else:
+            results.append((None, error))
+    return results
+
+
+def capture(component, include_query_only=False, include_excluded=False,
+            max_batch=MAX_BATCH_QUERIES, max_line_length=MAX_LINE_LENGTH):
+    """
+    Capture a snapshot of the component and its subcomponents with batched queries
+
+    :param Component component: component or instrument to capture
+    :param bool include_query_only: include commands only to query, such as measurements
+    :param bool include_excluded: include commands and subcomponents in exclude_capture
+    :param int max_batch: maximum number of queries written together
+    :param int max_line_length: maximum length of queries joined with the command separator
+    :rtype: Snapshot
+    """
+    plan = plan_capture(component, include_query_only, include_excluded)
+    results = capture_plan(component.comm, plan, max_batch, max_line_length)
+    entries = []
+    errors = {}
+    for (_, path, name, cmd, index), (value, error) in zip(plan, results):
+        query_string = cmd._get_query_string() if index is None else cmd._get_query_string(index)
+        if error is not None:
+            logger.warning('Capture of {} failed: {}'.format(query_string, error))
+            errors[query_string] = str(error)
+            continue
+        entries.append(SnapshotEntry(path, name, index, cmd.__class__.__name__, query_string, value))
+    id_string = getattr(component, '_id_string', None) or ''
+    return Snapshot(component.__class__.__name__, id_string, entries, errors)
+
+
+def capture_all(inst_dict, include_query_only=False, include_excluded=False, max_workers=None):
+    """
+    Capture snapshots of all the connected instruments in inst_dict in parallel
+
+    :param dict inst_dict: instruments keyed with names, e.g. Task.inst_dict
+    :param int max_workers: maximum number of instruments captured at once. All, if None
+    :return: dict of Snapshot keyed with the instrument names
+    """
+    instruments = {name: inst for name, inst in inst_dict.items() if inst.is_connected()}
+    if not instruments:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(instruments),
+                            thread_name_prefix='Capture') as executor:
+        futures = {name: executor.submit(capture, inst, include_query_only, include_excluded)
+                   for name, inst in instruments.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def _get_component(component, path):
+    """
+    Get the subcomponent at the dot-separated path of names
+    """
+    if path:
+        for name in path.split('.'):
+            child = component.__dict__.get(name)
+            if not isinstance(child, Component):
+                raise AttributeError("No component named '{}' in {}"
+                                     .format(name, component.__class__.__name__))
+            component = child
+    return component
+
+
+def entries_from_tree(component, tree, path=''):
+    """
+    Convert the nested dictionaries returned by capture_commands() to a list of SnapshotEntry.
+    Items of methods, commands only to query or set, and excluded commands are skipped.
+
+    :param Component component: component the dictionaries are captured from
+    :param dict tree: dictionaries returned by capture_commands()
+    """
+    entries = []
+    for key, value in tree.items():
+        if re.search(r'\[(M|QO|SO|EX)\]', key):
+            continue
+        name = re.sub(r' <.*>$', '', key)
+        child = component.__dict__.get(name)
+        if isinstance(child, Component):
+            child_path = '{}.{}'.format(path, name) if path else name
+            entries.extend(entries_from_tree(child, value, child_path))
+            continue
+        cmd = component._find_command(name)
+        if isinstance(cmd, IndexCommand):
+            for index, item in value.items():
+                entries.append(SnapshotEntry(path, name, index, cmd.__class__.__name__,
+                                             cmd._get_query_string(index), item))
+        else:
+            entries.append(SnapshotEntry(path, name, None, cmd.__class__.__name__,
+                                         cmd._get_query_string(), value))
+    return entries
+
+
+def _restore_key(component, entry, position):
+    """
+    Sort key to restore the commands in restore_order of the component first,
+    and the others in the order of the snapshot
+    """
+    order = component.restore_order
+    if entry.name in order:
+        return 0, order.index(entry.name), position
+    return 1, 0, position
+
+
+def plan_restore(component, snapshot):
+    """
+    Find the commands in the snapshot to set, with values different from the current values.
+    A current value is taken from the shadow state, if enabled and valid, or queried
+    in batches otherwise.
+
+    :param Component component: component to restore
+    :param snapshot: Snapshot, or dictionaries returned by capture_commands()
+    :return: list of tuples of (component, command, SnapshotEntry), in the order to set
+    :raises AttributeError: if a command in the snapshot is not in the component
+    """
+    entries = snapshot.entries if isinstance(snapshot, Snapshot) else entries_from_tree(component, snapshot)
+    targets = []
+    for position, entry in enumerate(entries):
+        owner = _get_component(component, entry.path)
+        cmd = owner._find_command(entry.name)
+        if not cmd._set_enable:
+            continue
+        if isinstance(cmd, IndexCommand) and entry.index is None:
+            raise InstSetError('No index given for index command {}'.format(cmd.remote_command))
+        targets.append((_restore_key(owner, entry, position), owner, cmd, entry))
+
+    shadow = component.comm.get_shadow()
+    current = [None] * len(targets)
+    unknown = []
+    for i, (_, owner, cmd, entry) in enumerate(targets):
+        if not cmd._get_enable:
+            continue  # Always set, because the current value is not known
+        if shadow is not None and not cmd.volatile:
+            found, value = shadow.lookup(entry.query_string)
+            if found:
+                current[i] = (value, None)
+                continue
+        unknown.append(i)
+    plan = []
+    for i in unknown:
+        _, owner, cmd, entry = targets[i]
+        plan.append((owner, entry.path, entry.name, cmd, entry.index))
+    for i, result in zip(unknown, capture_plan(component.comm, plan)):
+        current[i] = result
+
+    changed = []
+    for (key, owner, cmd, entry), result in zip(targets, current):
+        if result is not None and result[1] is None and result[0] == entry.value:
+            continue
+        changed.append((key, owner, cmd, entry))
+    changed.sort(key=lambda item: item[0])
+    return [(owner, cmd, entry) for _, owner, cmd, entry in changed]
+
+
+def restore(component, snapshot, opc_query=OPC_QUERY, max_line_length=MAX_LINE_LENGTH):
+    """
+    Set the commands in the snapshot whose values differ from the current values.
+    The set commands are written together in batches, and opc_query is sent once at the end
+    to wait until the instrument finishes them.
+
+    :param Component component: component to restore
+    :param snapshot: Snapshot, or dictionaries returned by capture_commands()
+    :param str opc_query: query to wait for the instrument, or None not to wait
+    :param int max_line_length: maximum length of a line of joined commands
+    :return: list of SnapshotEntry set
+    """
+    plan = plan_restore(component, snapshot)
+    comms = []  # Normally only the comm of the component, shared by the subcomponents
+    with ExitStack() as stack:
+        for owner, cmd, entry in plan:
+            comm = owner.comm
+            if comm not in comms:
+                stack.enter_context(comm.batch(max_line_length=max_line_length))
+                comms.append(comm)
+            _send_entry(comm, cmd, entry)
+    if opc_query:
+        for comm in comms:
+            comm.query_text(opc_query)
+    return [entry for _, _, entry in plan]
+
+
+def _send_entry(comm, cmd, entry):
+    """
+    Send the set command of a snapshot entry with the comm of the component owning the command,
+    and keep the value in the shadow state, if enabled
+    """
+    if entry.index is None:
+        set_string = cmd._get_set_string(entry.value)
+        query_string = cmd._get_query_string()
+    else:
+        set_string = cmd._get_set_string(entry.index, entry.value)
+        query_string = cmd._get_query_string(entry.index)
+    try:
+        comm.send(set_string)
+    except InstCommunicationError:
+        raise InstSetError('Error during setting: CMD: {}'.format(set_string))
+    shadow = comm.get_shadow()
+    if shadow is not None and cmd._get_enable and not cmd.volatile:
+        shadow_value = cmd._get_shadow_value(query_string, entry.value)
+        if shadow_value is not None:
+            shadow.store(query_string, shadow_value)
@@ -4,16 +4,39 @@
 ##! 
 
 import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
 
 
 class DummyFigure:
     pass
 
 
-try:
-    from matplotlib.figure import Figure
-except (ImportError, ModuleNotFoundError):
-    Figure = DummyFigure
+_figure_class = None
+
+
+def get_figure_class():
+    """
+    Get matplotlib Figure class, imported at the first call, not to import
+    matplotlib with the module. DummyFigure, if matplotlib is not available.
+    """
+    global _figure_class
+    if _figure_class is None:
+        try:
+            from matplotlib.figure import Figure
+        except (ImportError, ModuleNotFoundError):
+            Figure = DummyFigure
+        _figure_class = Figure
+    return _figure_class
+
+
+def __getattr__(name):
+    # Figure is imported at the first use, not to import matplotlib with the module
+    if name == 'Figure':
+        return get_figure_class()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
 
 
 logger = logging.getLogger(__file__)
@@ -42,7 +65,7 @@ class Callbacks:
         """
         logger.info('Task.InputParameters changed')
 
-    def figure_update_requested(self, fig: Figure):
+    def figure_update_requested(self, fig: 'Figure'):
         fig.canvas.draw_idle()
 
     def data_available(self, data: dict):
@@ -5,13 +5,17 @@
 
 import sys
 import os
+import time
 import logging
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from importlib import import_module, reload, invalidate_caches
 
 from srsgui.task.task import Task, GreenNormal, RedNormal
 
 from srsgui.inst.instrument import Instrument
+from srsgui.inst.exceptions import InstCommunicationError
 
 logger = logging.getLogger(__name__)
 
@@ -21,8 +25,24 @@ class Config(object):
     DataRootDirectory = str(Path.home() / ResultDirectory)
     LocalModulePath = ['tasks', 'instruments', 'plots']
 
+    # Instruments are connected concurrently with up to MaxConnectWorkers threads.
+    # Each connection is given ConnectDeadline seconds from when it starts.
+    # A connection finishing later is disconnected and reported as failed.
+    MaxConnectWorkers = 8
+    ConnectDeadline = 30.0
+    ConnectPollInterval = 0.1  # Seconds between checks for queued connections to start
+
     def __init__(self):
         self.inst_dict = {}
+        self.connect_futures = {}
+        self._connect_lock = threading.Lock()
+        self._connect_start_times = {}  # Start time of each connection in progress
+        self._late_connects = set()  # Keys of connections past the deadline, still in progress
+
+        # Called with the inst key and None, or the exception raised,
+        # as each connection finishes, from the connecting thread
+        self.connect_callback = None
+        self._connect_executor = None
         self.task_dict = {}
         self.task_path_dict = {}
         self.docs_dict = {}
@@ -44,7 +64,16 @@ class Config(object):
                 if mod.startswith(root + '.'):
                     sys.modules.pop(mod)
 
-    def load(self, file_name):
+    def load(self, file_name, wait_connections=True):
+        """
+        Load a .taskconfig file. Instruments with a connection parameter string are
+        connected concurrently in the background.
+
+        :param str file_name: .taskconfig file to load
+        :param bool wait_connections: wait until all the connections finish, up to ConnectDeadline
+            seconds, if True. Otherwise, return after starting the connections, and use
+            connect_callback or wait_for_connections() to get the results.
+        """
         current_line = ""
         try:
             self._remove_modules()
@@ -53,6 +82,12 @@ class Config(object):
                 invalidate_caches()
                 self.inst_dict = {}
                 self.task_dict = {}
+                self.connect_futures = {}
+                with self._connect_lock:
+                    self._connect_start_times = {}
+                    self._late_connects = set()
+                self._connect_executor = ThreadPoolExecutor(max_workers=self.MaxConnectWorkers,
+                                                            thread_name_prefix='InstConnect')
 
                 for line in f:
                     current_line = line.strip()
@@ -91,6 +126,14 @@ class Config(object):
             logger.error("Error in line: {}".format(current_line))
             raise e.__class__
 
+        finally:
+            if self._connect_executor is not None:
+                self._connect_executor.shutdown(wait=False)
+                self._connect_executor = None
+
+        if wait_connections:
+            self.wait_for_connections()
+
     def load_task_from_line(self, v):
         task_name, task_module_name, task_class_name = v.split(',', 2)
         tokens = task_name.strip().split('/')
@@ -158,12 +201,116 @@ class Config(object):
         self.inst_dict[inst_key].set_name(inst_key)
         num = len(items)
         if num == 4:
+            parameter_string = items[3]
+            inst = self.inst_dict[inst_key]
+            if self._connect_executor is None:
+                self.connect_inst(inst_key, inst, parameter_string)
+            else:
+                self.connect_futures[inst_key] = self._connect_executor.submit(
+                    self.connect_inst, inst_key, inst, parameter_string)
+
+    def connect_inst(self, inst_key, inst, parameter_string):
+        """
+        Connect an instrument with a parameter string, and report the result
+        with logging and connect_callback. If the connection takes longer than
+        ConnectDeadline seconds, the instrument is disconnected and reported as failed.
+
+        :return: None, or the exception raised during the connection
+        """
+        error = None
+        start_time = time.monotonic()
+        with self._connect_lock:
+            self._connect_start_times[inst_key] = start_time
+        try:
+            inst.connect_with_parameter_string(parameter_string)
+        except Exception as e:
+            error = e
+        elapsed_time = time.monotonic() - start_time
+        with self._connect_lock:
+            self._connect_start_times.pop(inst_key, None)
+            late = inst_key in self._late_connects or elapsed_time > self.ConnectDeadline
+            self._late_connects.discard(inst_key)
+
+        if error is None:
+            if self.inst_dict.get(inst_key) is not inst:
+                inst.disconnect()  # Another config loaded during the connection
+                return None
+            if late:
+                inst.disconnect()
+                error = self._deadline_error(inst_key)
+                logger.error('"{}": {}, connected in {:.3f} s'.format(inst_key, error, elapsed_time))
+            else:
+                logger.debug('"{}" connected in {:.3f} s'.format(inst_key, elapsed_time))
+        else:
+            logger.error('"{}": {}'.format(inst_key, error))
+
+        if self.connect_callback:
             try:
-                parameter_string = items[3]
-                inst = self.inst_dict[inst_key]
-                inst.connect_with_parameter_string(parameter_string)
+                self.connect_callback(inst_key, error)
             except Exception as e:
-                logger.error(e)
+                logger.error('Error in connect_callback: {}'.format(e))
+        return error
+
+    @staticmethod
+    def _deadline_error(inst_key):
+        return InstCommunicationError('"{}" not connected within the deadline'.format(inst_key))
+
+    def _expire_connection(self, inst_key):
+        """
+        Mark a connection in progress as late, to be disconnected when it finishes
+
+        :return: False if the connection has already finished
+        """
+        with self._connect_lock:
+            if inst_key not in self._connect_start_times:
+                return False
+            self._late_connects.add(inst_key)
+            return True
+
+    def wait_for_connections(self, timeout=None):
+        """
+        Wait until the instrument connections started by load() finish
+
+        :param float timeout: seconds to wait, or None to wait until each connection finishes or
+                              ConnectDeadline seconds pass from when it started. A connection past
+                              its deadline is disconnected when it finishes, and reported as failed
+                              with connect_callback. With a timeout, the connections are left running.
+        :return: dict of inst keys and None, or the exception raised during the connection.
+                 InstCommunicationError for a connection not finished in time.
+        """
+        wait_deadline = None if timeout is None else time.monotonic() + timeout
+        pending = dict(self.connect_futures)
+        results = {}
+        while pending:
+            now = time.monotonic()
+            wait_time = None
+            for key, future in list(pending.items()):
+                if future.done():
+                    results[key] = future.result()
+                    del pending[key]
+                    continue
+
+                if wait_deadline is not None:
+                    deadline = wait_deadline
+                else:
+                    with self._connect_lock:
+                        start_time = self._connect_start_times.get(key)
+                    if start_time is None:
+                        # Queued behind other connections, or just finished
+                        wait_time = self.ConnectPollInterval if wait_time is None \
+                            else min(wait_time, self.ConnectPollInterval)
+                        continue
+                    deadline = start_time + self.ConnectDeadline
+
+                if now < deadline:
+                    wait_time = deadline - now if wait_time is None else min(wait_time, deadline - now)
+                elif wait_deadline is not None or self._expire_connection(key):
+                    results[key] = self._deadline_error(key)
+                    logger.error('"{}": {}'.format(key, results[key]))
+                    del pending[key]
+            if pending:
+                wait(list(pending.values()), wait_time, return_when=FIRST_COMPLETED)
+        return results
 
     def load_docs_from_line(self, v):
         items = v.split(',')
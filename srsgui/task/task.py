@@ -7,17 +7,18 @@ import sys
 import traceback
 import logging
 import time
+from typing import TYPE_CHECKING
 
 from .inputs import FloatInput, StringInput
 from .taskresult import TaskResult, ResultLogHandler
-from .callbacks import Callbacks, DummyFigure
+from .callbacks import Callbacks, get_figure_class
 
-from srsgui.inst.instrument import Instrument
-
-try:
+if TYPE_CHECKING:
     from matplotlib.figure import Figure
-except (ImportError, ModuleNotFoundError):
-    Figure = DummyFigure
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.communications.prioritylock import set_thread_priority, \
+                                                    PRIORITY_TASK, PRIORITY_INTERACTIVE
 
 try:
     from srsgui.ui.qt.QtCore import QThread
@@ -26,6 +27,14 @@ except (ImportError, ModuleNotFoundError):
     from threading import Thread
     thread_class = Thread
 
+
+def __getattr__(name):
+    # Keeps 'from srsgui.task.task import Figure' working, with matplotlib imported only then
+    if name == 'Figure':
+        return get_figure_class()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
 # HTML formatter for QTextBrowser
 Bold = '<font color="black"><b>{}</b></font>'
 GreenBold = '<font color="green"><b>{}</b></font>'
@@ -111,6 +120,9 @@ class Task(thread_class):
 
         self.round_float_resolution = 4
 
+        # Locks of communication interfaces paused with pause_background_io()
+        self._paused_locks = []
+
     def setup(self):
         """
         The task-specific preparation before running test() comes in here.
@@ -192,6 +204,7 @@ class Task(thread_class):
         try:
             Task._is_running = False
             self._keep_running = False
+            self.resume_background_io()
 
             self.result.set_stop_time_now()
             if self._aborted:
@@ -226,6 +239,8 @@ class Task(thread_class):
         """
         Overrides Thread run() method. task-specific test() runs inside this method.
         """
+        # Communication from the task thread gets priority over GUI polling
+        set_thread_priority(PRIORITY_TASK)
         try:
             self.callbacks.started()
             self.basic_setup()
@@ -278,6 +293,27 @@ class Task(thread_class):
         else:
             time.sleep(seconds)
 
+    def pause_background_io(self):
+        """
+        Pause background polling, such as the command tree updates in GUI, on the
+        communication interfaces of the instruments in inst_dict, until resume_background_io()
+        is called or the task finishes. Use it during a time-critical part of test().
+        """
+        if self._paused_locks:
+            return
+        for inst in self.inst_dict.values():
+            lock = inst.comm.get_lock()
+            if hasattr(lock, 'pause'):
+                lock.pause(PRIORITY_INTERACTIVE)
+                self._paused_locks.append(lock)
+
+    def resume_background_io(self):
+        """
+        Resume background polling paused with pause_background_io()
+        """
+        while self._paused_locks:
+            self._paused_locks.pop().resume()
+
     def set_session_handler(self, session_handler):
         """
         Parent should set a session handler for Task to use file output.
@@ -323,7 +359,7 @@ class Task(thread_class):
         Parent should set figure_dict for Task to use Matplotlib figures available from the parent.
         """
 
-        if not self._check_dict_items(figure_dict, Figure):
+        if not self._check_dict_items(figure_dict, get_figure_class()):
             raise AttributeError('invalid figure_dict for Task class')
         self.figure_dict = figure_dict
         if figure_dict:
@@ -332,7 +368,7 @@ class Task(thread_class):
             self.figure = None
             raise ValueError('No figure in figure_dict to set as default')
 
-    def get_figure(self, name=None) -> Figure:
+    def get_figure(self, name=None) -> 'Figure':
         """
         Get a Matplotlib figure from figure_dict.
         if name is None, it will return the first figure in figure_dict as the default.
@@ -594,15 +630,15 @@ class Task(thread_class):
         It requests the parent of the task to update the figure,
         if the callback is set up properly.
         """
-        if type(figure) is not Figure:
+        if type(figure) is not get_figure_class():
             figure = self.figure
         self.callbacks.figure_update_requested(figure)
 
-    def update_figure(self, figure: Figure):
+    def update_figure(self, figure: 'Figure'):
         """
         Deprecated. Use request_figure_update instead.
         """
-        if type(figure) is not Figure:
+        if type(figure) is not get_figure_class():
             raise TypeError('{} is not  a Figure'.format(type(figure)))
         self.callbacks.figure_update_requested(figure)
 
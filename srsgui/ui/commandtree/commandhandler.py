@@ -6,6 +6,7 @@
 import logging
 
 from srsgui.ui.qt.QtCore import QObject, QThread, QModelIndex, Signal
+from srsgui.inst.communications.prioritylock import io_priority, PRIORITY_BACKGROUND
 from .commanditem import Index
 
 logger = logging.getLogger(__name__)
@@ -19,7 +20,8 @@ class CommandWorker(QObject):
         try:
             item = index.internalPointer()
             old_value = item.value
-            new_value = item.query_value()
+            with io_priority(PRIORITY_BACKGROUND):  # Periodic updates yield to tasks and user input
+                new_value = item.query_value()
             changed = old_value != new_value
             self.query_processed.emit((index, new_value, changed))
         except Exception as e:
@@ -215,37 +215,31 @@ class CommandItem:
 
             current_attributes = []
 
-            for c in comp.__class__.__mro__:  # loop through the classes including super classes
-                if not issubclass(c, Component):  # it should be a subclass of Component
-                    break
-                if c == Component:  # But it should not be Component
-                    break
-
-                for key in c.__dict__:
-                    cmd_instance = c.__dict__[key]
-                    if key in current_attributes:
+            # the classes including super classes
+            for key, cmd_instance in comp.get_command_registry().attributes:
+                if key in current_attributes:
+                    continue
+                current_attributes.append(key)
+
+                if issubclass(cmd_instance.__class__, Command):
+                    child = cls.load(cmd_instance, root_item)
+                    child.name = key
+                    child.comp = cmd_instance
+                    child.comp_type = type(cmd_instance)
+
+                    root_item.appendChild(child)
+
+                elif callable(cmd_instance):
+                    if issubclass(cmd_instance.__class__, type):
                         continue
-                    current_attributes.append(key)
-
-                    if issubclass(cmd_instance.__class__, Command):
-                        child = cls.load(cmd_instance, root_item)
-                        child.name = key
-                        child.comp = cmd_instance
-                        child.comp_type = type(cmd_instance)
-
-                        root_item.appendChild(child)
-
-                    elif callable(cmd_instance):
-                        if issubclass(cmd_instance.__class__, type):
-                            continue
-                        if key.startswith('_'):
-                            continue
-                        
-                        child = cls.load(cmd_instance, root_item)
-                        child.name = key
-                        child.comp = cmd_instance
-                        child.comp_type = type(cmd_instance)
-                        root_item.appendChild(child)
+                    if key.startswith('_'):
+                        continue
+                    
+                    child = cls.load(cmd_instance, root_item)
+                    child.name = key
+                    child.comp = cmd_instance
+                    child.comp_type = type(cmd_instance)
+                    root_item.appendChild(child)
 
             for key in comp.__dict__:  # Loop through the instance of the component
                 cmd_instance = comp.__dict__[key]
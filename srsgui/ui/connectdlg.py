@@ -4,15 +4,18 @@
 ##! 
 
 import logging
-from .qt.QtCore import Qt, QSettings
+import ipaddress
+from .qt.QtCore import Qt, QSettings, QThread, Signal
 from .qt.QtWidgets import QDialog, QDialogButtonBox, \
                           QVBoxLayout, QGridLayout,\
                           QSpacerItem, QSizePolicy, \
                           QTabWidget, QWidget, QLabel, \
                           QLineEdit, QSpinBox, QComboBox, \
-                          QMessageBox
+                          QMessageBox, QPushButton, QApplication, \
+                          QInputDialog
 
 from srsgui.inst.instrument import Instrument
+from srsgui.inst.communications.lan_discovery import DEFAULT_PORTS
 from srsgui.task.inputs import BaseInput, IntegerInput, IntegerListInput, \
                                Ip4Input, BoolInput, StringInput, \
                                FindListInput, PasswordInput
@@ -20,6 +23,28 @@ from srsgui.task.inputs import BaseInput, IntegerInput, IntegerListInput, \
 logger = logging.getLogger(__name__)
 
 
+class NetworkScanThread(QThread):
+    """
+    Thread to find instruments on the network without blocking the GUI
+    """
+    scan_finished = Signal(object)  # list of DiscoveredInstrument
+    scan_failed = Signal(str)
+
+    def __init__(self, inst, network, ports, parent=None):
+        super().__init__(parent)
+        self.inst = inst
+        self.network = network
+        self.ports = ports
+
+    def run(self):
+        try:
+            found = self.inst.find_on_network(self.network, self.ports)
+        except Exception as e:
+            self.scan_failed.emit(str(e))
+            return
+        self.scan_finished.emit(found)
+
+
 class ConnectDlg(QDialog):
     """
     * To build the connection dialog box based on *available_interface* of subclasses of
@@ -35,6 +60,7 @@ class ConnectDlg(QDialog):
         self.parent = parent
         self.tabs = []
         self.settings = QSettings()
+        self._scan = None  # (tab, key, button, network) of the scan running
 
         self.resize(350, 100)
         self.setWindowTitle('Connect to "{}"'.format(self.inst.get_name()))
@@ -78,6 +104,11 @@ class ConnectDlg(QDialog):
             grid.addWidget(label, row, 0, 1, 1)
             grid.addWidget(widget, row, 1, 1, 1)
             tab.widget_dict[key] = widget
+            if type(parameters[key]) == Ip4Input:
+                button = QPushButton('Scan')
+                button.setToolTip('Find instruments on the /24 network of the IP address')
+                button.clicked.connect(lambda checked=False, t=tab, k=key, b=button: self.scan_network(t, k, b))
+                grid.addWidget(button, row, 2, 1, 1)
         spacer = QSpacerItem(20, 40, QSizePolicy.Minimum, QSizePolicy.Expanding)
         grid.addItem(spacer, row + 1, 1, 1, 1)
         return tab
@@ -141,6 +172,66 @@ class ConnectDlg(QDialog):
         else:
             return QLabel('Unknown input type: {}'.format(input_item.__class__.__name__))
 
+    def scan_network(self, tab, key, button):
+        """
+        Scan the /24 network of the IP address in the tab for instruments of the class
+        in a NetworkScanThread, and fill the IP address and port with the one selected
+        when the scan finishes
+        """
+        if self._scan is not None:
+            return
+        ip_widget = tab.widget_dict[key]
+        port_widget = tab.widget_dict.get('port')
+        try:
+            network = ipaddress.ip_network('{}/24'.format(Ip4Input(ip_widget.text()).get_value()),
+                                           strict=False)
+        except ValueError:
+            network = None  # Scan the local network
+
+        ports = None
+        if type(port_widget) == QSpinBox:
+            ports = [port_widget.value()] + [p for p in DEFAULT_PORTS if p != port_widget.value()]
+
+        self._scan = (tab, key, button, network)
+        button.setEnabled(False)
+        button.setText('Scanning...')
+        # Parented to the application, to finish even if the dialog is closed during the scan
+        thread = NetworkScanThread(self.inst, None if network is None else str(network), ports,
+                                   QApplication.instance())
+        thread.scan_finished.connect(self.on_scan_finished)
+        thread.scan_failed.connect(self.on_scan_failed)
+        thread.finished.connect(thread.deleteLater)
+        thread.start()
+
+    def on_scan_failed(self, error):
+        logger.error('Error during network scan: {}'.format(error))
+        self.on_scan_finished([])
+
+    def on_scan_finished(self, found):
+        if self._scan is None:
+            return
+        tab, key, button, network = self._scan
+        self._scan = None
+        button.setText('Scan')
+        button.setEnabled(True)
+        if not self.isVisible():  # Closed during the scan
+            return
+        ip_widget = tab.widget_dict[key]
+        port_widget = tab.widget_dict.get('port')
+
+        if not found:
+            QMessageBox.information(self, 'Scan', 'No {} found on {}'.format(
+                self.inst.__class__.__name__, network if network else 'the local network'))
+            return
+        items = ['{}:{}  {}'.format(d.ip_address, d.port, d.id_string) for d in found]
+        item, ok = QInputDialog.getItem(self, 'Scan', 'Instruments found:', items, 0, False)
+        if not ok:
+            return
+        selected = found[items.index(item)]
+        ip_widget.setText(selected.ip_address)
+        if type(port_widget) == QSpinBox:
+            port_widget.setValue(selected.port)
+
     def accept(self):
         try:
             if self.inst.is_connected():
@@ -6,6 +6,7 @@
 import logging
 
 from .qt.QtWidgets import QTabWidget, QWidget,  QTextBrowser, QHBoxLayout
+from srsgui.inst.communications.prioritylock import io_priority, PRIORITY_BACKGROUND
 
 logger = logging.getLogger(__name__)
 
@@ -54,9 +55,10 @@ class DeviceInfoHandler(object):
         inst = self.parent.inst_dict[inst_name]
 
         if inst.is_connected():
-            msg = ''  # Name: {} \n S/N: {} \n F/W version: {} \n\n'.format(*inst.check_id())
-            msg += '  * Info *\n {} \n\n'.format(inst.get_info())
-            msg += '  * Status *\n {} \n'.format(inst.get_status())
+            with io_priority(PRIORITY_BACKGROUND):  # Info updates yield to tasks and user input
+                msg = ''  # Name: {} \n S/N: {} \n F/W version: {} \n\n'.format(*inst.check_id())
+                msg += '  * Info *\n {} \n\n'.format(inst.get_info())
+                msg += '  * Status *\n {} \n'.format(inst.get_status())
         else:
             msg = "Disconnected"
 
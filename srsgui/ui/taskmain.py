@@ -13,7 +13,7 @@ from pathlib import Path
 import webbrowser
 
 from .qt import QT_BINDER, PYSIDE6, QT_BINDER_VERSION
-from .qt.QtCore import QTimer, QSettings
+from .qt.QtCore import QTimer, QSettings, Signal
 from .qt.QtWidgets import QMainWindow, QApplication, QTextBrowser,\
                                 QVBoxLayout, QMessageBox, \
                                 QInputDialog, QFileDialog, \
@@ -32,6 +32,8 @@ from .deviceinfohandler import DeviceInfoHandler
 
 from .dockhandler import DockHandler
 
+from srsgui.inst.communications.serial_ports import refresh_in_background as \
+    refresh_serial_ports_in_background
 from srsgui.task.config import Config
 from srsgui.task.sessionhandler import SessionHandler
 from srsgui.task.task import Task, Bold
@@ -52,6 +54,10 @@ class TaskMain(QMainWindow, Ui_TaskMain):
     OrganizationName = 'srsinst'
     ApplicationName = 'srsgui'
 
+    # Emitted with the inst name and None, or the exception raised, as each connection
+    # started by Config.load() finishes
+    inst_connection_finished = Signal(str, object)
+
     LogoImageFile = 'srslogo.jpg'
     LogoFile = str(Path(__file__).parent / LogoImageFile)
 
@@ -91,12 +97,17 @@ class TaskMain(QMainWindow, Ui_TaskMain):
         self.terminal_widget = self.dock_handler.terminal_widget
         self.plotDockWidget = self.dock_handler.get_dock()
 
+        # Find serial ports in the background, so that the connect dialog opens without delay
+        refresh_serial_ports_in_background()
+
         # Make the terminal not blocking for log query
 
         self.geometry_dict = {}
         try:
             default_config_file = self.DefaultConfigFile
             self.config = Config()
+            self.config.connect_callback = self.inst_connection_finished.emit
+            self.inst_connection_finished.connect(self.onInstConnectionFinished)
             self.base_data_dir = self.config.base_data_dir
             self.base_log_file_name = self.config.base_log_file_name
 
@@ -187,7 +198,7 @@ class TaskMain(QMainWindow, Ui_TaskMain):
             self.initial_load = False
 
             logger.debug('Set the current directory to "{}"'.format(current_dir))
-            self.config.load(self.default_config_file)
+            self.config.load(self.default_config_file, wait_connections=False)
             logger.debug('TaskConfig file: "{}"  loading done'.format(self.default_config_file))
 
             for instr in prev_inst_dict:
@@ -200,8 +211,7 @@ class TaskMain(QMainWindow, Ui_TaskMain):
 
             self.inst_info_handler.update_tabs()
             for inst_name in self.inst_dict:
-                self.inst_dict[inst_name].check_id()
-                self.inst_info_handler.update_info(inst_name)
+                self.inst_info_handler.update_info(inst_name)  # check_id() as each connection finishes
 
             self.setWindowTitle(self.config.task_dict_name)
             self.dock_handler.display_image(self.get_logo_file())
@@ -364,6 +374,21 @@ class TaskMain(QMainWindow, Ui_TaskMain):
         except Exception as e:
             logger.error('Error onTaskFinished: {}'.format(e))
 
+    def onInstConnectionFinished(self, inst_name, error):
+        """
+        Update the info of an instrument, as its connection finishes during config loading
+        """
+        try:
+            if inst_name not in self.inst_dict:
+                return
+            inst = self.inst_dict[inst_name]
+            if error is None and inst.is_connected():
+                inst.check_id()
+                logger.info('"{}" connected'.format(inst_name))
+            self.inst_info_handler.update_info(inst_name)
+        except Exception as e:
+            logger.error('Error onInstConnectionFinished: {}'.format(e))
+
     def is_task_running(self):
         """
         Check if a task is running
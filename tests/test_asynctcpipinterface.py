@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+from srsgui.inst.exceptions import InstCommunicationError
+from srsgui.inst.simulator import InstrumentSimulator, SimulatorServer
+from srsgui.inst.communications.asynctcpipinterface import AsyncTcpipInterface
+
+
+class ScpiInstrument(Instrument):
+    _IdString = 'TEST'
+    _cmd_separator = ';'
+    frequency = FloatCommand('FREQ')
+
+
+@pytest.fixture
+def simulator_server():
+    server = SimulatorServer(InstrumentSimulator(ScpiInstrument))
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_not_connected():
+    comm = AsyncTcpipInterface()
+    with pytest.raises(InstCommunicationError):
+        asyncio.run(comm.send('FREQ 1'))
+    with pytest.raises(InstCommunicationError):
+        asyncio.run(comm.query_text('FREQ?'))
+
+
+def test_query(simulator_server):
+    simulator_server.simulator.set_reply('NAME?', 'a;b')
+
+    async def run():
+        comm = AsyncTcpipInterface()
+        comm.set_cmd_separator(';')
+        await comm.connect('127.0.0.1', simulator_server.port)
+        try:
+            await comm.send('FREQ 10.0')
+            return await comm.query_float('FREQ?'), await comm.query_many(['NAME?', ('FREQ?', float)])
+        finally:
+            await comm.disconnect()
+
+    assert asyncio.run(run()) == (10.0, ['a;b', 10.0])
+
+
+def test_timeout_closes_connection(simulator_server):
+    simulator_server.simulator.latency = 0.3
+
+    async def run():
+        comm = AsyncTcpipInterface()
+        comm.set_timeout(0.1)
+        await comm.connect('127.0.0.1', simulator_server.port)
+        try:
+            with pytest.raises(InstCommunicationError):
+                await comm.query_text('FREQ?')
+            assert not comm.is_connected()
+            await asyncio.sleep(0.4)  # The late reply must not be read as the next reply
+            with pytest.raises(InstCommunicationError):
+                await comm.query_text('*IDN?')
+        finally:
+            await comm.disconnect()
+
+    asyncio.run(run())
+
+
+def test_split_reply():
+    comm = AsyncTcpipInterface()
+    comm.set_cmd_separator(';')
+    assert comm._split_reply(b'1.0; 2 ;abc\n', 3) == ['1.0', '2', 'abc']
+    assert comm._split_reply(b'a;b;1.0\n', 2) is None
+    assert comm._encode_queries(['A?', 'B?']) == b'A?\nB?\n'
+    assert comm._encode_command('A 1') == b'A 1\n'
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+
+
+class ScpiInstrument(Instrument):
+    _IdString = 'TEST'
+    _cmd_separator = ';'
+    frequency = FloatCommand('FREQ')
+    phase = FloatCommand('PHAS')
+
+
+@pytest.fixture(params=[False, True], ids=['direct', 'io_thread'])
+def inst(request):
+    inst = ScpiInstrument()
+    inst.connect('sim')
+    if request.param:
+        inst.comm.start_io_thread()
+    writes = []
+    write_binary = inst.comm._write_binary
+
+    def record_write(data):
+        writes.append(bytes(data))
+        write_binary(data)
+
+    inst.comm._write_binary = record_write
+    inst.writes = writes
+    yield inst
+    inst.comm.stop_io_thread()
+
+
+def test_batch_joins_commands(inst):
+    with inst.comm.batch():
+        assert inst.comm.is_batching()
+        inst.frequency = 10.0
+        inst.phase = 20.0
+        assert inst.writes == []
+    assert inst.writes == [b'FREQ 10.0;PHAS 20.0\n']
+    assert not inst.comm.is_batching()
+    assert inst.frequency == 10.0
+
+
+def test_batch_flushed_before_query(inst):
+    with inst.comm.batch():
+        inst.frequency = 10.0
+        assert inst.phase == 0.0
+        assert inst.writes[0] == b'FREQ 10.0\n'
+
+
+def test_batch_of_another_thread(inst):
+    entered = threading.Event()
+    done = threading.Event()
+
+    def run_batch():
+        with inst.comm.batch():
+            inst.comm.send('FREQ 10.0')
+            entered.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=run_batch)
+    thread.start()
+    entered.wait(5)
+    assert not inst.comm.is_batching()
+    inst.comm.send('PHAS 20.0')  # Not buffered in the batch of the other thread
+    assert inst.writes == [b'PHAS 20.0\n']
+    done.set()
+    thread.join()
+    assert inst.writes == [b'PHAS 20.0\n', b'FREQ 10.0\n']
+
+
+def test_shadow_invalidated_by_query(inst):
+    inst.comm.enable_shadow()
+    assert inst.frequency == 0.0
+    inst.comm.get_simulator().set_register('FREQ', '5.0')
+    assert inst.frequency == 0.0  # From the shadow state
+    assert inst.comm.query_text('*RST;*OPC?') == '1'
+    assert inst.frequency == 0.0
+    assert inst.comm.get_shadow().get_stats()['misses'] == 2
+
+
+def test_shadow_invalidated_by_batch(inst):
+    inst.comm.enable_shadow()
+    assert inst.frequency == 0.0
+    with inst.comm.batch():
+        inst.comm.send('FREQ 5.0')
+    assert inst.frequency == 5.0
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+from srsgui.inst.exceptions import InstCommunicationError
+from srsgui.inst.simulator import InstrumentSimulator, SimulatorServer
+from srsgui.inst.communications import TcpipInterface
+
+
+class BlockInstrument(Instrument):
+    _IdString = 'TEST'
+    frequency = FloatCommand('FREQ')
+
+
+@pytest.fixture
+def comm():
+    simulator = InstrumentSimulator(BlockInstrument)
+    data = np.arange(-50, 50, dtype='<i2')
+    simulator.set_block_generator('BLK?', lambda args: data)
+    simulator.set_handler('WF?', lambda args: b'DAT2,#14\x01\x02\x03\x04\n\n')
+    server = SimulatorServer(simulator)
+    server.start()
+    comm = TcpipInterface()
+    comm.connect('127.0.0.1', server.port)
+    comm.set_timeout(2)
+    yield comm
+    comm.disconnect()
+    server.stop()
+
+
+def test_query_block(comm):
+    data = comm.query_block('BLK?', dtype='<i2')
+    assert np.array_equal(data, np.arange(-50, 50))
+    assert comm.query_text('FREQ?') == '0.0'  # The trailer is read
+
+
+def test_query_block_into_buffer(comm):
+    out = np.zeros(200, dtype='<i2')
+    data = comm.query_block('BLK?', out=out, dtype='<i2')
+    assert np.shares_memory(data, out)
+    assert np.array_equal(out[:100], np.arange(-50, 50))
+
+
+def test_query_block_small_buffer(comm):
+    with pytest.raises(ValueError):
+        comm.query_block('BLK?', out=bytearray(10))
+    assert comm.query_text('FREQ?') == '0.0'  # The rest of the block is discarded
+
+
+def test_query_block_invalid_length(comm):
+    with pytest.raises(InstCommunicationError):
+        comm.query_block('WF?', dtype='<f8', trailer=b'\n\n')
+    assert comm.query_text('FREQ?') == '0.0'
+
+
+def test_query_block_prefix_and_trailer(comm):
+    data = comm.query_block('WF?', dtype='int8', trailer=b'\n\n')
+    assert list(data) == [1, 2, 3, 4]
+    assert comm.query_text('FREQ?') == '0.0'
+
+
+def test_query_block_invalid_trailer(comm):
+    with pytest.raises(InstCommunicationError):
+        comm.query_block('WF?', dtype='int8', trailer=b'\r\n')
@@ -0,0 +1,186 @@
+import time
+import threading
+
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+from srsgui.inst.exceptions import InstCommunicationError, InstTimeoutError
+from srsgui.inst.simulator import InstrumentSimulator
+from srsgui.inst.broker import InstrumentBroker, BrokerServer
+
+
+class SharedInstrument(Instrument):
+    _IdString = 'TEST'
+    _cmd_separator = ';'
+    frequency = FloatCommand('FREQ')
+    phase = FloatCommand('PHAS')
+
+
+class Broker(object):
+    """
+    Broker of a simulated instrument, serving clients over a Unix domain socket
+    """
+
+    def __init__(self, socket_path, cache_ttl=0.0):
+        self.simulator = InstrumentSimulator(SharedInstrument)
+        self.inst = SharedInstrument()
+        self.inst.connect('sim', self.simulator)
+        self.broker = InstrumentBroker(self.inst.comm, cache_ttl)
+        self.server = BrokerServer(self.broker, socket_path)
+        self.server.start()
+        self.clients = []
+
+    def connect_client(self):
+        client = SharedInstrument()
+        client.connect('broker', self.server.socket_path)
+        self.clients.append(client)
+        return client
+
+    def record_writes(self, delay=0.0):
+        writes = []
+        write_binary = self.inst.comm._write_binary
+
+        def record_write(data):
+            writes.append(bytes(data))
+            time.sleep(delay)
+            write_binary(data)
+
+        self.inst.comm._write_binary = record_write
+        return writes
+
+    def stop(self):
+        for client in self.clients:
+            client.disconnect()
+        self.server.stop()
+
+
+@pytest.fixture
+def broker(tmp_path):
+    broker = Broker(str(tmp_path / 'broker.sock'))
+    yield broker
+    broker.stop()
+
+
+@pytest.fixture
+def cached_broker(tmp_path):
+    broker = Broker(str(tmp_path / 'cached.sock'), cache_ttl=10.0)
+    yield broker
+    broker.stop()
+
+
+def test_query_and_set(broker):
+    client = broker.connect_client()
+    client.frequency = 1000.0
+    assert client.frequency == 1000.0
+    assert client.comm.query_many(['FREQ?', ('PHAS?', float)]) == ['1000.0', 0.0]
+    assert broker.simulator.get_register('FREQ') == '1000.0'
+
+
+def test_shared_queries(broker):
+    clients = [broker.connect_client() for _ in range(5)]
+    broker.simulator.latency = 0.2
+    stats = broker.broker.get_stats()
+    replies = []
+
+    def query(client, cmd):
+        replies.append(client.query_text(cmd))
+
+    threads = [threading.Thread(target=query, args=(clients[0], 'FREQ?'))]
+    threads[0].start()
+    time.sleep(0.05)  # The others wait while the broker is busy with the first query
+    for client in clients[1:]:
+        threads.append(threading.Thread(target=query, args=(client, 'PHAS?')))
+        threads[-1].start()
+    for thread in threads:
+        thread.join(5)
+    new_stats = broker.broker.get_stats()
+    assert sorted(replies) == ['0.0'] * 5
+    assert new_stats['requests'] - stats['requests'] == 5
+    assert new_stats['shared_queries'] - stats['shared_queries'] == 3
+    assert new_stats['instrument_queries'] - stats['instrument_queries'] == 2
+
+
+def test_cache(cached_broker):
+    client = cached_broker.connect_client()
+    simulator = cached_broker.simulator
+    assert client.frequency == 0.0
+    queries = simulator.query_count
+    assert client.frequency == 0.0
+    assert simulator.query_count == queries  # Served from the cache
+    client.comm.max_age = 0
+    assert client.frequency == 0.0
+    assert simulator.query_count == queries + 1
+    client.comm.max_age = None
+    other = cached_broker.connect_client()
+    other.frequency = 5.0  # Clears the cache
+    assert client.frequency == 5.0
+    assert simulator.query_count == queries + 2
+    assert cached_broker.broker.get_stats()['cache_hits'] == 1
+
+
+def test_cache_expires(tmp_path):
+    broker = Broker(str(tmp_path / 'expiring.sock'), cache_ttl=0.05)
+    try:
+        client = broker.connect_client()
+        client.frequency
+        queries = broker.simulator.query_count
+        time.sleep(0.1)
+        client.frequency
+        assert broker.simulator.query_count == queries + 1
+    finally:
+        broker.stop()
+
+
+def test_error_types(broker):
+    client = broker.connect_client()
+    with pytest.raises(InstTimeoutError):
+        client.query_text('NOREPLY?')  # No reply from the simulator for an unknown command
+    with pytest.raises(InstCommunicationError):
+        with client.comm.get_lock():
+            client.comm._request({'op': 'invalid'})  # ValueError in the broker
+    assert client.frequency == 0.0  # Still in sync with the broker
+
+
+def test_write_block(broker):
+    client = broker.connect_client()
+    writes = broker.record_writes()
+    data = b'A' * 2500
+    progress = []
+    client.comm.write_block('DATA ', data, chunk_size=1000,
+                            progress=lambda n, total: progress.append(n))
+    assert b''.join(writes) == b'DATA #42500' + data + b'\n'
+    assert progress == [1000, 2000, 2500]
+    assert client.frequency == 0.0
+
+
+def test_write_block_not_interleaved(broker):
+    uploader = broker.connect_client()
+    setter = broker.connect_client()
+    writes = broker.record_writes(delay=0.001)
+    data = b'A' * 20000
+    done = threading.Event()
+
+    def set_repeatedly():
+        while not done.is_set():
+            setter.frequency = 1.0
+
+    thread = threading.Thread(target=set_repeatedly)
+    thread.start()
+    try:
+        time.sleep(0.01)
+        uploader.comm.write_block('DATA ', data, chunk_size=1000)
+    finally:
+        done.set()
+        thread.join(5)
+    assert b'DATA #520000' + data + b'\n' in b''.join(writes)
+    assert b''.join(writes).count(b'FREQ') > 1
+
+
+def test_write_block_cancelled(broker):
+    client = broker.connect_client()
+    with pytest.raises(InstCommunicationError):
+        client.comm.write_block('DATA ', b'A' * 3000, chunk_size=1000,
+                                cancel=lambda: True)
+    assert not client.comm.is_connected()
+    assert broker.connect_client().frequency == 0.0  # The broker still serves other clients
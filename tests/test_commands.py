@@ -0,0 +1,49 @@
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand, FloatArrayGetCommand
+from srsgui.inst.indexcommands import FloatIndexCommand
+
+
+class QueriedInstrument(Instrument):
+    _IdString = 'TEST'
+    frequency = FloatCommand('FREQ')
+    trace = FloatArrayGetCommand('TRAC', get_command_format='{}? 1')
+    parameter = FloatIndexCommand('PARAM', index_max=3)
+
+
+def test_query_string():
+    cmd = FloatCommand('FREQ')
+    assert cmd._get_query_string() == 'FREQ?'
+    cmd.remote_command = 'FREQUENCY'
+    assert cmd._get_query_string() == 'FREQUENCY?'
+    cmd._get_command_format = '{}? MAX'
+    assert cmd._get_query_string() == 'FREQUENCY? MAX'
+    assert QueriedInstrument.trace._get_query_string() == 'TRAC? 1'
+
+
+def test_index_query_string():
+    cmd = FloatIndexCommand('PARAM', index_max=3, index_dict={'front': 0})
+    assert cmd._get_query_string('front') == 'PARAM? 0'
+    cmd.index_dict = {'front': 1}
+    assert cmd._get_query_string('front') == 'PARAM? 1'
+    cmd.remote_command = 'PAR'
+    assert cmd._get_query_string(1) == 'PAR? 1'
+
+
+def test_query_commands():
+    inst = QueriedInstrument()
+    inst.connect('sim')
+    inst.frequency = 100.0
+    inst.parameter[2] = 5.0
+    assert inst.query_commands(['frequency', ('parameter', 2)]) == {'frequency': 100.0,
+                                                                   ('parameter', 2): 5.0}
+
+
+def test_value_not_kept_in_descriptor():
+    first = QueriedInstrument()
+    first.connect('sim')
+    second = QueriedInstrument()
+    second.connect('sim')
+    first.frequency = 100.0
+    assert first.frequency == 100.0
+    assert second.frequency == 0.0
+    assert QueriedInstrument.frequency._value == ''  # Still the default value
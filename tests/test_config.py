@@ -0,0 +1,91 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from srsgui.task.config import Config
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.exceptions import InstCommunicationError
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'DataRootDirectory', str(tmp_path))
+    return Config()
+
+
+def test_load_connects_instruments(config, tmp_path):
+    file_name = tmp_path / 'test.taskconfig'
+    file_name.write_text('name: test\n'
+                         'inst: sim1, srsgui.inst.instrument, Instrument, sim:\n'
+                         'inst: sim2, srsgui.inst.instrument, Instrument, sim:\n'
+                         'inst: offline, srsgui.inst.instrument, Instrument\n')
+    reported = {}
+    config.connect_callback = lambda key, error: reported.setdefault(key, error)
+    config.load(str(file_name))
+    assert config.inst_dict['sim1'].is_connected()
+    assert config.inst_dict['sim2'].is_connected()
+    assert not config.inst_dict['offline'].is_connected()
+    assert reported == {'sim1': None, 'sim2': None}
+    assert config.wait_for_connections() == {'sim1': None, 'sim2': None}
+
+
+class SlowInstrument(Instrument):
+    """Instrument taking connect_delay seconds to connect"""
+    connect_delay = 0.0
+
+    def connect_with_parameter_string(self, parameter_string):
+        time.sleep(self.connect_delay)
+        super().connect_with_parameter_string(parameter_string)
+
+
+def start_connections(config, executor, delays):
+    config.inst_dict = {}
+    for key, delay in delays.items():
+        config.inst_dict[key] = SlowInstrument()
+        config.inst_dict[key].connect_delay = delay
+    config.connect_futures = {key: executor.submit(config.connect_inst, key, inst, 'sim:')
+                              for key, inst in config.inst_dict.items()}
+
+
+def test_deadline_from_connect_start(config, monkeypatch):
+    monkeypatch.setattr(config, 'ConnectDeadline', 0.3)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        start_connections(config, executor, {'first': 0.15, 'second': 0.15, 'third': 0.15})
+        assert config.wait_for_connections() == {'first': None, 'second': None, 'third': None}
+    assert all(inst.is_connected() for inst in config.inst_dict.values())
+
+
+def test_late_connection_disconnected(config, monkeypatch):
+    monkeypatch.setattr(config, 'ConnectDeadline', 0.1)
+    reported = {}
+    finished = threading.Event()
+
+    def connect_callback(key, error):
+        reported[key] = error
+        if key == 'slow':
+            finished.set()
+
+    config.connect_callback = connect_callback
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        start_connections(config, executor, {'fast': 0.0, 'slow': 0.5})
+        start = time.monotonic()
+        results = config.wait_for_connections()
+        assert time.monotonic() - start < 0.4
+        assert results['fast'] is None
+        assert isinstance(results['slow'], InstCommunicationError)
+        assert 'slow' not in reported
+        assert finished.wait(5)
+    assert isinstance(reported['slow'], InstCommunicationError)
+    assert config.inst_dict['fast'].is_connected()
+    assert not config.inst_dict['slow'].is_connected()
+
+
+def test_wait_for_connections_timeout(config):
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        start_connections(config, executor, {'slow': 0.3})
+        results = config.wait_for_connections(timeout=0.05)
+        assert isinstance(results['slow'], InstCommunicationError)
+        assert config.wait_for_connections() == {'slow': None}  # Left running with a timeout
+    assert config.inst_dict['slow'].is_connected()
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.indexcommands import IndexCommand, FloatIndexCommand, IntIndexCommand, BoundIndexCommand
+from srsgui.inst.exceptions import InstIndexError, InstSetError
+from srsgui.inst.simulator import InstrumentSimulator
+
+
+class IndexedInstrument(Instrument):
+    _IdString = 'TEST'
+    _cmd_separator = ';'
+    parameter = FloatIndexCommand('PARAM', index_max=3,
+                                  index_dict={'front': 0, 'back': 1, 'left': 2, 'right': 3})
+    count = IntIndexCommand('CNT', index_max=4, index_min=1)
+    label = IndexCommand('LABL', index_max=2)
+
+
+@pytest.fixture
+def simulator():
+    return InstrumentSimulator(IndexedInstrument)
+
+
+@pytest.fixture
+def inst(simulator):
+    inst = IndexedInstrument()
+    inst.connect('sim', simulator)
+    writes = []
+    write_binary = inst.comm._write_binary
+
+    def record_write(data):
+        writes.append(bytes(data))
+        write_binary(data)
+
+    inst.comm._write_binary = record_write
+    inst.writes = writes
+    return inst
+
+
+def test_set_and_get_slice(inst):
+    inst.parameter[:] = [1.0, 2.0, 3.0, 4.0]
+    assert inst.writes == [b'PARAM 0,  1.0;PARAM 1,  2.0;PARAM 2,  3.0;PARAM 3,  4.0\n']
+    values = inst.parameter[1:3]
+    assert isinstance(values, np.ndarray)
+    assert values.tolist() == [2.0, 3.0]
+    assert inst.writes[-1] == b'PARAM? 1;PARAM? 2\n'
+    assert inst.parameter[::2].tolist() == [1.0, 3.0]
+    assert inst.parameter['back':'right'].tolist() == [2.0, 3.0]
+
+
+def test_slice_from_index_min(inst):
+    inst.count[:] = 7
+    assert inst.count[:].tolist() == [7, 7, 7, 7]
+    assert inst.count[:].dtype == np.int64
+    assert inst.count[2:].tolist() == [7, 7, 7]
+
+
+def test_list_of_keys(inst):
+    inst.parameter[['front', 'right']] = np.array([5.0, 6.0])
+    assert inst.parameter[['right', 'front', 1]].tolist() == [6.0, 5.0, 0.0]
+    assert inst.parameter[np.array([0, 3])].tolist() == [5.0, 6.0]
+
+
+def test_broadcast_value(inst):
+    inst.parameter[1:] = 10
+    assert inst.parameter[:].tolist() == [0.0, 10.0, 10.0, 10.0]
+
+
+def test_list_returned_without_dtype(inst, simulator):
+    simulator.set_register('LABL', 'A', 0)
+    simulator.set_register('LABL', 'B', 1)
+    assert inst.label[0:2] == ['A', 'B']
+
+
+def test_length_mismatch(inst):
+    with pytest.raises(InstSetError):
+        inst.parameter[0:2] = [1.0, 2.0, 3.0]
+    assert inst.writes == []
+
+
+def test_index_out_of_range(inst):
+    with pytest.raises(InstIndexError):
+        inst.parameter[[0, 4]]
+    with pytest.raises(InstIndexError):
+        inst.count[0:2] = [1, 2]
+    with pytest.raises(InstIndexError):
+        inst.parameter[['front', 'top']]
+    assert inst.writes == []
+
+
+def test_single_index(inst):
+    inst.parameter['left'] = 2.5
+    assert inst.parameter[2] == 2.5
+    assert inst.writes[0] == b'PARAM 2,  2.5\n'
+
+
+def test_bound_command(inst):
+    bound = inst.parameter
+    assert isinstance(bound, FloatIndexCommand)
+    assert isinstance(bound, IndexCommand)
+    assert isinstance(bound, BoundIndexCommand)
+    assert not isinstance(bound, IntIndexCommand)
+    assert bound.index_max == 3
+    assert bound.remote_command is IndexedInstrument.parameter.remote_command
@@ -0,0 +1,40 @@
+import inspect
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+from srsgui.inst.communications.interface import UPLOAD_CHUNK_SIZE
+
+
+class MeasuredInstrument(Instrument):
+    _IdString = 'TEST'
+    frequency = FloatCommand('FREQ')
+
+
+def test_metrics_kept_when_connected_again(tmp_path):
+    inst = MeasuredInstrument()
+    inst.connect('sim')
+    inst.comm.enable_metrics()
+    metrics = inst.comm.get_metrics_recorder()
+    inst.frequency = 10.0
+    inst.connect('sim')
+    assert inst.comm.get_metrics_recorder() is metrics
+    inst.start_recording(str(tmp_path / 'session.rec'))
+    assert inst.comm.get_metrics_recorder() is metrics
+    inst.frequency
+    inst.stop_recording()
+    assert inst.comm.get_metrics_recorder() is metrics
+    assert inst.comm.get_metrics()['commands']['FREQ']['count'] == 1
+    assert inst.comm.get_metrics()['commands']['FREQ?']['count'] == 1
+    assert 'slowest_commands' in inst.get_info()
+
+
+def test_metrics_disabled():
+    inst = MeasuredInstrument()
+    inst.connect('sim')
+    assert inst.comm.get_metrics_recorder() is None
+    assert inst.comm.get_metrics() is None
+
+
+def test_write_block_chunk_size():
+    parameter = inspect.signature(Instrument.write_block).parameters['chunk_size']
+    assert parameter.default == UPLOAD_CHUNK_SIZE
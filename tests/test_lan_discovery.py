@@ -0,0 +1,62 @@
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+from srsgui.inst.simulator import InstrumentSimulator, SimulatorServer
+from srsgui.inst.communications.lan_discovery import expand_hosts, find_instruments, \
+                                                     match_instrument_class
+
+
+class ScannedInstrument(Instrument):
+    _IdString = 'TEST'
+    frequency = FloatCommand('FREQ')
+
+
+class OtherInstrument(Instrument):
+    _IdString = 'OTHER'
+
+
+def test_expand_address():
+    assert expand_hosts('192.168.1.10') == ['192.168.1.10']
+
+
+def test_expand_network():
+    addresses = expand_hosts('192.168.1.0/24')
+    assert len(addresses) == 254
+    assert addresses[0] == '192.168.1.1'
+    assert addresses[-1] == '192.168.1.254'
+    assert expand_hosts('10.0.0.5/30') == ['10.0.0.5', '10.0.0.6']
+
+
+def test_expand_range():
+    assert expand_hosts('192.168.1.10-12') == ['192.168.1.10', '192.168.1.11', '192.168.1.12']
+
+
+def test_expand_list():
+    assert expand_hosts(['10.0.0.1', ' 10.0.0.8-9 ']) == ['10.0.0.1', '10.0.0.8', '10.0.0.9']
+
+
+@pytest.mark.parametrize('hosts', ['192.168.1.300', '192.168.1.250-256', 'host'])
+def test_expand_invalid(hosts):
+    with pytest.raises(ValueError):
+        expand_hosts(hosts)
+
+
+def test_match_instrument_class():
+    id_string = 'Stanford Research Systems,TEST,s/n00000,ver1.0'
+    assert match_instrument_class(id_string, [OtherInstrument, ScannedInstrument]) is ScannedInstrument
+    assert match_instrument_class(id_string, [OtherInstrument]) is None
+    assert match_instrument_class('', [ScannedInstrument]) is None
+
+
+def test_find_instruments():
+    server = SimulatorServer(InstrumentSimulator(ScannedInstrument))
+    server.start()
+    try:
+        found = find_instruments('127.0.0.1', [ScannedInstrument], ports=[server.port])
+        assert len(found) == 1
+        assert found[0].port == server.port
+        assert found[0].instrument_class is ScannedInstrument
+        assert find_instruments('127.0.0.1', [OtherInstrument], ports=[server.port], matched_only=True) == []
+    finally:
+        server.stop()
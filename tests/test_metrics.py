@@ -0,0 +1,114 @@
+import socket
+
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+from srsgui.inst.exceptions import InstCommunicationError, InstTimeoutError
+from srsgui.inst.simulator import InstrumentSimulator, SimulatorServer
+from srsgui.inst.communications.metrics import InterfaceMetrics, NULL_MEASUREMENT, get_mnemonic
+
+
+class MeasuredInstrument(Instrument):
+    _IdString = 'TEST'
+    frequency = FloatCommand('FREQ')
+
+
+def test_get_mnemonic():
+    assert get_mnemonic('PARAM? 1') == 'PARAM?'
+    assert get_mnemonic('FREQ 1000') == 'FREQ'
+    assert get_mnemonic('') == ''
+
+
+def test_histogram_buckets():
+    metrics = InterfaceMetrics(buckets=(0.001, 0.01, 0.1))
+    for elapsed in (0.0005, 0.001, 0.005, 0.05, 0.5):
+        metrics.record('FREQ?', elapsed, 0.0)
+    stats = metrics.snapshot()['commands']['FREQ?']
+    assert stats['histogram'] == [(0.001, 2), (0.01, 1), (0.1, 1), (float('inf'), 1)]
+    assert stats['count'] == 5
+    assert stats['min_time'] == 0.0005
+    assert stats['max_time'] == 0.5
+
+
+def test_percentiles():
+    metrics = InterfaceMetrics(buckets=(0.001, 0.01, 0.1))
+    for _ in range(98):
+        metrics.record('FREQ?', 0.0005, 0.0)
+    metrics.record('FREQ?', 0.05, 0.0)
+    metrics.record('FREQ?', 2.0, 0.0)
+    stats = metrics.snapshot()['commands']['FREQ?']
+    assert stats['p50_time'] == 0.001
+    assert stats['p99_time'] == 0.1
+    metrics.record('FREQ?', 2.0, 0.0)
+    assert metrics.snapshot()['commands']['FREQ?']['p99_time'] == 2.0  # Max time for the last bucket
+
+
+def test_snapshot_totals():
+    metrics = InterfaceMetrics()
+    metrics.record('FREQ?', 0.003, 0.001, bytes_out=6, bytes_in=7)
+    metrics.record('PHAS 1', 0.002, 0.0, bytes_out=7)
+    totals = metrics.snapshot()
+    assert sorted(totals['commands']) == ['FREQ?', 'PHAS']
+    assert (totals['count'], totals['bytes_out'], totals['bytes_in']) == (2, 13, 7)
+    assert totals['lock_wait_time'] == pytest.approx(0.001)
+    assert totals['wire_time'] == pytest.approx(0.004)
+    metrics.reset()
+    assert metrics.snapshot()['commands'] == {}
+
+
+def test_summary():
+    metrics = InterfaceMetrics()
+    metrics.record('FREQ?', 0.001, 0.0)
+    metrics.record('FREQ?', 0.003, 0.0)
+    metrics.record('PHAS?', 0.010, 0.0, error=InstCommunicationError('invalid reply'))
+    metrics.record('*IDN?', 0.0001, 0.0)
+    summary = metrics.summary(slowest=2)
+    assert list(summary) == ['PHAS?', 'FREQ?']
+    assert summary['FREQ?'] == {'count': 2, 'mean_ms': 2.0, 'max_ms': 3.0, 'errors': 0}
+    assert summary['PHAS?']['errors'] == 1
+
+
+def test_timeouts_by_type():
+    metrics = InterfaceMetrics()
+    metrics.record('FREQ?', 0.1, 0.0, error=InstTimeoutError("Cmd 'FREQ?' timeout"))
+    metrics.record('FREQ?', 0.1, 0.0, error=socket.timeout())
+    metrics.record('FREQ?', 0.1, 0.0, error=InstCommunicationError('Invalid timeout value'))
+    stats = metrics.snapshot()['commands']['FREQ?']
+    assert (stats['errors'], stats['timeouts']) == (3, 2)
+
+
+def test_timeout_recorded():
+    simulator = InstrumentSimulator(MeasuredInstrument)
+    server = SimulatorServer(simulator)
+    server.start()
+    inst = MeasuredInstrument()
+    try:
+        inst.connect('tcpip', '127.0.0.1', server.port)
+        inst.comm.enable_metrics()
+        inst.comm.set_timeout(0.1)
+        simulator.latency = 0.3
+        with pytest.raises(InstTimeoutError):
+            inst.query_text('FREQ?')
+        stats = inst.comm.get_metrics()['commands']['FREQ?']
+        assert (stats['errors'], stats['timeouts']) == (1, 1)
+    finally:
+        inst.disconnect()
+        server.stop()
+
+
+def test_disabled():
+    inst = MeasuredInstrument()
+    inst.connect('sim')
+    assert not inst.comm.is_metrics_enabled()
+    assert inst.comm._measure('FREQ?') is NULL_MEASUREMENT
+    with inst.comm._measure('FREQ?') as m:
+        m.bytes_in = 10
+    assert m.bytes_in == 0
+    assert inst.comm.get_metrics() is None
+
+    inst.comm.enable_metrics()
+    inst.frequency
+    assert inst.comm.get_metrics()['commands']['FREQ?']['count'] == 1
+    inst.comm.disable_metrics()
+    assert inst.comm.get_metrics() is None
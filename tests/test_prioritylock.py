@@ -0,0 +1,151 @@
+import time
+import threading
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.communications.prioritylock import PriorityLock, io_priority, get_thread_priority, \
+                                                   PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, PRIORITY_TASK
+from srsgui.task.task import Task
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError
+        time.sleep(0.001)
+
+
+class Waiters(object):
+    """
+    Threads waiting for a lock, started one by one, recording the order they acquire it
+    """
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.acquired = []
+        self.threads = []
+
+    def start(self, name, priority):
+        def run():
+            with io_priority(priority), self.lock:
+                self.acquired.append(name)
+
+        waiting = len(self.lock._waiters)
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.threads.append(thread)
+        wait_until(lambda: len(self.lock._waiters) == waiting + 1)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join(5)
+        return self.acquired
+
+
+def test_priority_order():
+    lock = PriorityLock()
+    waiters = Waiters(lock)
+    lock.acquire()
+    waiters.start('background', PRIORITY_BACKGROUND)
+    waiters.start('interactive', PRIORITY_INTERACTIVE)
+    waiters.start('task', PRIORITY_TASK)
+    lock.release()
+    assert waiters.join() == ['task', 'interactive', 'background']
+    assert not lock.locked()
+
+
+def test_fifo_within_priority():
+    lock = PriorityLock()
+    waiters = Waiters(lock)
+    lock.acquire()
+    for i in range(5):
+        waiters.start(i, PRIORITY_INTERACTIVE)
+    waiters.start('task', PRIORITY_TASK)
+    lock.release()
+    assert waiters.join() == ['task', 0, 1, 2, 3, 4]
+
+
+def test_reentrant():
+    lock = PriorityLock()
+    with lock:
+        with lock:
+            assert lock.locked()
+        assert lock.locked()
+        acquired = []
+        thread = threading.Thread(target=lambda: acquired.append(lock.acquire(blocking=False)))
+        thread.start()
+        thread.join()
+        assert acquired == [False]
+    assert not lock.locked()
+
+
+def test_timeout():
+    lock = PriorityLock()
+    lock.acquire()
+    acquired = []
+    thread = threading.Thread(target=lambda: acquired.append(lock.acquire(timeout=0.05)))
+    thread.start()
+    thread.join()
+    assert acquired == [False]
+    assert lock._waiters == []
+    lock.release()
+    assert not lock.locked()
+
+
+def test_pause_and_resume():
+    lock = PriorityLock()
+    lock.pause(PRIORITY_INTERACTIVE)
+    assert lock.is_paused(PRIORITY_BACKGROUND)
+    assert not lock.is_paused(PRIORITY_INTERACTIVE)
+    assert lock.acquire(blocking=False, priority=PRIORITY_BACKGROUND) is False
+    waiters = Waiters(lock)
+    waiters.start('background', PRIORITY_BACKGROUND)  # Waits, even though the lock is free
+    assert not lock.locked()
+    with lock:
+        pass
+    assert waiters.acquired == []
+    lock.resume()
+    assert waiters.join() == ['background']
+    assert not lock.is_paused(PRIORITY_BACKGROUND)
+
+
+class PausedInstrument(Instrument):
+    _IdString = 'TEST'
+
+
+def test_task_pause_background_io():
+    inst = PausedInstrument()
+    inst.connect('sim')
+    task = Task()
+    task.inst_dict = {'inst': inst}
+    lock = inst.comm.get_lock()
+    task.pause_background_io()
+    assert lock.is_paused(PRIORITY_BACKGROUND)
+    assert not lock.is_paused(PRIORITY_INTERACTIVE)
+    with io_priority(PRIORITY_BACKGROUND):
+        assert lock.acquire(blocking=False) is False
+    assert inst.query_text('*IDN?').startswith('Stanford Research Systems,TEST')
+    task.pause_background_io()  # Paused only once
+    task.resume_background_io()
+    assert not lock.is_paused(PRIORITY_BACKGROUND)
+
+
+def test_stats():
+    lock = PriorityLock()
+    with io_priority(PRIORITY_TASK):
+        assert get_thread_priority() == PRIORITY_TASK
+        with lock:
+            pass
+    lock.acquire()
+    waiters = Waiters(lock)
+    waiters.start('background', PRIORITY_BACKGROUND)
+    time.sleep(0.05)
+    lock.release()
+    waiters.join()
+    stats = lock.get_stats()
+    assert list(stats) == ['background', 'interactive', 'task']
+    assert stats['task'] == {'count': 1, 'total_wait': 0.0, 'mean_wait': 0.0, 'max_wait': 0.0}
+    assert stats['background']['count'] == 1
+    assert stats['background']['max_wait'] >= 0.05
+    lock.reset_stats()
+    assert lock.get_stats() == {}
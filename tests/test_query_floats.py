@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.exceptions import InstQueryError
+from srsgui.inst.simulator import InstrumentSimulator
+from srsgui.inst.communications.interface import parse_numbers
+
+
+class TraceInstrument(Instrument):
+    _IdString = 'TEST'
+
+
+def connect():
+    inst = TraceInstrument()
+    simulator = InstrumentSimulator(TraceInstrument)
+    inst.connect('sim', simulator)
+    return inst, simulator
+
+
+def test_parse_numbers():
+    data = parse_numbers(b'1.0,2.5,-3e-2\n')
+    assert data.dtype == np.float64
+    assert data.tolist() == [1.0, 2.5, -0.03]
+    assert parse_numbers('1, 2, 3', dtype='int32').tolist() == [1, 2, 3]
+    assert parse_numbers('nan,inf').size == 2
+
+
+def test_parse_empty():
+    for reply in (b'', b'\n', '  \r\n'):
+        data = parse_numbers(reply, dtype='int16')
+        assert data.size == 0
+        assert data.dtype == np.int16
+
+
+def test_parse_trailing_separator():
+    assert parse_numbers(b'1,2,3,\n').tolist() == [1.0, 2.0, 3.0]
+    assert parse_numbers('1;2;', separator=';').tolist() == [1.0, 2.0]
+    with pytest.raises(ValueError):
+        parse_numbers('1,,3')
+
+
+def test_parse_whitespace_separator():
+    assert parse_numbers(b'1 2\t3\r\n 4  \n', separator=' ').tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert parse_numbers(b'1 2 3', dtype='int64', separator=' ').tolist() == [1, 2, 3]
+
+
+def test_parse_non_numeric():
+    for reply in (b'1,x,3', b'1,2 3', b'OVLD'):
+        with pytest.raises(ValueError):
+            parse_numbers(reply)
+    with pytest.raises(ValueError):
+        parse_numbers(b'1,2.5', dtype='int64')
+
+
+def test_query_floats():
+    inst, simulator = connect()
+    simulator.set_reply('TRAC?', '0.5,1.5,2.5,')
+    assert inst.query_floats('TRAC? 1').tolist() == [0.5, 1.5, 2.5]
+    simulator.set_reply('TRAC?', '0.5 1.5')
+    assert inst.query_floats('TRAC? 1', separator=' ', dtype='float32').dtype == np.float32
+
+
+def test_query_ints():
+    inst, simulator = connect()
+    simulator.set_reply('HIST?', '3,1,4,1,5')
+    assert inst.query_ints('HIST?').tolist() == [3, 1, 4, 1, 5]
+    simulator.set_reply('HIST?', '3,1,x')
+    with pytest.raises(InstQueryError):
+        inst.query_ints('HIST?')
@@ -0,0 +1,69 @@
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+from srsgui.inst.simulator import InstrumentSimulator
+from srsgui.inst.exceptions import InstTimeoutError
+
+
+class ScpiInstrument(Instrument):
+    _IdString = 'TEST'
+    _cmd_separator = ';'
+    frequency = FloatCommand('FREQ')
+    phase = FloatCommand('PHAS')
+
+
+def connect(simulator=None):
+    inst = ScpiInstrument()
+    simulator = simulator or InstrumentSimulator(ScpiInstrument)
+    inst.connect('sim', simulator)
+    return inst, simulator
+
+
+def test_query_many_joined():
+    inst, simulator = connect()
+    simulator.set_register('FREQ', '1000.0')
+    assert inst.comm.query_many([('FREQ?', float), 'PHAS?']) == [1000.0, '0.0']
+
+
+def test_query_many_reply_with_separator():
+    inst, simulator = connect()
+    simulator.set_reply('NAME?', 'a;b')
+    simulator.set_register('FREQ', '5.0')
+    inst.comm.enable_metrics()
+    assert inst.comm.query_many(['NAME?', 'FREQ?']) == ['a;b', '5.0']
+    # The joined reply, and the replies one by one
+    assert inst.comm.get_metrics()['bytes_in'] == len(b'a;b;5.0\n') + len(b'a;b\n5.0\n')
+
+
+def test_run_queries():
+    inst, simulator = connect()
+    simulator.set_register('FREQ', '1000.0')
+    inst.comm.enable_metrics()
+    assert inst.comm.run_queries(['FREQ?', 'PHAS?']) == [('1000.0', None), ('0.0', None)]
+    assert inst.comm.get_metrics()['count'] == 1
+
+
+def test_run_queries_with_invalid_query():
+    inst, simulator = connect()
+    inst.comm.enable_metrics()
+    results = inst.comm.run_queries(['FREQ?', 'BAD?', 'PHAS?'])
+    assert results[0] == ('0.0', None) and results[2] == ('0.0', None)
+    assert results[1][0] is None
+    assert isinstance(results[1][1], InstTimeoutError)
+    metrics = inst.comm.get_metrics()
+    assert metrics['timeouts'] == 1  # Queried one by one only once
+    assert metrics['commands']['BAD?']['timeouts'] == 1
+
+
+def test_run_queries_in_batches():
+    inst, simulator = connect()
+    writes = []
+    write_binary = inst.comm._write_binary
+
+    def record_write(data):
+        writes.append(bytes(data))
+        write_binary(data)
+
+    inst.comm._write_binary = record_write
+    results = inst.comm.run_queries(['FREQ?', 'PHAS?', 'FREQ?'], max_batch=2)
+    assert [reply for reply, _ in results] == ['0.0', '0.0', '0.0']
+    assert writes == [b'FREQ?;PHAS?\n', b'FREQ?\n']
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+from srsgui.inst.exceptions import InstCommunicationError
+from srsgui.inst.simulator import InstrumentSimulator
+from srsgui.inst.communications.recordinginterface import load_recording
+
+
+class RecordedInstrument(Instrument):
+    _IdString = 'TEST'
+    frequency = FloatCommand('FREQ')
+
+
+def run_session(inst):
+    inst.frequency = 1000.0
+    return (inst.frequency,
+            inst.query_text('*IDN?'),
+            list(inst.comm.query_block('BLK?', dtype='int8')))
+
+
+@pytest.mark.parametrize('file_name', ['session.rec', 'session.rec.gz'])
+def test_record_and_replay(tmp_path, file_name):
+    file_name = str(tmp_path / file_name)
+    simulator = InstrumentSimulator(RecordedInstrument)
+    simulator.set_block_generator('BLK?', lambda args: np.array([0, -1, 10, 127], dtype='int8'))
+    inst = RecordedInstrument()
+    inst.connect('sim', simulator)
+    inst.start_recording(file_name)
+    assert inst.is_recording()
+    recorded = run_session(inst)
+    inst.stop_recording()
+    assert not inst.is_recording()
+    assert recorded[0] == 1000.0
+    assert recorded[2] == [0, -1, 10, 127]
+
+    header, events = load_recording(file_name)
+    assert [data for _, kind, data in events if kind == 'w'] == [b'FREQ 1000.0\n', b'FREQ?\n',
+                                                                  b'*IDN?\n', b'BLK?\n']
+    assert b''.join(data for _, kind, data in events[-5:]) == b'#14\x00\xff\n\x7f\n'
+    assert all(a[0] <= b[0] for a, b in zip(events, events[1:]))
+
+    replay = RecordedInstrument()
+    replay.connect('replay', file_name)
+    assert run_session(replay) == recorded
+
+
+def test_replay_strict(tmp_path):
+    file_name = str(tmp_path / 'session.rec')
+    inst = RecordedInstrument()
+    inst.connect('sim')
+    inst.start_recording(file_name)
+    inst.frequency = 5.0
+    inst.stop_recording()
+
+    replay = RecordedInstrument()
+    replay.connect_with_parameter_string('replay:{}:strict'.format(file_name))
+    with pytest.raises(InstCommunicationError):
+        replay.comm.send('FREQ 6.0')
+    replay.comm.send('FREQ 5.0')
@@ -0,0 +1,48 @@
+import time
+
+import pytest
+import serial
+
+from srsgui.inst.communications import serial_ports as sp
+
+
+class FakeSerial(object):
+    open_times = {}
+
+    def __init__(self, port):
+        delay = self.open_times[port]
+        if delay is None:
+            raise serial.SerialException('Port in use')
+        time.sleep(delay)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def ports(monkeypatch):
+    FakeSerial.open_times = {'/dev/ttyUSB0': 0.0, '/dev/ttyUSB1': None, '/dev/ttyUSB2': 1.0}
+    monkeypatch.setattr(sp, '_list_candidates', lambda: sorted(FakeSerial.open_times))
+    monkeypatch.setattr(sp.serial, 'Serial', FakeSerial)
+    sp.invalidate_cache()
+    yield
+    sp.invalidate_cache()
+
+
+def test_slow_port_listed_as_unverified(ports):
+    start = time.monotonic()
+    assert sp.serial_ports(probe_timeout=0.2) == ['/dev/ttyUSB0', '/dev/ttyUSB2']
+    assert time.monotonic() - start < 0.9
+    assert sp.get_unverified_ports() == ['/dev/ttyUSB2']
+
+
+def test_probe_timeout(ports):
+    assert sp.serial_ports(probe_timeout=2.0) == ['/dev/ttyUSB0', '/dev/ttyUSB2']
+    assert sp.get_unverified_ports() == []
+
+
+def test_cache(ports):
+    assert sp.serial_ports(probe_timeout=0.2) == ['/dev/ttyUSB0', '/dev/ttyUSB2']
+    FakeSerial.open_times['/dev/ttyUSB0'] = None
+    assert sp.serial_ports() == ['/dev/ttyUSB0', '/dev/ttyUSB2']
+    assert sp.serial_ports(use_cache=False, probe_timeout=0.2) == ['/dev/ttyUSB2']
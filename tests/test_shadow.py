@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.commands import FloatCommand
+from srsgui.inst.indexcommands import FloatIndexCommand, FloatIndexGetCommand
+from srsgui.inst.exceptions import InstIndexError
+from srsgui.inst.simulator import InstrumentSimulator
+from srsgui.inst.communications.shadow import ShadowState
+
+
+class ShadowedInstrument(Instrument):
+    _IdString = 'TEST'
+    frequency = FloatCommand('FREQ')
+    parameter = FloatIndexCommand('PARAM', index_max=3)
+    measurement = FloatIndexGetCommand('MEAS', index_max=3)
+
+
+def connect(ttl=None):
+    inst = ShadowedInstrument()
+    inst.simulator = InstrumentSimulator(ShadowedInstrument)
+    inst.connect('sim', inst.simulator)
+    inst.comm.enable_shadow(ttl)
+    return inst
+
+
+def test_lookup_and_store():
+    shadow = ShadowState()
+    assert shadow.lookup('FREQ?') == (False, None)
+    shadow.store('FREQ?', 1000.0)
+    assert shadow.lookup('FREQ?') == (True, 1000.0)
+    assert shadow.is_unchanged('FREQ?', 1000.0)
+    assert not shadow.is_unchanged('FREQ?', 500.0)
+    stats = shadow.get_stats()
+    assert (stats['hits'], stats['misses'], stats['suppressed_writes'], stats['values']) == (1, 1, 1, 1)
+
+
+def test_ttl():
+    shadow = ShadowState(ttl=0.05)
+    shadow.store('FREQ?', 1000.0)
+    assert shadow.lookup('FREQ?') == (True, 1000.0)
+    time.sleep(0.1)
+    assert shadow.lookup('FREQ?') == (False, None)
+    assert not shadow.is_unchanged('FREQ?', 1000.0)
+
+
+def test_store_discarded_after_invalidation():
+    shadow = ShadowState()
+    generation = shadow.generation
+    shadow.invalidate('FREQ')
+    shadow.store('FREQ?', 1000.0, generation)
+    assert shadow.lookup('FREQ?') == (False, None)
+
+
+def test_invalidate():
+    shadow = ShadowState()
+    shadow.store('FREQ?', 1000.0)
+    shadow.store('PARAM? 1', 1.0)
+    shadow.store('PARAM? 2', 2.0)
+    shadow.invalidate('param 1, 5')
+    assert shadow.lookup('PARAM? 2') == (False, None)
+    assert shadow.lookup('FREQ?') == (True, 1000.0)
+    shadow.invalidate()
+    assert shadow.lookup('FREQ?') == (False, None)
+
+
+def test_command_sent():
+    shadow = ShadowState()
+    shadow.store('FREQ?', 1000.0)
+    shadow.store('PARAM? 1', 1.0)
+    shadow.command_sent('FREQ?;PARAM? 1')
+    assert shadow.lookup('FREQ?') == (True, 1000.0)
+    shadow.command_sent('FREQ 500;PARAM? 1')
+    assert shadow.lookup('FREQ?') == (False, None)
+    assert shadow.lookup('PARAM? 1') == (True, 1.0)
+    shadow.command_sent('*RST;*OPC?')
+    assert shadow.lookup('PARAM? 1') == (False, None)
+
+
+def test_command_values_kept():
+    inst = connect()
+    inst.frequency = 1000.0
+    assert inst.frequency == 1000.0
+    inst.parameter[1] = 5.0
+    assert inst.parameter[1] == 5.0
+    queries = inst.simulator.query_count
+    assert inst.frequency == 1000.0
+    assert inst.parameter[1] == 5.0
+    assert inst.simulator.query_count == queries
+
+
+def test_unchanged_set_suppressed():
+    inst = connect()
+    inst.parameter[2] = 3.0
+    inst.parameter[2] = 3.0
+    assert inst.comm.get_shadow().get_stats()['suppressed_writes'] == 1
+
+
+def test_volatile_always_queried():
+    inst = connect()
+    inst.measurement[0]
+    queries = inst.simulator.query_count
+    inst.measurement[0]
+    assert inst.simulator.query_count == queries + 1
+    with pytest.raises(InstIndexError):
+        inst.measurement[0] = 1.0
+
+
+def test_instruments_of_the_same_class():
+    first = connect()
+    second = connect()
+    first.parameter[0] = 1.0
+    second.parameter[0] = 2.0
+    assert first.parameter[0] == 1.0
+    assert second.parameter[0] == 2.0
+    first.parameter[0] = 2.0  # Not suppressed by the value of the other instrument
+    assert first.comm.get_shadow().get_stats()['suppressed_writes'] == 0
+    first.comm.disable_shadow()
+    second.comm.disable_shadow()
+    assert first.parameter[0] == 2.0
+    assert second.parameter[:].tolist() == [2.0, 0.0, 0.0, 0.0]
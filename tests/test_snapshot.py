@@ -0,0 +1,171 @@
+import logging
+
+import pytest
+
+from srsgui.inst.instrument import Instrument
+from srsgui.inst.component import Component
+from srsgui.inst.commands import FloatCommand, FloatGetCommand
+from srsgui.inst.indexcommands import FloatIndexCommand
+from srsgui.inst.simulator import InstrumentSimulator
+from srsgui.inst.snapshot import Snapshot, plan_capture
+
+
+class Output(Component):
+    level = FloatCommand('LEVL')
+
+
+class SnapshotInstrument(Instrument):
+    _IdString = 'TEST'
+    _cmd_separator = ';'
+    frequency = FloatCommand('FREQ')
+    phase = FloatCommand('PHAS')
+    temperature = FloatGetCommand('TEMP')
+    parameter = FloatIndexCommand('PARAM', index_max=2, index_dict={'front': 0, 'back': 1})
+
+    def __init__(self, interface_type=None, *args):
+        super().__init__(interface_type, *args)
+        self.output = Output(self)
+
+
+@pytest.fixture
+def simulator():
+    return InstrumentSimulator(SnapshotInstrument)
+
+
+@pytest.fixture
+def inst(simulator):
+    inst = SnapshotInstrument()
+    inst.connect('sim', simulator)
+    inst.frequency = 1000.0
+    inst.phase = 90.0
+    inst.output.level = 2.5
+    inst.parameter['back'] = 7.0
+    return inst
+
+
+def test_plan_capture(inst):
+    plan = [(path, name, index) for _, path, name, _, index in plan_capture(inst)]
+    assert plan == [('output', 'level', None), ('', 'frequency', None), ('', 'phase', None),
+                    ('', 'parameter', 'front'), ('', 'parameter', 'back')]
+    assert ('', 'temperature', None) in [(path, name, index) for _, path, name, _, index
+                                         in plan_capture(inst, include_query_only=True)]
+
+
+def test_capture_snapshot(inst):
+    snapshot = inst.capture_snapshot()
+    assert len(snapshot) == 5
+    assert snapshot.instrument_class == 'SnapshotInstrument'
+    assert snapshot.get('frequency') == 1000.0
+    assert snapshot.get('level', path='output') == 2.5
+    assert snapshot.get('parameter', 'back') == 7.0
+    assert snapshot.get_entry('parameter', 2) is None
+    assert snapshot.errors == {}
+    assert snapshot.to_tree() == {'output': {'level': 2.5}, 'frequency': 1000.0, 'phase': 90.0,
+                                  'parameter': {'front': 0.0, 'back': 7.0}}
+
+
+def test_capture_commands(inst):
+    assert inst.capture_commands() == inst.capture_snapshot().to_tree()
+
+
+def test_save_and_load(inst, tmp_path):
+    file_name = str(tmp_path / 'snapshot.json')
+    snapshot = inst.capture_snapshot()
+    snapshot.save(file_name)
+    loaded = Snapshot.load(file_name)
+    assert loaded.entries == snapshot.entries
+    assert loaded.timestamp == snapshot.timestamp
+    assert Snapshot.from_dict(snapshot.to_dict()).to_tree() == snapshot.to_tree()
+    with pytest.raises(ValueError):
+        Snapshot.from_dict({'format': 'other'})
+
+
+def test_capture_errors(inst, simulator, caplog):
+    simulator.set_reply('PHAS?', 'invalid')
+    with caplog.at_level(logging.WARNING):
+        snapshot = inst.capture_snapshot()
+        assert snapshot.get_entry('phase') is None
+        assert snapshot.get('frequency') == 1000.0
+        assert list(snapshot.errors) == ['PHAS?']
+
+        errors = {}
+        commands = inst.capture_commands(errors=errors)
+    assert 'phase' not in commands
+    assert commands['frequency'] == 1000.0
+    assert list(errors) == ['PHAS?']
+    assert 'PHAS?' in caplog.text
+
+
+def record_writes(inst):
+    writes = []
+    write_binary = inst.comm._write_binary
+
+    def record_write(data):
+        writes.append(bytes(data))
+        write_binary(data)
+
+    inst.comm._write_binary = record_write
+    return writes
+
+
+def test_restore_changed_values(inst, simulator):
+    snapshot = inst.capture_snapshot()
+    inst.frequency = 500.0
+    inst.output.level = 1.0
+    inst.parameter['back'] = 3.0
+    writes = record_writes(inst)
+    restored = inst.restore(snapshot)
+    assert [(e.path, e.name, e.index) for e in restored] == [('output', 'level', None),
+                                                             ('', 'frequency', None),
+                                                             ('', 'parameter', 'back')]
+    assert writes[-2:] == [b'LEVL 2.5;FREQ 1000.0;PARAM 1,  7.0\n', b'*OPC?\n']
+    assert inst.capture_snapshot().to_tree() == snapshot.to_tree()
+    assert simulator.get_errors() == []
+
+
+def test_restore_unchanged(inst):
+    snapshot = inst.capture_snapshot()
+    writes = record_writes(inst)
+    assert inst.restore(snapshot) == []
+    assert b''.join(writes).count(b'*OPC?') == 0
+
+
+def test_restore_from_capture_commands(inst):
+    tree = inst.capture_commands()
+    inst.phase = 0.0
+    assert [e.name for e in inst.restore(tree, opc_query=None)] == ['phase']
+    assert inst.phase == 90.0
+
+
+def test_restore_order(inst, monkeypatch):
+    snapshot = inst.capture_snapshot()
+    inst.frequency = 1.0
+    inst.phase = 1.0
+    monkeypatch.setattr(SnapshotInstrument, 'restore_order', ['phase'])
+    writes = record_writes(inst)
+    inst.restore(snapshot)
+    assert writes[-2] == b'PHAS 90.0;FREQ 1000.0\n'
+
+
+def test_restore_with_shadow(inst, simulator):
+    inst.comm.enable_shadow()
+    snapshot = inst.capture_snapshot()
+    inst.parameter['front'] = 4.0  # Invalidates 'PARAM? 1' as well
+    inst.restore(snapshot, opc_query=None)
+    queries = simulator.query_count
+    assert inst.parameter['front'] == 0.0
+    assert simulator.query_count == queries
+    assert simulator.get_register('PARAM', 0) == '0.0'
+
+
+def test_restore_instruments_of_the_same_class(inst, simulator):
+    snapshot = inst.capture_snapshot()
+    other_simulator = InstrumentSimulator(SnapshotInstrument)
+    other = SnapshotInstrument()
+    other.connect('sim', other_simulator)
+    other.restore(snapshot)
+    assert other.capture_snapshot().to_tree() == snapshot.to_tree()
+    inst.parameter['back'] = 3.0
+    other.restore(snapshot)
+    assert inst.parameter['back'] == 3.0
+    assert other_simulator.get_register('PARAM', 1) == '7.0'
@@ -0,0 +1,97 @@
+import time
+import socket
+import threading
+
+import pytest
+
+from srsgui.inst.communications.tcpipinterface import TcpipInterface
+from srsgui.inst.exceptions import InstLoginFailureError
+
+
+class LoginServer(object):
+    """
+    Fake socket server that sends the chunks of a prompt with a delay between them,
+    after each line received from the client
+    """
+
+    def __init__(self, prompts, delay=0.02):
+        self.prompts = prompts
+        self.delay = delay
+        self.lines = []
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        conn, _ = self.server.accept()
+        with conn:
+            buffer = b''
+            for prompt in self.prompts:
+                while b'\n' not in buffer:
+                    data = conn.recv(1024)
+                    if not data:
+                        return
+                    buffer += data
+                line, buffer = buffer.split(b'\n', 1)
+                self.lines.append(line.strip())
+                for chunk in prompt:
+                    time.sleep(self.delay)
+                    conn.sendall(chunk)
+            conn.recv(1024)  # Wait until the client closes
+
+    def stop(self):
+        self.server.close()
+        self.thread.join(5)
+
+
+def login(server):
+    comm = TcpipInterface()
+    comm.set_timeout(1.0)
+    comm.connect_with_login('127.0.0.1', 'user', 'pass', server.port)
+    return comm
+
+
+def test_login_with_partial_prompts():
+    server = LoginServer([[b'Na', b'me:'], [b'Pass', b'wo', b'rd:'], [b'Welc', b'ome\r\n']])
+    try:
+        comm = login(server)
+        assert comm.is_connected()
+        assert server.lines == [b'', b'user', b'pass']
+        assert set(comm.get_login_timing()) == {'connect', 'name_prompt', 'password_prompt',
+                                                'welcome', 'total'}
+        comm.disconnect()
+    finally:
+        server.stop()
+
+
+def test_login_with_delayed_prompts():
+    server = LoginServer([[b'Name:'], [b'Password:'], [b'Welcome\r\n']], delay=0.1)
+    try:
+        comm = login(server)
+        assert comm.is_connected()
+        assert comm.get_login_timing()['password_prompt'] >= 0.1
+        comm.disconnect()
+    finally:
+        server.stop()
+
+
+def test_no_password_prompt():
+    server = LoginServer([[b'Name:'], [b'Pass']])
+    try:
+        with pytest.raises(InstLoginFailureError):
+            login(server)
+        assert server.lines == [b'', b'user']
+    finally:
+        server.stop()
+
+
+def test_wrong_password():
+    server = LoginServer([[b'Name:'], [b'Password:'], [b'Name:']])
+    try:
+        with pytest.raises(InstLoginFailureError):
+            login(server)
+    finally:
+        server.stop()
@@ -0,0 +1,95 @@
+import io
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from srsgui.inst.exceptions import InstCommunicationError
+from srsgui.inst.communications import TcpipInterface
+
+
+class ReceivingServer(object):
+    """
+    Local socket server keeping all the bytes received
+    """
+
+    def __init__(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.listen(1)
+        self.port = self.socket.getsockname()[1]
+        self.data = bytearray()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        connection, _ = self.socket.accept()
+        with connection:
+            while True:
+                data = connection.recv(65536)
+                if not data:
+                    break
+                self.data += data
+
+    def wait_closed(self):
+        self._thread.join(5)
+        self.socket.close()
+        return bytes(self.data)
+
+
+@pytest.fixture
+def server():
+    return ReceivingServer()
+
+
+@pytest.fixture
+def comm(server):
+    comm = TcpipInterface()
+    comm.connect('127.0.0.1', server.port)
+    return comm
+
+
+def test_write_block(server, comm):
+    data = np.arange(1000, dtype='<i2')
+    progress = []
+    comm.write_block('TRAC:DATA ', data, chunk_size=300, progress=lambda n, total: progress.append((n, total)))
+    comm.send('*OPC')
+    comm.disconnect()
+    assert server.wait_closed() == b'TRAC:DATA #42000' + data.tobytes() + b'\n*OPC\n'
+    assert progress == [(300, 2000), (600, 2000), (900, 2000), (1200, 2000),
+                        (1500, 2000), (1800, 2000), (2000, 2000)]
+
+
+def test_write_block_from_file(server, comm):
+    data = bytes(range(256)) * 10
+    f = io.BytesIO(data)
+    f.seek(56)
+    comm.write_block('FW ', f, chunk_size=1000)
+    comm.disconnect()
+    assert server.wait_closed() == b'FW #42504' + data[56:] + b'\n'
+
+
+def test_write_empty_block(server, comm):
+    comm.write_block('DATA ', b'')
+    comm.disconnect()
+    assert server.wait_closed() == b'DATA #10\n'
+
+
+def test_write_block_cancel(server, comm):
+    cancel = threading.Event()
+
+    def progress(written, total):
+        if written >= 200:
+            cancel.set()
+
+    with pytest.raises(InstCommunicationError):
+        comm.write_block('DATA ', bytes(1000), chunk_size=100, progress=progress, cancel=cancel)
+    comm.disconnect()
+    assert server.wait_closed() == b'DATA #41000' + bytes(200)
+
+
+def test_write_block_invalid_chunk_size(comm):
+    with pytest.raises(ValueError):
+        comm.write_block('DATA ', b'1234', chunk_size=0)
+    comm.disconnect()